@@ -9,7 +9,8 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 
-from notifications.tasks import send_invitation_email
+from notifications import outbox
+from notifications.tasks import send_invitation_email, send_invitation_emails
 
 from .models import User, StatusUpdate, Invitation
 from .serializers import (
@@ -311,6 +312,7 @@ def _process_csv_upload(csv_file, invited_by, request):
         return results
 
     valid_user_types = {'student', 'teacher'}
+    invitation_ids = []
 
     for row_num, row in enumerate(rows[1:], start=2):
         results['total'] += 1
@@ -360,7 +362,10 @@ def _process_csv_upload(csv_file, invited_by, request):
             bio=bio,
         )
         invitation.save()
-        send_invitation_email.delay(invitation.pk)
+        invitation_ids.append(invitation.pk)
         results['success'].append({'row': row_num, 'email': email})
 
+    if invitation_ids:
+        # One task sends the whole upload over a single connection
+        outbox.enqueue(send_invitation_emails, invitation_ids)
     return results
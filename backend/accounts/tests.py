@@ -8,6 +8,8 @@ from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
+from notifications.models import OutboxMessage
+
 from .models import User, StatusUpdate, Invitation
 
 
@@ -343,6 +345,10 @@ class InvitationAPITest(APITestCase):
         self.assertEqual(len(res.data['errors']), 0)
         self.assertEqual(res.data['total'], 2)
         self.assertEqual(Invitation.objects.count(), 2)
+        # One batched email task for the whole upload
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, 'notifications.tasks.send_invitation_emails')
+        self.assertEqual(sorted(message.args[0]), sorted(Invitation.objects.values_list('pk', flat=True)))
 
     def test_bulk_upload_wrong_file_type(self):
         self._auth_teacher()
@@ -16,14 +16,15 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 django_asgi_app = get_asgi_application()
 
-from classroom.routing import websocket_urlpatterns
+from classroom.routing import websocket_urlpatterns as classroom_websocket_urlpatterns
 from classroom.middleware import TokenAuthMiddleware
+from notifications.routing import websocket_urlpatterns as notification_websocket_urlpatterns
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": TokenAuthMiddleware(
         URLRouter(
-            websocket_urlpatterns
+            classroom_websocket_urlpatterns + notification_websocket_urlpatterns
         )
     ),
 })
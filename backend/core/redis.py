@@ -0,0 +1,16 @@
+"""
+Shared Redis client for features that need Redis data structures directly
+(streams, lists) rather than the cache API.
+"""
+import redis
+from django.conf import settings
+
+_client = None
+
+
+def get_redis():
+    """Return a process-wide Redis client (connections are pooled by redis-py)."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
@@ -184,6 +184,22 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Redis (used directly for streams and queues; see core/redis.py)
+REDIS_URL = f"redis://{os.environ.get('REDIS_HOST', '127.0.0.1')}:{os.environ.get('REDIS_PORT', 6379)}/2"
+
+# Cache configuration (use Redis in deployments so web and Celery processes share entries)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION',
+            f"redis://{os.environ.get('REDIS_HOST', '127.0.0.1')}:{os.environ.get('REDIS_PORT', 6379)}/1"
+            if 'redis' in CACHE_BACKEND else '',
+        ),
+    },
+}
+
 # CORS configuration
 CORS_ALLOWED_ORIGINS = os.environ.get(
     'CORS_ALLOWED_ORIGINS',
@@ -192,7 +208,14 @@ CORS_ALLOWED_ORIGINS = os.environ.get(
 CORS_ALLOW_CREDENTIALS = True
 
 # Email configuration
-EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+# EMAIL_BACKEND (the env var) is the transport that actually delivers mail. With the queue enabled, Django's
+# EMAIL_BACKEND only appends messages to a Redis stream that Celery workers drain over persistent
+# connections at EMAIL_RATE_LIMIT messages per second (see notifications/mailer.py)
+EMAIL_DISPATCH_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_QUEUE_ENABLED = os.environ.get('EMAIL_QUEUE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+EMAIL_BACKEND = 'notifications.mailer.QueuedEmailBackend' if EMAIL_QUEUE_ENABLED else EMAIL_DISPATCH_BACKEND
+EMAIL_RATE_LIMIT = int(os.environ.get('EMAIL_RATE_LIMIT', 10))
+EMAIL_QUEUE_BATCH_SIZE = 100
 EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
 EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True').lower() in ('true', '1', 'yes')
@@ -208,3 +231,88 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'send-deadline-reminders': {
+        'task': 'courses.tasks.send_deadline_reminders',
+        'schedule': 300.0,
+    },
+    'close-expired-assignments': {
+        'task': 'courses.tasks.close_expired_assignments',
+        'schedule': 60.0,
+    },
+    'flush-submission-buffer': {
+        'task': 'courses.tasks.flush_submission_buffer',
+        'schedule': 2.0,
+    },
+    'checkpoint-submission-drafts': {
+        'task': 'courses.tasks.checkpoint_submission_drafts',
+        'schedule': 60.0,
+    },
+    'send-notification-digests': {
+        'task': 'notifications.tasks.send_notification_digests',
+        'schedule': float(os.environ.get('NOTIFICATION_DIGEST_INTERVAL', 15 * 60)),
+    },
+    'reconcile-unread-counters': {
+        'task': 'notifications.tasks.reconcile_unread_counters',
+        'schedule': float(os.environ.get('NOTIFICATION_UNREAD_RECONCILE_INTERVAL', 10 * 60)),
+    },
+    'drain-email-queue': {
+        'task': 'notifications.tasks.drain_email_queue',
+        'schedule': float(os.environ.get('EMAIL_QUEUE_DRAIN_INTERVAL', 5)),
+    },
+    'relay-outbox': {
+        'task': 'notifications.tasks.relay_outbox',
+        'schedule': float(os.environ.get('OUTBOX_RELAY_INTERVAL', 1)),
+    },
+    'purge-expired-notifications': {
+        'task': 'notifications.tasks.purge_expired_notifications',
+        'schedule': float(os.environ.get('NOTIFICATION_PURGE_INTERVAL', 24 * 60 * 60)),
+    },
+}
+
+# Rows per INSERT statement when creating notifications for many recipients at once
+NOTIFICATION_BULK_BATCH_SIZE = 1000
+
+# Coalescing: repeated events for the same target within this many seconds update one notification,
+# and their emails go out in periodic digests
+NOTIFICATION_COALESCE_WINDOW = int(os.environ.get('NOTIFICATION_COALESCE_WINDOW', 60 * 60))
+NOTIFICATION_DIGEST_BATCH_SIZE = 500
+
+# Unread badge counters live in Redis; reconciliation rewrites this many of them per database query
+NOTIFICATION_UNREAD_RECONCILE_BATCH_SIZE = 500
+
+# Retention: notification type -> (days kept once read, days kept while unread); None keeps them forever.
+# 'default' applies to every type not listed. Expired rows are purged daily in primary-key chunks and,
+# if NOTIFICATION_ARCHIVE_DIR is set, appended to a gzipped JSONL file there first.
+NOTIFICATION_RETENTION = {
+    'default': (
+        int(os.environ.get('NOTIFICATION_RETENTION_READ_DAYS', 90)),
+        int(os.environ.get('NOTIFICATION_RETENTION_UNREAD_DAYS', 365)),
+    ),
+    'deadline': (7, 30),
+}
+NOTIFICATION_PURGE_CHUNK_SIZE = 5000
+NOTIFICATION_ARCHIVE_DIR = os.environ.get('NOTIFICATION_ARCHIVE_DIR', '')
+
+# Transactional outbox: Celery side effects are written as rows in the caller's transaction and
+# published by the relay in batches (see notifications/outbox.py); processed rows are kept this many days.
+# Rows published this many seconds ago but still unprocessed are published again.
+OUTBOX_RELAY_BATCH_SIZE = 100
+OUTBOX_KEEP_DAYS = 7
+OUTBOX_REDELIVER_AFTER = int(os.environ.get('OUTBOX_REDELIVER_AFTER', 10 * 60))
+
+# Deadline reminders: hours before the deadline at which students who have not submitted are reminded
+DEADLINE_REMINDER_WINDOWS = [
+    int(h) for h in os.environ.get('DEADLINE_REMINDER_WINDOWS', '24,1').split(',') if h.strip()
+]
+DEADLINE_REMINDER_BATCH_SIZE = 500
+
+# Write-behind submission buffer: when enabled, submissions are acknowledged with 202 and a
+# receipt after being appended to a Redis stream, and a worker bulk-inserts them
+SUBMISSION_BUFFER_ENABLED = os.environ.get('SUBMISSION_BUFFER_ENABLED', 'False').lower() in ('true', '1', 'yes')
+SUBMISSION_BUFFER_BATCH_SIZE = 500
+
+# Quiz drafts: in-progress answers live in Redis for this long after the last change and are
+# checkpointed to the database by a periodic task
+SUBMISSION_DRAFT_TTL = 60 * 60 * 24 * 3
+SUBMISSION_DRAFT_CHECKPOINT_BATCH_SIZE = 1000
@@ -9,7 +9,10 @@ from accounts.api import (
     validate_invite, accept_invite,
     auth_login, auth_register, auth_me,
 )
-from courses.api import CourseViewSet, CourseMaterialViewSet, EnrollmentViewSet, FeedbackViewSet, AssignmentViewSet, AssignmentSubmissionViewSet
+from courses.api import (
+    CourseViewSet, CourseMaterialViewSet, EnrollmentViewSet, FeedbackViewSet, AssignmentViewSet,
+    AssignmentSubmissionViewSet, CardReviewViewSet,
+)
 from classroom.api import ClassroomViewSet
 from notifications.api import NotificationViewSet
 
@@ -23,6 +26,7 @@ router.register(r'enrollments', EnrollmentViewSet)
 router.register(r'feedback', FeedbackViewSet, basename='feedback')
 router.register(r'assignments', AssignmentViewSet, basename='assignment')
 router.register(r'assignment-submissions', AssignmentSubmissionViewSet, basename='assignment-submission')
+router.register(r'card-reviews', CardReviewViewSet, basename='card-review')
 router.register(r'classrooms', ClassroomViewSet, basename='classroom')
 router.register(r'notifications', NotificationViewSet, basename='notification')
 
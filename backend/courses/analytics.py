@@ -0,0 +1,244 @@
+"""
+Per-question analytics for quiz assignments.
+
+Aggregates are kept in a Redis hash per assignment as sufficient statistics
+(option counts, correct counts, score histogram), one field per counter.
+New submissions are folded in by ``record_submission``, which bumps the
+affected fields with HINCRBY in a single script, so concurrent submissions
+never overwrite each other and reads stay cheap for assignments with tens of
+thousands of attempts. The discrimination index needs the full ranking of
+students and is only recomputed once the number of submissions has grown
+noticeably since it was last calculated. Once an assignment closes its report
+is frozen on the row and served as is. Without Redis, reports are computed
+from the database on every read.
+"""
+import json
+import logging
+
+import numpy as np
+from redis.exceptions import RedisError
+
+from core.redis import get_redis
+from .models import NO_ANSWER, Assignment, AssignmentSubmission
+from .scoring import answers_matrix, score_matrix
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_CACHE_TIMEOUT = 60 * 60 * 24
+HISTOGRAM_BINS = 10
+# Fraction of students in the upper and lower groups of the discrimination index
+DISCRIMINATION_GROUP = 0.27
+# Recompute from scratch once submissions grow by this fraction since the last full pass
+RECOMPUTE_GROWTH = 0.1
+
+# Only count into a hash built for the same answer key and options
+_RECORD_SCRIPT = """
+if redis.call('hget', KEYS[1], 'layout') ~= ARGV[1] then return 0 end
+for i = 2, #ARGV, 2 do redis.call('hincrby', KEYS[1], ARGV[i], ARGV[i + 1]) end
+return 1
+"""
+
+
+def _cache_key(assignment_id):
+    return f'assignment_analytics:{assignment_id}'
+
+
+def _histogram_bin(score):
+    # Bucket i covers [10i, 10i + 10); a perfect score falls in the last bucket
+    return min(score // (100 // HISTOGRAM_BINS), HISTOGRAM_BINS - 1)
+
+
+def _histogram(scores):
+    buckets = np.minimum(np.asarray(scores, dtype=np.int64) // (100 // HISTOGRAM_BINS), HISTOGRAM_BINS - 1)
+    return np.bincount(buckets, minlength=HISTOGRAM_BINS)
+
+
+def _option_limits(assignment):
+    """Number of options of each question; answers at or past it are not options."""
+    option_counts = list(assignment.option_counts)
+    return [
+        max(option_counts[i] if i < len(option_counts) else 0, correct + 1)
+        for i, correct in enumerate(assignment.answer_key)
+    ]
+
+
+def _layout(assignment):
+    return json.dumps([list(assignment.answer_key), _option_limits(assignment)])
+
+
+def compute_stats(assignment):
+    """Compute analytics statistics for all submissions of an assignment in one pass."""
+    answer_key = list(assignment.answer_key)
+    limits = _option_limits(assignment)
+    answer_lists = list(
+        AssignmentSubmission.objects.filter(assignment_id=assignment.pk).values_list('answers', flat=True).iterator()
+    )
+    n, q = len(answer_lists), len(answer_key)
+    matrix = answers_matrix(answer_lists, q)
+    # Width comes from the content, never from the answers, so a stray value can't blow up the bincount
+    matrix[matrix >= np.asarray(limits, dtype=np.int32)] = NO_ANSWER
+    width = max(limits, default=0) or 1
+
+    # Count chosen options per question with a single bincount over offset indices
+    answered = matrix != NO_ANSWER
+    offsets = matrix + np.arange(q, dtype=np.int32) * width
+    option_counts = np.bincount(offsets[answered], minlength=q * width).reshape(q, width)
+
+    key = np.asarray(answer_key, dtype=np.int32)
+    correct = (matrix == key) & (key != NO_ANSWER)
+    scores = score_matrix(matrix, answer_key) if q else np.zeros(n, dtype=np.int64)
+
+    return {
+        'answer_key': answer_key,
+        'n': n,
+        'score_sum': int(scores.sum()),
+        'histogram': _histogram(scores).tolist(),
+        'option_counts': [option_counts[i, :limit].tolist() for i, limit in enumerate(limits)],
+        'unanswered': (~answered).sum(axis=0).tolist(),
+        'correct_counts': correct.sum(axis=0).tolist(),
+        'discrimination': _discrimination(correct, scores),
+        'discrimination_n': n,
+    }
+
+
+def _discrimination(correct, scores):
+    """Upper-minus-lower group correctness rate per question (None for tiny samples)."""
+    n = len(scores)
+    if n < 2:
+        return [None] * correct.shape[1]
+    group = max(1, int(round(n * DISCRIMINATION_GROUP)))
+    order = np.argsort(scores, kind='stable')
+    lower = correct[order[:group]].mean(axis=0)
+    upper = correct[order[-group:]].mean(axis=0)
+    return [round(float(d), 4) for d in upper - lower]
+
+
+def _to_fields(stats, layout):
+    """Flatten statistics into hash fields; zero counters are left out."""
+    fields = {
+        'layout': layout,
+        'n': stats['n'],
+        'score_sum': stats['score_sum'],
+        'discrimination': json.dumps(stats['discrimination']),
+        'discrimination_n': stats['discrimination_n'],
+    }
+    counters = [(f'h:{b}', count) for b, count in enumerate(stats['histogram'])]
+    for i, counts in enumerate(stats['option_counts']):
+        counters += [(f'o:{i}:{k}', count) for k, count in enumerate(counts)]
+    counters += [(f'u:{i}', count) for i, count in enumerate(stats['unanswered'])]
+    counters += [(f'c:{i}', count) for i, count in enumerate(stats['correct_counts'])]
+    fields.update((field, count) for field, count in counters if count)
+    return fields
+
+
+def _from_fields(fields, assignment):
+    def count(field):
+        return int(fields.get(field, 0))
+
+    limits = _option_limits(assignment)
+    return {
+        'answer_key': list(assignment.answer_key),
+        'n': count('n'),
+        'score_sum': count('score_sum'),
+        'histogram': [count(f'h:{b}') for b in range(HISTOGRAM_BINS)],
+        'option_counts': [[count(f'o:{i}:{k}') for k in range(limit)] for i, limit in enumerate(limits)],
+        'unanswered': [count(f'u:{i}') for i in range(len(limits))],
+        'correct_counts': [count(f'c:{i}') for i in range(len(limits))],
+        'discrimination': json.loads(fields['discrimination']),
+        'discrimination_n': count('discrimination_n'),
+    }
+
+
+def get_stats(assignment):
+    """Return stored statistics, recomputing when missing, stale or built for an old key."""
+    key = _cache_key(assignment.pk)
+    layout = _layout(assignment)
+    try:
+        client = get_redis()
+        fields = client.hgetall(key)
+    except RedisError:
+        logger.warning('Analytics store unavailable; computing assignment %s from the database', assignment.pk)
+        return compute_stats(assignment)
+    if fields.get('layout') == layout:
+        stats = _from_fields(fields, assignment)
+        if stats['n'] <= stats['discrimination_n'] * (1 + RECOMPUTE_GROWTH):
+            return stats
+    stats = compute_stats(assignment)
+    try:
+        pipe = client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping=_to_fields(stats, layout))
+        pipe.expire(key, ANALYTICS_CACHE_TIMEOUT)
+        pipe.execute()
+    except RedisError:
+        logger.exception('Failed to store analytics for assignment %s', assignment.pk)
+    return stats
+
+
+def record_submission(assignment, answers, score):
+    """Fold a new submission into the stored statistics, if any are stored."""
+    answer_key = list(assignment.answer_key)
+    limits = _option_limits(assignment)
+    score = score or 0
+    increments = {'n': 1, 'score_sum': score, f'h:{_histogram_bin(score)}': 1}
+    row = answers_matrix([answers], len(answer_key))[0]
+    for i, answer in enumerate(row.tolist()):
+        if answer == NO_ANSWER or answer >= limits[i]:
+            increments[f'u:{i}'] = 1
+            continue
+        increments[f'o:{i}:{answer}'] = 1
+        if answer == answer_key[i]:
+            increments[f'c:{i}'] = 1
+    args = [item for pair in increments.items() for item in pair]
+    try:
+        get_redis().eval(_RECORD_SCRIPT, 1, _cache_key(assignment.pk), _layout(assignment), *args)
+    except RedisError:
+        logger.exception('Failed to record a submission in the analytics of assignment %s', assignment.pk)
+
+
+def invalidate(assignment_id):
+    try:
+        get_redis().delete(_cache_key(assignment_id))
+    except RedisError:
+        logger.exception('Failed to invalidate analytics for assignment %s', assignment_id)
+
+
+def build_report(assignment, stats):
+    """Shape cached statistics into the analytics API response."""
+    n = stats['n']
+    questions = []
+    for i, correct_option in enumerate(stats['answer_key']):
+        questions.append({
+            'index': i,
+            'correct_option': None if correct_option == NO_ANSWER else correct_option,
+            'correct_rate': round(stats['correct_counts'][i] / n, 4) if n else None,
+            'option_counts': stats['option_counts'][i],
+            'unanswered': stats['unanswered'][i],
+            'discrimination': stats['discrimination'][i],
+        })
+    step = 100 // HISTOGRAM_BINS
+    return {
+        'assignment': assignment.pk,
+        'submission_count': n,
+        'average_score': round(stats['score_sum'] / n, 2) if n else None,
+        'score_histogram': {
+            'bins': [i * step for i in range(HISTOGRAM_BINS)],
+            'counts': stats['histogram'],
+        },
+        'questions': questions,
+    }
+
+
+def assignment_analytics(assignment):
+    if assignment.is_closed and assignment.final_analytics is not None:
+        return assignment.final_analytics
+    return build_report(assignment, get_stats(assignment))
+
+
+def finalize(assignment):
+    """Freeze the analytics report of a closed assignment on the row itself."""
+    report = build_report(assignment, compute_stats(assignment)) if assignment.assignment_type == 'quiz' else None
+    assignment.final_analytics = report
+    Assignment.objects.filter(pk=assignment.pk).update(final_analytics=report)
+    invalidate(assignment.pk)
+    return report
@@ -1,17 +1,35 @@
 import logging
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Exists, Max, OuterRef, Subquery
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, JSONParser
 from rest_framework.response import Response
 
-from notifications.utils import create_notification, create_bulk_notifications
+from notifications.utils import (
+    create_notification, create_bulk_notifications, defer_notification, coalesce_notification,
+)
 from accounts.models import User
-from .tasks import generate_assignment_task
-from .models import Course, CourseMaterial, Enrollment, Feedback, Assignment, AssignmentSubmission
+from .tasks import generate_assignment_task, rescore_assignment_task
+from .models import (
+    Course, CourseMaterial, Enrollment, Feedback, Assignment, AssignmentSubmission, CardReviewState,
+)
+from .scoring import score_answers
+from .variants import Variant
+from . import analytics as quiz_analytics
+from . import gradebook as course_gradebook
+from . import export
+from . import buffer as submission_buffer
+from . import drafts as submission_drafts
+from . import reviews as card_reviews
 from .serializers import (
     CourseSerializer, CourseMaterialSerializer, EnrollmentSerializer, FeedbackSerializer,
-    AssignmentSerializer, AssignmentSubmissionSerializer,
+    AssignmentSerializer, AssignmentListSerializer, AssignmentSubmissionSerializer, CardReviewStateSerializer,
 )
 
 logger = logging.getLogger(__name__)
@@ -45,38 +63,51 @@ class CourseViewSet(viewsets.ModelViewSet):
         course = self.get_object()
         if not request.user.is_student():
             return Response({'error': 'Only students can enroll'}, status=status.HTTP_403_FORBIDDEN)
-        enrollment, created = Enrollment.objects.get_or_create(
-            student=request.user, course=course, defaults={'is_active': True}
-        )
-        reactivated = False
-        if not created and not enrollment.is_active:
-            enrollment.is_active = True
-            enrollment.save()
-            reactivated = True
-        if created or reactivated:
-            create_notification(
-                recipient=course.teacher,
-                notification_type='enrollment',
-                title=f'New enrollment in {course.code}',
-                message=f'{request.user.username} has enrolled in {course.title}.',
-                link=f'/courses/{course.pk}/',
+        # The enrollment and the teacher's outbox row commit together
+        with transaction.atomic():
+            enrollment, created = Enrollment.objects.get_or_create(
+                student=request.user, course=course, defaults={'is_active': True}
             )
+            reactivated = False
+            if not created and not enrollment.is_active:
+                enrollment.is_active = True
+                enrollment.save()
+                reactivated = True
+            if created or reactivated:
+                transaction.on_commit(lambda: course_gradebook.add_student(course.pk, request.user), robust=True)
+                coalesce_notification(
+                    recipient_id=course.teacher_id,
+                    notification_type='enrollment',
+                    target=f'course:{course.pk}:enrolled',
+                    title=f'New enrollment in {course.code}',
+                    message=f'{request.user.username} has enrolled in {course.title}.',
+                    link=f'/courses/{course.pk}/',
+                    summary_title=f'{{count}} new enrollments in {course.code}',
+                    summary_message=f'{{count}} students have enrolled in {course.title}.',
+                )
         return Response({'message': 'Enrolled successfully'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def unenroll(self, request, pk=None):
         course = self.get_object()
         try:
-            enrollment = Enrollment.objects.get(student=request.user, course=course)
-            enrollment.is_active = False
-            enrollment.save()
-            create_notification(
-                recipient=course.teacher,
-                notification_type='enrollment',
-                title=f'Student left {course.code}',
-                message=f'{request.user.username} has unenrolled from {course.title}.',
-                link=f'/courses/{course.pk}/',
-            )
+            with transaction.atomic():
+                enrollment = Enrollment.objects.get(student=request.user, course=course)
+                enrollment.is_active = False
+                enrollment.save()
+                transaction.on_commit(
+                    lambda: course_gradebook.remove_student(course.pk, request.user.pk), robust=True,
+                )
+                coalesce_notification(
+                    recipient_id=course.teacher_id,
+                    notification_type='enrollment',
+                    target=f'course:{course.pk}:unenrolled',
+                    title=f'Student left {course.code}',
+                    message=f'{request.user.username} has unenrolled from {course.title}.',
+                    link=f'/courses/{course.pk}/',
+                    summary_title=f'{{count}} students left {course.code}',
+                    summary_message=f'{{count}} students have unenrolled from {course.title}.',
+                )
             return Response({'message': 'Unenrolled successfully'})
         except Enrollment.DoesNotExist:
             return Response({'error': 'Not enrolled'}, status=status.HTTP_400_BAD_REQUEST)
@@ -87,16 +118,20 @@ class CourseViewSet(viewsets.ModelViewSet):
         if course.teacher != request.user:
             return Response({'error': 'Only the course teacher can block students'}, status=status.HTTP_403_FORBIDDEN)
         try:
-            enrollment = Enrollment.objects.select_related('student').get(student_id=student_id, course=course)
-            enrollment.is_active = False
-            enrollment.save()
-            create_notification(
-                recipient=enrollment.student,
-                notification_type='enrollment',
-                title=f'Removed from {course.code}',
-                message=f'You have been removed from "{course.title}" by the teacher.',
-                link=f'/courses/{course.pk}/',
-            )
+            with transaction.atomic():
+                enrollment = Enrollment.objects.select_related('student').get(student_id=student_id, course=course)
+                enrollment.is_active = False
+                enrollment.save()
+                transaction.on_commit(
+                    lambda: course_gradebook.remove_student(course.pk, enrollment.student_id), robust=True,
+                )
+                create_notification(
+                    recipient=enrollment.student,
+                    notification_type='enrollment',
+                    title=f'Removed from {course.code}',
+                    message=f'You have been removed from "{course.title}" by the teacher.',
+                    link=f'/courses/{course.pk}/',
+                )
             return Response({'message': 'Student blocked from course'})
         except Enrollment.DoesNotExist:
             return Response({'error': 'Student not enrolled'}, status=status.HTTP_400_BAD_REQUEST)
@@ -110,6 +145,14 @@ class CourseViewSet(viewsets.ModelViewSet):
         serializer = EnrollmentSerializer(enrollments, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def gradebook(self, request, pk=None):
+        """Student x assignment score matrix for the course, in columnar form."""
+        course = self.get_object()
+        if course.teacher != request.user:
+            return Response({'error': 'Only the course teacher can view the gradebook'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(course_gradebook.get(course.pk))
+
     @action(detail=True, methods=['get'])
     def materials(self, request, pk=None):
         course = self.get_object()
@@ -137,21 +180,23 @@ class CourseViewSet(viewsets.ModelViewSet):
             return Response({'error': 'User is not a student'}, status=status.HTTP_400_BAD_REQUEST)
         if student.is_blocked:
             return Response({'error': 'This user is blocked'}, status=status.HTTP_400_BAD_REQUEST)
-        enrollment, created = Enrollment.objects.get_or_create(
-            student=student, course=course, defaults={'is_active': True}
-        )
-        if not created and not enrollment.is_active:
-            enrollment.is_active = True
-            enrollment.save()
-        elif not created:
-            return Response({'message': 'Student is already enrolled'}, status=status.HTTP_200_OK)
-        create_notification(
-            recipient=student,
-            notification_type='enrollment',
-            title=f'Added to {course.title}',
-            message=f'You have been added to "{course.title}" by {request.user.full_name or request.user.username}.',
-            link=f'/courses/{course.id}',
-        )
+        with transaction.atomic():
+            enrollment, created = Enrollment.objects.get_or_create(
+                student=student, course=course, defaults={'is_active': True}
+            )
+            if not created and not enrollment.is_active:
+                enrollment.is_active = True
+                enrollment.save()
+            elif not created:
+                return Response({'message': 'Student is already enrolled'}, status=status.HTTP_200_OK)
+            transaction.on_commit(lambda: course_gradebook.add_student(course.pk, student), robust=True)
+            create_notification(
+                recipient=student,
+                notification_type='enrollment',
+                title=f'Added to {course.title}',
+                message=f'You have been added to "{course.title}" by {request.user.full_name or request.user.username}.',
+                link=f'/courses/{course.id}',
+            )
         serializer = EnrollmentSerializer(enrollment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -257,8 +302,22 @@ class AssignmentViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, JSONParser]
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return AssignmentListSerializer
+        return AssignmentSerializer
+
     def get_queryset(self):
-        qs = Assignment.objects.select_related('course', 'created_by')
+        qs = Assignment.objects.select_related('course', 'created_by').annotate(
+            submission_count=Count('submissions'),
+            average_score=Avg('submissions__score'),
+        )
+        if self.action == 'list':
+            # Content can be large; it is only served from the detail endpoint
+            qs = qs.defer('content', 'student_content', 'final_analytics')
+        elif self.request.user.is_student():
+            # Students are served the pre-rendered copy without answer keys
+            qs = qs.defer('content', 'final_analytics')
         course_id = self.request.query_params.get('course')
         if course_id:
             qs = qs.filter(course_id=course_id)
@@ -267,7 +326,13 @@ class AssignmentViewSet(viewsets.ModelViewSet):
             enrolled_courses = Enrollment.objects.filter(
                 student=self.request.user, is_active=True
             ).values_list('course_id', flat=True)
-            qs = qs.filter(course_id__in=enrolled_courses)
+            own_submission = AssignmentSubmission.objects.filter(
+                assignment=OuterRef('pk'), student=self.request.user
+            )
+            qs = qs.filter(course_id__in=enrolled_courses).annotate(
+                has_submitted=Exists(own_submission),
+                my_score=Subquery(own_submission.values('score')[:1]),
+            )
         elif self.request.user.is_teacher():
             qs = qs.filter(course__teacher=self.request.user)
         return qs
@@ -279,7 +344,8 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         course = serializer.validated_data.get('course')
         if course and course.teacher != self.request.user:
             raise PermissionDenied('You can only create assignments for your own courses.')
-        serializer.save(created_by=self.request.user)
+        assignment = serializer.save(created_by=self.request.user)
+        course_gradebook.add_assignment(assignment)
 
     def _notify_deadline(self, assignment):
         """Send deadline notification to all actively enrolled students."""
@@ -303,15 +369,91 @@ class AssignmentViewSet(viewsets.ModelViewSet):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('You can only edit your own assignments.')
         old_deadline = serializer.instance.deadline
-        assignment = serializer.save()
-        if assignment.deadline and assignment.deadline != old_deadline:
-            self._notify_deadline(assignment)
+        old_answer_key = serializer.instance.answer_key
+        deadline = serializer.validated_data.get('deadline', old_deadline)
+        with transaction.atomic():
+            if serializer.instance.is_closed and (deadline is None or deadline > timezone.now()):
+                # Extending the deadline reopens the assignment
+                assignment = serializer.save(is_closed=False, final_analytics=None)
+            else:
+                assignment = serializer.save()
+            if assignment.deadline and assignment.deadline != old_deadline:
+                self._notify_deadline(assignment)
+        if 'title' in serializer.validated_data:
+            course_gradebook.invalidate(assignment.course_id)
+        if assignment.assignment_type == 'quiz' and assignment.answer_key != old_answer_key:
+            transaction.on_commit(lambda: rescore_assignment_task.delay(assignment.pk))
 
     def perform_destroy(self, instance):
         if instance.created_by != self.request.user:
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('You can only delete your own assignments.')
         instance.delete()
+        course_gradebook.invalidate(instance.course_id)
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """Per-question correctness, distractor counts, score histogram and discrimination index."""
+        assignment = self.get_object()
+        if assignment.course.teacher != request.user:
+            return Response({'error': 'Only the course teacher can view analytics'}, status=status.HTTP_403_FORBIDDEN)
+        if assignment.assignment_type != 'quiz':
+            return Response({'error': 'Analytics are only available for quizzes'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(quiz_analytics.assignment_analytics(assignment))
+
+    @action(detail=True, methods=['get', 'patch', 'delete'])
+    def draft(self, request, pk=None):
+        """Autosaved in-progress answers for the current student.
+
+        PATCH takes ``{"answers": {"<question index>": <option index or null>}}``
+        and only touches the given questions. Submitting without ``answers``
+        promotes the draft.
+        """
+        if not request.user.is_student():
+            return Response({'error': 'Only students have drafts'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            pk = int(pk)
+        except ValueError:
+            return Response({'error': 'Assignment not found'}, status=status.HTTP_404_NOT_FOUND)
+        # A narrow lookup instead of get_object(): autosave runs every few seconds per student
+        assignment = Assignment.objects.filter(
+            pk=pk, course__enrollments__student=request.user, course__enrollments__is_active=True,
+        ).values('question_count', 'is_closed', 'deadline').first()
+        if assignment is None:
+            return Response({'error': 'Assignment not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.method == 'DELETE':
+            submission_drafts.discard(pk, request.user.pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if request.method == 'GET':
+            draft = submission_drafts.load(pk, request.user.pk)
+            if draft is None:
+                return Response({'error': 'No draft saved'}, status=status.HTTP_404_NOT_FOUND)
+            answers, updated_at = draft
+        else:
+            if assignment['is_closed'] or (assignment['deadline'] and assignment['deadline'] <= timezone.now()):
+                return Response({'error': 'This assignment is closed for submissions.'}, status=status.HTTP_403_FORBIDDEN)
+            changes = request.data.get('answers')
+            if not isinstance(changes, dict) or not changes:
+                return Response({'error': 'answers must be an object of question index to answer'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                changes = {int(index): answer for index, answer in changes.items()}
+            except ValueError:
+                return Response({'error': 'Question indexes must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+            for index, answer in changes.items():
+                if not 0 <= index < assignment['question_count']:
+                    return Response({'error': f'No question at index {index}'}, status=status.HTTP_400_BAD_REQUEST)
+                if answer is not None and (not isinstance(answer, int) or isinstance(answer, bool) or answer < 0):
+                    return Response({'error': 'Answers must be option indexes or null'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+            answers, updated_at = submission_drafts.update(pk, request.user.pk, changes)
+        return Response({
+            'assignment': pk,
+            'answers': submission_drafts.as_list(answers, assignment['question_count']),
+            'updated_at': updated_at,
+        })
 
     @action(detail=False, methods=['post'])
     def generate(self, request):
@@ -379,6 +521,8 @@ class AssignmentViewSet(viewsets.ModelViewSet):
 class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
     serializer_class = AssignmentSubmissionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Submissions are final: updates would bypass the closed check, scoring and canonical answer order
+    http_method_names = ['get', 'post', 'head', 'options']
 
     def get_queryset(self):
         qs = AssignmentSubmission.objects.select_related('assignment', 'student')
@@ -391,32 +535,219 @@ class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
             qs = qs.filter(assignment__course__teacher=self.request.user)
         return qs
 
-    def perform_create(self, serializer):
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all submissions of a course or assignment as CSV or columnar binary.
+
+        Query params: ``course`` or ``assignment`` (one is required) and
+        ``output`` (``csv`` or ``columnar``, default ``csv``). Responses carry an
+        ETag that only changes when submissions change, so clients and proxies
+        can revalidate instead of downloading again.
+        """
+        if not request.user.is_teacher():
+            return Response({'error': 'Only teachers can export submissions'}, status=status.HTTP_403_FORBIDDEN)
+        output = request.query_params.get('output', 'csv')
+        if output not in ('csv', 'columnar'):
+            return Response({'error': 'output must be "csv" or "columnar"'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            assignment_id = int(request.query_params.get('assignment') or 0)
+            course_id = int(request.query_params.get('course') or 0)
+        except ValueError:
+            return Response({'error': 'course and assignment must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        assignments = Assignment.objects.filter(course__teacher=request.user)
+        if assignment_id:
+            assignments = assignments.filter(pk=assignment_id)
+        elif course_id:
+            assignments = assignments.filter(course_id=course_id)
+        else:
+            return Response({'error': 'course or assignment is required'}, status=status.HTTP_400_BAD_REQUEST)
+        question_count = assignments.aggregate(n=Max('question_count'))['n']
+        if question_count is None:
+            return Response({'error': 'No matching assignments found'}, status=status.HTTP_404_NOT_FOUND)
+
+        submissions = AssignmentSubmission.objects.filter(assignment__in=assignments.values('pk'))
+        etag = quote_etag(export.export_etag(submissions, output))
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return HttpResponseNotModified(headers={'ETag': etag})
+        if output == 'csv':
+            response = StreamingHttpResponse(export.iter_csv(submissions, question_count), content_type='text/csv')
+            filename = 'submissions.csv'
+        else:
+            response = StreamingHttpResponse(
+                export.iter_columnar(submissions, question_count), content_type='application/octet-stream',
+            )
+            filename = 'submissions.subx'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def _check_can_submit(self, assignment):
         from rest_framework.exceptions import PermissionDenied
-        assignment = serializer.validated_data.get('assignment')
+        if assignment and (
+            assignment.is_closed or (assignment.deadline and assignment.deadline <= timezone.now())
+        ):
+            raise PermissionDenied('This assignment is closed for submissions.')
         if assignment and not Enrollment.objects.filter(
-            student=self.request.user, course=assignment.course, is_active=True
+            student=self.request.user, course_id=assignment.course_id, is_active=True
         ).exists():
             raise PermissionDenied('You must be enrolled in this course to submit.')
-        submission = serializer.save(student=self.request.user)
-        # Auto-score quizzes
-        assignment = submission.assignment
-        if assignment.assignment_type == 'quiz':
-            questions = assignment.content.get('questions', [])
-            answers = submission.answers  # list of selected indices
-            if questions and isinstance(answers, list):
-                correct = 0
-                for i, q in enumerate(questions):
-                    if i < len(answers) and answers[i] == q.get('correct'):
-                        correct += 1
-                submission.score = int((correct / len(questions)) * 100)
-                submission.save(update_fields=['score'])
-        # Notify the course teacher
-        create_notification(
-            recipient=assignment.course.teacher,
-            notification_type='general',
-            title=f'New submission for {assignment.title}',
-            message=f'{self.request.user.username} submitted "{assignment.title}" in {assignment.course.title}.',
-            link=f'/assignments/{assignment.id}',
+
+    def _submission_data(self, request):
+        """Fill in the answers from the student's draft when the submit omits them."""
+        data = request.data
+        if 'answers' in data or not isinstance(data, dict):
+            return data
+        try:
+            assignment_id = int(data.get('assignment'))
+        except (TypeError, ValueError):
+            return data
+        draft = submission_drafts.load(assignment_id, request.user.pk)
+        if draft is None:
+            return data
+        return {**data, 'answers': submission_drafts.as_list(draft[0])}
+
+    def _canonical_answers(self, assignment, answers):
+        variant = Variant.for_assignment(assignment, self.request.user.pk)
+        return variant.to_canonical(answers) if variant else answers
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=self._submission_data(request))
+        serializer.is_valid(raise_exception=True)
+        if not settings.SUBMISSION_BUFFER_ENABLED:
+            self.perform_create(serializer)
+            headers = self.get_success_headers(serializer.data)
+            return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        # High-throughput mode: acknowledge with a receipt and let the flusher write the row
+        assignment = serializer.validated_data['assignment']
+        self._check_can_submit(assignment)
+        if AssignmentSubmission.objects.filter(assignment=assignment, student=request.user).exists():
+            return Response({'error': 'You have already submitted this assignment.'}, status=status.HTTP_400_BAD_REQUEST)
+        answers = self._canonical_answers(assignment, serializer.validated_data.get('answers', []))
+        receipt = submission_buffer.enqueue(assignment, request.user, answers)
+        if receipt is None:
+            return Response({'error': 'A submission for this assignment is already being processed.'}, status=status.HTTP_409_CONFLICT)
+        transaction.on_commit(
+            lambda: submission_drafts.discard(assignment.pk, request.user.pk, delete_checkpoint=False), robust=True,
         )
+        return Response(receipt, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'receipts/(?P<receipt>[0-9a-f]{32})')
+    def receipt(self, request, receipt=None):
+        """Status of a buffered submission: pending, persisted or rejected."""
+        data = submission_buffer.receipt_status(receipt)
+        if not data or int(data['student_id']) != request.user.pk:
+            return Response({'error': 'Receipt not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'receipt': receipt,
+            'status': data['status'],
+            'detail': data.get('detail', ''),
+            'assignment': int(data['assignment_id']),
+            'received_at': data['received_at'],
+        })
+
+    def perform_create(self, serializer):
+        assignment = serializer.validated_data.get('assignment')
+        self._check_can_submit(assignment)
+        answers = self._canonical_answers(assignment, serializer.validated_data.get('answers', []))
+        # Score before inserting so the submission row is written exactly once
+        score = None
+        if assignment.assignment_type == 'quiz':
+            score = score_answers(assignment.answer_key, answers)
+        # The submission and the teacher's outbox row commit together; Redis is only
+        # touched once they have
+        with transaction.atomic():
+            submission = serializer.save(student=self.request.user, answers=answers, score=score)
+            if assignment.assignment_type == 'quiz':
+                transaction.on_commit(
+                    lambda: quiz_analytics.record_submission(assignment, submission.answers, submission.score),
+                    robust=True,
+                )
+            transaction.on_commit(
+                lambda: course_gradebook.record_score(
+                    assignment.course_id, assignment.pk, submission.student_id, submission.score,
+                ),
+                robust=True,
+            )
+            transaction.on_commit(
+                lambda: submission_drafts.discard(assignment.pk, submission.student_id, delete_checkpoint=False),
+                robust=True,
+            )
+            defer_notification(
+                recipient_id=assignment.course.teacher_id,
+                notification_type='general',
+                title=f'New submission for {assignment.title}',
+                message=f'{self.request.user.username} submitted "{assignment.title}" in {assignment.course.title}.',
+                link=f'/assignments/{assignment.id}',
+                target=f'assignment:{assignment.pk}:submissions',
+                summary_title=f'{{count}} new submissions for {assignment.title}',
+                summary_message=f'{{count}} students submitted "{assignment.title}" in {assignment.course.title}.',
+            )
         return submission
+
+
+class CardReviewViewSet(viewsets.GenericViewSet):
+    """Spaced-repetition review queue over the flashcard assignments a student studies."""
+    serializer_class = CardReviewStateSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return CardReviewState.objects.filter(student=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def due(self, request):
+        """Cards due for review, oldest first.
+
+        Query params: ``assignment`` (optional; also starts any cards of that
+        flashcard set the student has not seen), ``limit`` and ``after`` (the
+        ``next`` cursor of the previous page).
+        """
+        if not request.user.is_student():
+            return Response({'error': 'Only students can review flashcards'}, status=status.HTTP_403_FORBIDDEN)
+        assignment_id = request.query_params.get('assignment')
+        if assignment_id:
+            try:
+                assignment_id = int(assignment_id)
+            except ValueError:
+                return Response({'error': 'Flashcard assignment not found'}, status=status.HTTP_404_NOT_FOUND)
+            assignment = Assignment.objects.filter(
+                pk=assignment_id, assignment_type='flashcard',
+                course__enrollments__student=request.user, course__enrollments__is_active=True,
+            ).only('id', 'question_count').first()
+            if assignment is None:
+                return Response({'error': 'Flashcard assignment not found'}, status=status.HTTP_404_NOT_FOUND)
+            card_reviews.start(request.user, assignment)
+        try:
+            limit = min(int(request.query_params.get('limit', card_reviews.DEFAULT_PAGE_SIZE)),
+                        card_reviews.MAX_PAGE_SIZE)
+            after = request.query_params.get('after')
+            after = card_reviews.decode_cursor(after) if after else None
+        except (ValueError, OverflowError):
+            return Response({'error': 'Invalid limit or cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'Invalid limit or cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        states, next_cursor = card_reviews.due_cards(request.user, assignment_id or None, after, limit)
+        serializer = self.get_serializer(states, many=True, context={
+            **self.get_serializer_context(), 'cards': card_reviews.cards_for(states),
+        })
+        return Response({'results': serializer.data, 'next': next_cursor})
+
+    @action(detail=False, methods=['post'])
+    def review(self, request):
+        """Record a batch of reviews: ``{"reviews": [{"id": <state id>, "quality": 0-5}, ...]}``."""
+        if not request.user.is_student():
+            return Response({'error': 'Only students can review flashcards'}, status=status.HTTP_403_FORBIDDEN)
+        items = request.data.get('reviews')
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'reviews must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        results = {}
+        for item in items:
+            quality = item.get('quality') if isinstance(item, dict) else None
+            state_id = item.get('id') if isinstance(item, dict) else None
+            if (not isinstance(state_id, int) or not isinstance(quality, int)
+                    or isinstance(quality, bool) or not 0 <= quality <= 5):
+                return Response({'error': 'Each review needs an integer id and a quality from 0 to 5'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            results[state_id] = quality
+        states = card_reviews.record_reviews(request.user, results)
+        return Response(self.get_serializer(states, many=True).data)
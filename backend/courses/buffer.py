@@ -0,0 +1,226 @@
+"""
+Write-behind buffer for assignment submissions.
+
+In high-throughput mode (``settings.SUBMISSION_BUFFER_ENABLED``) the API
+validates a submission, issues a receipt and appends it to a Redis stream
+instead of writing to the database. ``flush`` is run by a Celery worker: it
+reads batches from the stream through a consumer group, scores them and
+bulk-inserts them, then records the outcome of each receipt. Entries are only
+acknowledged after they are persisted, so a crashed flusher's batch is
+claimed again by the next run. An entry that cannot be parsed, scored or
+inserted is acknowledged with a 'rejected' receipt on its own, so it never
+holds back the rest of the stream.
+
+Deadlines are checked against the time the receipt was issued, not the time
+the entry is flushed.
+"""
+import json
+import logging
+import os
+import socket
+import uuid
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.redis import get_redis
+from .models import Assignment, AssignmentSubmission
+from .scoring import score_answers
+
+logger = logging.getLogger(__name__)
+
+STREAM = 'submissions:buffer'
+GROUP = 'submission-flushers'
+RECEIPT_TTL = 60 * 60 * 24 * 7
+# Entries left unacknowledged this long (a flusher died mid-batch) are claimed again
+CLAIM_IDLE_MS = 60 * 1000
+
+
+def _receipt_key(receipt):
+    return f'submissions:receipt:{receipt}'
+
+
+def _pending_key(assignment_id, student_id):
+    return f'submissions:pending:{assignment_id}:{student_id}'
+
+
+def enqueue(assignment, student, answers):
+    """Append a validated submission to the stream and return its receipt.
+
+    Returns None if the student already has a submission for this assignment
+    waiting in the buffer.
+    """
+    client = get_redis()
+    receipt = uuid.uuid4().hex
+    received_at = timezone.now()
+    if not client.set(_pending_key(assignment.pk, student.pk), receipt, nx=True, ex=RECEIPT_TTL):
+        return None
+    pipe = client.pipeline()
+    pipe.hset(_receipt_key(receipt), mapping={
+        'status': 'pending',
+        'student_id': student.pk,
+        'assignment_id': assignment.pk,
+        'received_at': received_at.isoformat(),
+    })
+    pipe.expire(_receipt_key(receipt), RECEIPT_TTL)
+    pipe.xadd(STREAM, {
+        'receipt': receipt,
+        'assignment_id': assignment.pk,
+        'student_id': student.pk,
+        'answers': json.dumps(answers),
+        'received_at': received_at.isoformat(),
+    })
+    pipe.execute()
+    return {'receipt': receipt, 'status': 'pending', 'received_at': received_at}
+
+
+def receipt_status(receipt):
+    data = get_redis().hgetall(_receipt_key(receipt))
+    return data or None
+
+
+def persist_entries(entries):
+    """Score and bulk-insert buffered submissions.
+
+    ``entries`` are dicts with ``receipt``, ``assignment_id``, ``student_id``,
+    ``answers`` (a list) and ``received_at`` (an aware datetime). Returns
+    ``({receipt: (status, detail)}, inserted_submissions)``; only rows that
+    were actually inserted are reported as persisted.
+    """
+    assignment_ids = {entry['assignment_id'] for entry in entries}
+    assignments = Assignment.objects.select_related('course').defer('content', 'student_content', 'final_analytics').in_bulk(
+        assignment_ids
+    )
+    existing = set(AssignmentSubmission.objects.filter(
+        assignment_id__in=assignment_ids,
+        student_id__in={entry['student_id'] for entry in entries},
+    ).values_list('assignment_id', 'student_id'))
+    results = {}
+    pending = []
+    for entry in entries:
+        assignment = assignments.get(entry['assignment_id'])
+        if assignment is None:
+            results[entry['receipt']] = ('rejected', 'Assignment no longer exists.')
+            continue
+        if (entry['assignment_id'], entry['student_id']) in existing:
+            results[entry['receipt']] = ('rejected', 'Already submitted.')
+            continue
+        if assignment.deadline and entry['received_at'] > assignment.deadline:
+            results[entry['receipt']] = ('rejected', 'Received after the deadline.')
+            continue
+        try:
+            score = None
+            if assignment.assignment_type == 'quiz':
+                score = score_answers(assignment.answer_key, entry['answers'])
+        except Exception:
+            logger.exception('Could not score buffered submission %s', entry['receipt'])
+            results[entry['receipt']] = ('rejected', 'Could not be scored.')
+            continue
+        pending.append((entry['receipt'], AssignmentSubmission(
+            assignment=assignment,
+            student_id=entry['student_id'],
+            answers=entry['answers'],
+            score=score,
+            submitted_at=entry['received_at'],
+        )))
+
+    submissions = []
+    try:
+        with transaction.atomic():
+            AssignmentSubmission.objects.bulk_create([submission for _, submission in pending])
+        submissions = [submission for _, submission in pending]
+        results.update((receipt, ('persisted', '')) for receipt, _ in pending)
+    except DatabaseError:
+        # A submission raced in through another path, or one row is bad: find out which, row by row
+        for receipt, submission in pending:
+            submission.pk = None
+            try:
+                with transaction.atomic():
+                    submission.save(force_insert=True)
+            except IntegrityError:
+                results[receipt] = ('rejected', 'Already submitted.')
+            except DatabaseError:
+                logger.exception('Could not save buffered submission %s', receipt)
+                results[receipt] = ('rejected', 'Could not be saved.')
+            else:
+                submissions.append(submission)
+                results[receipt] = ('persisted', '')
+    return results, submissions
+
+
+def _parse(fields):
+    received_at = parse_datetime(fields['received_at'])
+    if received_at is None:
+        raise ValueError(f"Invalid received_at {fields['received_at']!r}")
+    return {
+        'receipt': fields['receipt'],
+        'assignment_id': int(fields['assignment_id']),
+        'student_id': int(fields['student_id']),
+        'answers': json.loads(fields['answers']),
+        'received_at': received_at,
+    }
+
+
+def _ensure_group(client):
+    try:
+        client.xgroup_create(STREAM, GROUP, id='0', mkstream=True)
+    except Exception as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def flush(batch_size=None, on_persisted=None):
+    """Drain the stream in batches; return the number of entries processed.
+
+    ``on_persisted`` is called with the list of inserted submissions after each
+    batch commits (used to update analytics, gradebooks and notifications).
+    """
+    batch_size = batch_size or settings.SUBMISSION_BUFFER_BATCH_SIZE
+    client = get_redis()
+    _ensure_group(client)
+    consumer = f'{socket.gethostname()}-{os.getpid()}'
+    processed = 0
+    while True:
+        # Reclaim entries a dead flusher read but never acknowledged, then read new ones
+        _, claimed, *_ = client.xautoclaim(STREAM, GROUP, consumer, CLAIM_IDLE_MS, '0-0', count=batch_size)
+        messages = claimed
+        if len(messages) < batch_size:
+            response = client.xreadgroup(GROUP, consumer, {STREAM: '>'}, count=batch_size - len(messages))
+            for _, stream_messages in response or []:
+                messages.extend(stream_messages)
+        if not messages:
+            return processed
+
+        entries = []
+        malformed = []
+        for message_id, fields in messages:
+            try:
+                entries.append(_parse(fields))
+            except (KeyError, TypeError, ValueError):
+                logger.exception('Dropping malformed buffered submission %s', message_id)
+                malformed.append(fields)
+        results, submissions = persist_entries(entries)
+
+        pipe = client.pipeline()
+        for entry in entries:
+            outcome, detail = results[entry['receipt']]
+            pipe.hset(_receipt_key(entry['receipt']), mapping={'status': outcome, 'detail': detail})
+            pipe.delete(_pending_key(entry['assignment_id'], entry['student_id']))
+        for fields in malformed:
+            if 'receipt' in fields:
+                pipe.hset(_receipt_key(fields['receipt']), mapping={'status': 'rejected', 'detail': 'Malformed submission.'})
+            if 'assignment_id' in fields and 'student_id' in fields:
+                pipe.delete(_pending_key(fields['assignment_id'], fields['student_id']))
+        message_ids = [message_id for message_id, _ in messages]
+        pipe.xack(STREAM, GROUP, *message_ids)
+        pipe.xdel(STREAM, *message_ids)
+        pipe.execute()
+
+        if on_persisted and submissions:
+            try:
+                on_persisted(submissions)
+            except Exception:
+                logger.exception('Post-processing of buffered submissions failed')
+        processed += len(messages)
@@ -0,0 +1,150 @@
+"""
+Server-side autosave for in-progress quiz answers.
+
+A draft is a Redis hash keyed by assignment and student whose fields are
+question indexes and whose values are JSON-encoded answers, so a PATCH that
+changes one answer is a single ``HSET`` regardless of quiz length. Each write
+refreshes the TTL and marks the draft dirty; ``checkpoint`` (run periodically
+by Celery) upserts the dirty drafts into ``SubmissionDraft`` in bulk, so
+however often a student types the database sees at most one write per draft
+per checkpoint interval. Reads fall back to the checkpoint when the hash is
+gone. Submitting only drops the Redis hash; checkpoints of submitted
+attempts are deleted by the checkpoint task, so a submission costs no extra
+query.
+"""
+import json
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.redis import get_redis
+from .models import Assignment, AssignmentSubmission, SubmissionDraft
+
+DIRTY_SET = 'drafts:dirty'
+UPDATED_FIELD = '_updated_at'
+
+
+def _key(assignment_id, student_id):
+    return f'drafts:{assignment_id}:{student_id}'
+
+
+def _decode(fields):
+    """Split a Redis hash into ``({index: answer}, updated_at)``."""
+    updated_at = parse_datetime(fields.pop(UPDATED_FIELD, '') or '')
+    return {int(index): json.loads(value) for index, value in fields.items()}, updated_at
+
+
+def as_list(answers, length=0):
+    """Turn ``{index: answer}`` into the list stored on a submission, padding gaps with None."""
+    length = max(length, max(answers, default=-1) + 1)
+    return [answers.get(i) for i in range(length)]
+
+
+def update(assignment_id, student_id, changes):
+    """Apply ``{index: answer}`` changes (None clears an answer) and return the full draft."""
+    key = _key(assignment_id, student_id)
+    now = timezone.now()
+    values = {str(i): json.dumps(answer) for i, answer in changes.items() if answer is not None}
+    cleared = [str(i) for i, answer in changes.items() if answer is None]
+    pipe = get_redis().pipeline()
+    if cleared:
+        pipe.hdel(key, *cleared)
+    pipe.hset(key, mapping={**values, UPDATED_FIELD: now.isoformat()})
+    pipe.expire(key, settings.SUBMISSION_DRAFT_TTL)
+    pipe.sadd(DIRTY_SET, f'{assignment_id}:{student_id}')
+    pipe.hgetall(key)
+    answers, _ = _decode(pipe.execute()[-1])
+    return answers, now
+
+
+def load(assignment_id, student_id):
+    """Return ``(answers, updated_at)`` for a draft, or None if there is none."""
+    key = _key(assignment_id, student_id)
+    client = get_redis()
+    fields = client.hgetall(key)
+    if fields:
+        return _decode(fields)
+    draft = SubmissionDraft.objects.filter(
+        assignment_id=assignment_id, student_id=student_id,
+    ).values_list('answers', 'updated_at').first()
+    if draft is None:
+        return None
+    answers, updated_at = draft
+    # Warm Redis again so the next PATCH builds on the checkpoint
+    pipe = client.pipeline()
+    pipe.hset(key, mapping={**{k: json.dumps(v) for k, v in answers.items()}, UPDATED_FIELD: updated_at.isoformat()})
+    pipe.expire(key, settings.SUBMISSION_DRAFT_TTL)
+    pipe.execute()
+    return {int(index): answer for index, answer in answers.items()}, updated_at
+
+
+def discard(assignment_id, student_id, delete_checkpoint=True):
+    """Drop a draft; ``delete_checkpoint=False`` leaves its checkpoint to ``prune_submitted``."""
+    pipe = get_redis().pipeline()
+    pipe.delete(_key(assignment_id, student_id))
+    pipe.srem(DIRTY_SET, f'{assignment_id}:{student_id}')
+    pipe.execute()
+    if delete_checkpoint:
+        SubmissionDraft.objects.filter(assignment_id=assignment_id, student_id=student_id).delete()
+
+
+def prune_submitted():
+    """Delete the checkpoints of attempts that have been submitted; return how many."""
+    submitted = AssignmentSubmission.objects.filter(
+        assignment_id=OuterRef('assignment_id'), student_id=OuterRef('student_id'),
+    )
+    return SubmissionDraft.objects.filter(Exists(submitted)).delete()[0]
+
+
+def save_checkpoints(drafts):
+    """Upsert ``{(assignment_id, student_id): (answers, updated_at)}`` into SubmissionDraft.
+
+    Drafts for deleted assignments or already submitted attempts are skipped.
+    Returns the number of rows written.
+    """
+    if not drafts:
+        return 0
+    assignment_ids = {assignment_id for assignment_id, _ in drafts}
+    student_ids = {student_id for _, student_id in drafts}
+    live = set(Assignment.objects.filter(pk__in=assignment_ids).values_list('pk', flat=True))
+    submitted = set(AssignmentSubmission.objects.filter(
+        assignment_id__in=assignment_ids, student_id__in=student_ids,
+    ).values_list('assignment_id', 'student_id'))
+    rows = [
+        SubmissionDraft(
+            assignment_id=assignment_id, student_id=student_id, updated_at=updated_at,
+            answers={str(i): answer for i, answer in answers.items()},
+        )
+        for (assignment_id, student_id), (answers, updated_at) in drafts.items()
+        if assignment_id in live and (assignment_id, student_id) not in submitted
+    ]
+    SubmissionDraft.objects.bulk_create(
+        rows, update_conflicts=True,
+        unique_fields=['assignment', 'student'], update_fields=['answers', 'updated_at'],
+    )
+    return len(rows)
+
+
+def checkpoint(batch_size=None):
+    """Write every dirty draft to the database; return the number of rows written."""
+    batch_size = batch_size or settings.SUBMISSION_DRAFT_CHECKPOINT_BATCH_SIZE
+    client = get_redis()
+    written = 0
+    while True:
+        members = client.spop(DIRTY_SET, batch_size)
+        if not members:
+            return written
+        pipe = client.pipeline()
+        for member in members:
+            pipe.hgetall(_key(*member.split(':')))
+        drafts = {}
+        for member, fields in zip(members, pipe.execute()):
+            if not fields:
+                # Expired or discarded since it was marked dirty
+                continue
+            answers, updated_at = _decode(fields)
+            assignment_id, student_id = (int(part) for part in member.split(':'))
+            drafts[(assignment_id, student_id)] = (answers, updated_at or timezone.now())
+        written += save_checkpoints(drafts)
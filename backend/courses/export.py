@@ -0,0 +1,129 @@
+"""
+Streaming exports of assignment submissions.
+
+Rows are read with ``values_list(...).iterator()`` in fixed-size chunks and
+written out as they arrive, so memory use does not grow with the export.
+
+Two formats are produced:
+
+* CSV: ``student_id, assignment_id, score, submitted_at, q1..qN``.
+* Columnar binary (``.subx``), all integers little-endian::
+
+      header  b'SUBX' | uint8 version (2) | uint16 question count N
+      block   uint32 row count n
+              int64[n] student_id | int64[n] assignment_id
+              int32[n] score (-1 if unscored)
+              int64[n] submitted_at (microseconds since the Unix epoch)
+              int32[n * N] answers, row-major (-1 if unanswered)
+      ...     repeated; a block with n == 0 ends the stream
+
+  Version 1 streams used int16 scores and answers; ``read_columnar`` still
+  reads them.
+"""
+import csv
+import hashlib
+import struct
+
+import numpy as np
+from django.db.models import Count, Max, Sum
+
+from .scoring import answers_matrix
+
+EXPORT_CHUNK_SIZE = 5000
+COLUMNAR_MAGIC = b'SUBX'
+COLUMNAR_VERSION = 2
+# Width of the score and answer columns per format version
+_SMALL_INT = {1: '<i2', 2: '<i4'}
+
+EXPORT_FIELDS = ('student_id', 'assignment_id', 'score', 'submitted_at', 'answers')
+
+
+class _Echo:
+    """File-like object whose write() hands the value back, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def _chunks(queryset):
+    rows = queryset.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_etag(queryset, output):
+    """Cheap fingerprint of the export; it changes whenever a submission is added, removed or rescored."""
+    stats = queryset.aggregate(count=Count('pk'), last=Max('pk'), total=Sum('score'), updated=Max('updated_at'))
+    raw = f"{output}:{stats['count']}:{stats['last']}:{stats['total']}:{stats['updated']}:{queryset.query}"
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def iter_csv(queryset, question_count):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(
+        ['student_id', 'assignment_id', 'score', 'submitted_at']
+        + [f'q{i + 1}' for i in range(question_count)]
+    )
+    for chunk in _chunks(queryset):
+        lines = []
+        for student_id, assignment_id, score, submitted_at, answers in chunk:
+            answers = answers if isinstance(answers, list) else []
+            padded = (answers + [''] * question_count)[:question_count]
+            lines.append(writer.writerow(
+                [student_id, assignment_id, '' if score is None else score, submitted_at.isoformat()] + padded
+            ))
+        yield ''.join(lines)
+
+
+def iter_columnar(queryset, question_count):
+    small_int = _SMALL_INT[COLUMNAR_VERSION]
+    yield COLUMNAR_MAGIC + struct.pack('<BH', COLUMNAR_VERSION, question_count)
+    for chunk in _chunks(queryset):
+        student_ids, assignment_ids, scores, submitted_at, answers = zip(*chunk)
+        yield b''.join([
+            struct.pack('<I', len(chunk)),
+            np.asarray(student_ids, dtype='<i8').tobytes(),
+            np.asarray(assignment_ids, dtype='<i8').tobytes(),
+            np.asarray([-1 if s is None else s for s in scores], dtype=small_int).tobytes(),
+            np.asarray([int(t.timestamp() * 1_000_000) for t in submitted_at], dtype='<i8').tobytes(),
+            # answers_matrix already maps anything outside int32 to -1
+            answers_matrix(answers, question_count).astype(small_int).tobytes(),
+        ])
+    yield struct.pack('<I', 0)
+
+
+def read_columnar(data):
+    """Decode a columnar export back into a dict of NumPy arrays (used by tests and scripts)."""
+    if data[:4] != COLUMNAR_MAGIC:
+        raise ValueError('Not a columnar submission export')
+    version, question_count = struct.unpack_from('<BH', data, 4)
+    if version not in _SMALL_INT:
+        raise ValueError(f'Unsupported columnar export version {version}')
+    small_int = _SMALL_INT[version]
+    offset = 7
+    blocks = []
+    while True:
+        (n,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        if n == 0:
+            break
+        block = {}
+        for name, dtype, count in (
+            ('student_id', '<i8', n), ('assignment_id', '<i8', n), ('score', small_int, n),
+            ('submitted_at', '<i8', n), ('answers', small_int, n * question_count),
+        ):
+            block[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            offset += block[name].nbytes
+        block['answers'] = block['answers'].reshape(n, question_count)
+        blocks.append(block)
+    if not blocks:
+        return {'question_count': question_count, 'student_id': np.array([], dtype='<i8')}
+    result = {name: np.concatenate([b[name] for b in blocks]) for name in blocks[0]}
+    result['question_count'] = question_count
+    return result
@@ -0,0 +1,228 @@
+"""
+Per-course gradebook: a student x assignment score matrix kept in Redis.
+
+Each course has one hash holding the roster and assignment list (the
+layout) plus one field per scored cell (``<assignment id>:<student id>``).
+The hash is built once from the database and then patched as submissions
+are scored, students join or leave and assignments are added: a new score
+is a single HSET of its cell, so concurrent submissions never overwrite each
+other, and layout changes are applied with an optimistic WATCH/MULTI
+transaction. The teacher's gradebook view is one HGETALL. The payload is
+columnar: one list of student ids/names and, per assignment, one list of
+scores aligned with the students (``None`` where nothing was submitted).
+Without Redis the gradebook is built from the database on every read.
+"""
+import json
+import logging
+
+from redis.exceptions import RedisError
+
+from core.redis import get_redis
+from .models import Assignment, AssignmentSubmission, Enrollment
+
+logger = logging.getLogger(__name__)
+
+GRADEBOOK_CACHE_TIMEOUT = 60 * 60
+LAYOUT_FIELD = '_layout'
+
+# Only write into a gradebook that exists; a missing one is rebuilt on the next read
+_SET_CELL_SCRIPT = """
+if redis.call('hexists', KEYS[1], ARGV[1]) == 0 then return 0 end
+if ARGV[3] == '' then return redis.call('hdel', KEYS[1], ARGV[2]) end
+return redis.call('hset', KEYS[1], ARGV[2], ARGV[3])
+"""
+
+
+def _cache_key(course_id):
+    return f'course_gradebook:{course_id}'
+
+
+def _cell(assignment_id, student_id):
+    return f'{assignment_id}:{student_id}'
+
+
+def build(course_id):
+    """Build the gradebook for a course from the database with three queries."""
+    students = list(
+        Enrollment.objects.filter(course_id=course_id, is_active=True)
+        .order_by('student__username')
+        .values_list('student_id', 'student__username', 'student__full_name')
+    )
+    assignments = list(
+        Assignment.objects.filter(course_id=course_id)
+        .order_by('created_at', 'pk')
+        .values_list('pk', 'title', 'assignment_type')
+    )
+    student_index = {student_id: i for i, (student_id, _, _) in enumerate(students)}
+    assignment_index = {assignment_id: j for j, (assignment_id, _, _) in enumerate(assignments)}
+    scores = [[None] * len(students) for _ in assignments]
+    submissions = AssignmentSubmission.objects.filter(
+        assignment__course_id=course_id,
+        student_id__in=[student_id for student_id, _, _ in students],
+    ).values_list('assignment_id', 'student_id', 'score')
+    for assignment_id, student_id, score in submissions.iterator():
+        scores[assignment_index[assignment_id]][student_index[student_id]] = score
+
+    return {
+        'course': course_id,
+        'students': {
+            'id': [s[0] for s in students],
+            'username': [s[1] for s in students],
+            'full_name': [s[2] for s in students],
+        },
+        'assignments': {
+            'id': [a[0] for a in assignments],
+            'title': [a[1] for a in assignments],
+            'assignment_type': [a[2] for a in assignments],
+            'scores': scores,
+        },
+    }
+
+
+def _layout(gradebook):
+    assignments = {k: v for k, v in gradebook['assignments'].items() if k != 'scores'}
+    return json.dumps({**gradebook, 'assignments': assignments})
+
+
+def _store(client, course_id, gradebook):
+    cells = {
+        _cell(assignment_id, student_id): score
+        for assignment_id, column in zip(gradebook['assignments']['id'], gradebook['assignments']['scores'])
+        for student_id, score in zip(gradebook['students']['id'], column)
+        if score is not None
+    }
+    key = _cache_key(course_id)
+    pipe = client.pipeline()
+    pipe.delete(key)
+    pipe.hset(key, mapping={LAYOUT_FIELD: _layout(gradebook), **cells})
+    pipe.expire(key, GRADEBOOK_CACHE_TIMEOUT)
+    pipe.execute()
+
+
+def _assemble(fields):
+    gradebook = json.loads(fields.pop(LAYOUT_FIELD))
+    student_ids = gradebook['students']['id']
+    assignment_ids = gradebook['assignments']['id']
+    student_index = {student_id: i for i, student_id in enumerate(student_ids)}
+    assignment_index = {assignment_id: j for j, assignment_id in enumerate(assignment_ids)}
+    scores = [[None] * len(student_ids) for _ in assignment_ids]
+    for cell, score in fields.items():
+        assignment_id, student_id = (int(part) for part in cell.split(':'))
+        i, j = student_index.get(student_id), assignment_index.get(assignment_id)
+        # Cells of students who left or deleted assignments are ignored
+        if i is not None and j is not None:
+            scores[j][i] = int(score)
+    gradebook['assignments']['scores'] = scores
+    return gradebook
+
+
+def get(course_id):
+    try:
+        client = get_redis()
+        fields = client.hgetall(_cache_key(course_id))
+    except RedisError:
+        logger.warning('Gradebook store unavailable; building course %s from the database', course_id)
+        return build(course_id)
+    if LAYOUT_FIELD in fields:
+        return _assemble(fields)
+    gradebook = build(course_id)
+    try:
+        _store(client, course_id, gradebook)
+    except RedisError:
+        logger.exception('Failed to store the gradebook of course %s', course_id)
+    return gradebook
+
+
+def _update_layout(course_id, apply):
+    """Change the layout of a stored gradebook; nothing to do if it is not stored.
+
+    ``apply`` edits the layout in place and returns the cells to write
+    (``None`` deletes a cell), or False when the layout is unchanged.
+    """
+    key = _cache_key(course_id)
+
+    def update(pipe):
+        layout = pipe.hget(key, LAYOUT_FIELD)
+        if layout is None:
+            return
+        gradebook = json.loads(layout)
+        cells = apply(gradebook)
+        if cells is False:
+            return
+        pipe.multi()
+        pipe.hset(key, mapping={
+            LAYOUT_FIELD: json.dumps(gradebook),
+            **{cell: score for cell, score in cells.items() if score is not None},
+        })
+        cleared = [cell for cell, score in cells.items() if score is None]
+        if cleared:
+            pipe.hdel(key, *cleared)
+
+    try:
+        get_redis().transaction(update, key)
+    except RedisError:
+        logger.exception('Failed to update the gradebook of course %s', course_id)
+        invalidate(course_id)
+
+
+def record_score(course_id, assignment_id, student_id, score):
+    try:
+        get_redis().eval(
+            _SET_CELL_SCRIPT, 1, _cache_key(course_id),
+            LAYOUT_FIELD, _cell(assignment_id, student_id), '' if score is None else score,
+        )
+    except RedisError:
+        logger.exception('Failed to record a score in the gradebook of course %s', course_id)
+
+
+def add_student(course_id, student):
+    def apply(gradebook):
+        students = gradebook['students']
+        if student.pk in students['id']:
+            return False
+        position = len([u for u in students['username'] if u < student.username])
+        students['id'].insert(position, student.pk)
+        students['username'].insert(position, student.username)
+        students['full_name'].insert(position, student.full_name)
+        # A returning student keeps any earlier submissions
+        previous = dict(
+            AssignmentSubmission.objects.filter(
+                student=student, assignment__course_id=course_id,
+            ).values_list('assignment_id', 'score')
+        )
+        return {
+            _cell(assignment_id, student.pk): previous.get(assignment_id)
+            for assignment_id in gradebook['assignments']['id']
+        }
+    _update_layout(course_id, apply)
+
+
+def remove_student(course_id, student_id):
+    def apply(gradebook):
+        students = gradebook['students']
+        if student_id not in students['id']:
+            return False
+        position = students['id'].index(student_id)
+        for values in students.values():
+            del values[position]
+        return {_cell(assignment_id, student_id): None for assignment_id in gradebook['assignments']['id']}
+    _update_layout(course_id, apply)
+
+
+def add_assignment(assignment):
+    def apply(gradebook):
+        assignments = gradebook['assignments']
+        if assignment.pk in assignments['id']:
+            return False
+        assignments['id'].append(assignment.pk)
+        assignments['title'].append(assignment.title)
+        assignments['assignment_type'].append(assignment.assignment_type)
+        return {}
+    _update_layout(assignment.course_id, apply)
+
+
+def invalidate(course_id):
+    try:
+        get_redis().delete(_cache_key(course_id))
+    except RedisError:
+        logger.exception('Failed to invalidate the gradebook of course %s', course_id)
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+def populate_question_count(apps, schema_editor):
+    Assignment = apps.get_model('courses', 'Assignment')
+    for assignment in Assignment.objects.only('id', 'content').iterator():
+        content = assignment.content if isinstance(assignment.content, dict) else {}
+        items = content.get('questions') or content.get('cards') or []
+        Assignment.objects.filter(pk=assignment.pk).update(
+            question_count=len(items) if isinstance(items, list) else 0
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_assignment_deadline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of questions or cards in content'),
+        ),
+        migrations.RunPython(populate_question_count, migrations.RunPython.noop),
+    ]
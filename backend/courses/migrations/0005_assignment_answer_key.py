@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+def populate_answer_key(apps, schema_editor):
+    Assignment = apps.get_model('courses', 'Assignment')
+    for assignment in Assignment.objects.filter(assignment_type='quiz').only('id', 'content').iterator():
+        content = assignment.content if isinstance(assignment.content, dict) else {}
+        key = []
+        for q in content.get('questions', []):
+            correct = q.get('correct') if isinstance(q, dict) else None
+            key.append(correct if isinstance(correct, int) and not isinstance(correct, bool) else -1)
+        Assignment.objects.filter(pk=assignment.pk).update(answer_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_assignment_question_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='answer_key',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Correct option index per quiz question, compiled from content on save'),
+        ),
+        migrations.RunPython(populate_answer_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-18 23:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_assignment_answer_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assignment',
+            name='deadline',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DeadlineReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_hours', models.PositiveSmallIntegerField()),
+                ('recipient_count', models.PositiveIntegerField(default=0)),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deadline_reminders', to='courses.assignment')),
+            ],
+            options={
+                'ordering': ['-sent_at'],
+                'unique_together': {('assignment', 'window_hours')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.27 on 2026-10-18 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_deadline_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='final_analytics',
+            field=models.JSONField(blank=True, editable=False, help_text='Analytics report frozen when the assignment closed', null=True),
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='is_closed',
+            field=models.BooleanField(default=False, help_text='Set once the deadline has passed; rejects new submissions'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['is_closed', 'deadline'], name='assignment_open_deadline_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-18 23:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0008_submission_submitted_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drafts', to='courses.assignment')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_drafts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('assignment', 'student')},
+            },
+        ),
+    ]
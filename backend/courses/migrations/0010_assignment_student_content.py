@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-18 23:50
+
+from django.db import migrations, models
+
+
+def populate_student_content(apps, schema_editor):
+    Assignment = apps.get_model('courses', 'Assignment')
+    for assignment in Assignment.objects.only('id', 'assignment_type', 'content').iterator():
+        content = assignment.content
+        if assignment.assignment_type == 'quiz' and isinstance(content, dict) and isinstance(content.get('questions'), list):
+            questions = [
+                {k: v for k, v in q.items() if k != 'correct'} if isinstance(q, dict) else q
+                for q in content['questions']
+            ]
+            content = {**content, 'questions': questions}
+        Assignment.objects.filter(pk=assignment.pk).update(student_content=content)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_submission_draft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='student_content',
+            field=models.JSONField(blank=True, editable=False, help_text='Content as served to students (answer keys removed), rendered on save', null=True),
+        ),
+        migrations.RunPython(populate_student_content, migrations.RunPython.noop),
+    ]
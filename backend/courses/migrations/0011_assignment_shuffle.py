@@ -0,0 +1,34 @@
+# Generated by Django 4.2.27 on 2026-10-18 23:53
+
+from django.db import migrations, models
+
+
+def populate_option_counts(apps, schema_editor):
+    Assignment = apps.get_model('courses', 'Assignment')
+    for assignment in Assignment.objects.filter(assignment_type='quiz').only('id', 'content').iterator():
+        content = assignment.content if isinstance(assignment.content, dict) else {}
+        counts = []
+        for q in content.get('questions', []):
+            options = q.get('options') if isinstance(q, dict) else None
+            counts.append(len(options) if isinstance(options, list) else 0)
+        Assignment.objects.filter(pk=assignment.pk).update(option_counts=counts)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_assignment_student_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='option_counts',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Number of options per quiz question, compiled from content on save'),
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='shuffle',
+            field=models.BooleanField(default=False, help_text='Give every student their own question and option order'),
+        ),
+        migrations.RunPython(populate_option_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.27 on 2026-10-18 23:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0011_assignment_shuffle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardReviewState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('card_index', models.PositiveSmallIntegerField()),
+                ('ease', models.PositiveSmallIntegerField(default=2500, help_text='SM-2 ease factor x 1000')),
+                ('interval_days', models.PositiveIntegerField(default=0)),
+                ('repetitions', models.PositiveSmallIntegerField(default=0)),
+                ('due_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_states', to='courses.assignment')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'due_at', 'id'], name='card_state_due_idx')],
+                'unique_together': {('student', 'assignment', 'card_index')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.27 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+def copy_deadlines(apps, schema_editor):
+    DeadlineReminder = apps.get_model('courses', 'DeadlineReminder')
+    Assignment = apps.get_model('courses', 'Assignment')
+    deadlines = Assignment.objects.filter(pk=models.OuterRef('assignment_id')).values('deadline')[:1]
+    DeadlineReminder.objects.update(deadline=models.Subquery(deadlines))
+    # Reminders for assignments that no longer have a deadline can never match again
+    DeadlineReminder.objects.filter(deadline__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_card_review_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deadlinereminder',
+            name='deadline',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_deadlines, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='deadlinereminder',
+            name='deadline',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='deadlinereminder',
+            unique_together={('assignment', 'deadline', 'window_hours')},
+        ),
+    ]
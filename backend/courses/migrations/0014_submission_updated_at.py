@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_deadline_reminder_deadline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignmentsubmission',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
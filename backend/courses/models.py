@@ -1,8 +1,52 @@
 from django.db import models
+from django.utils import timezone
 from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
 from accounts.models import User
 
 
+def count_content_items(content):
+    """Count the questions (quiz) or cards (flashcard) in an assignment's content JSON."""
+    if not isinstance(content, dict):
+        return 0
+    items = content.get('questions') or content.get('cards') or []
+    return len(items) if isinstance(items, list) else 0
+
+
+# Placeholder in answer keys for questions without a valid correct index
+NO_ANSWER = -1
+
+
+def answer_key_for(content):
+    """Return the list of correct option indices for quiz content (-1 where unset)."""
+    questions = content.get('questions', []) if isinstance(content, dict) else []
+    key = []
+    for q in questions:
+        correct = q.get('correct') if isinstance(q, dict) else None
+        key.append(correct if isinstance(correct, int) and not isinstance(correct, bool) else NO_ANSWER)
+    return key
+
+
+def option_counts_for(content):
+    """Return the number of options of each quiz question."""
+    questions = content.get('questions', []) if isinstance(content, dict) else []
+    counts = []
+    for q in questions:
+        options = q.get('options') if isinstance(q, dict) else None
+        counts.append(len(options) if isinstance(options, list) else 0)
+    return counts
+
+
+def student_content_for(content, assignment_type):
+    """Return the student-facing copy of content: quiz questions without their correct index."""
+    if assignment_type != 'quiz' or not isinstance(content, dict) or not isinstance(content.get('questions'), list):
+        return content
+    questions = [
+        {k: v for k, v in q.items() if k != 'correct'} if isinstance(q, dict) else q
+        for q in content['questions']
+    ]
+    return {**content, 'questions': questions}
+
+
 class Course(models.Model):
     """
     Model for courses created by teachers.
@@ -143,16 +187,75 @@ class Assignment(models.Model):
         null=True,
         validators=[FileExtensionValidator(allowed_extensions=['pdf'])]
     )
+    question_count = models.PositiveIntegerField(default=0, help_text='Number of questions or cards in content')
+    answer_key = models.JSONField(
+        default=list, blank=True, editable=False,
+        help_text='Correct option index per quiz question, compiled from content on save',
+    )
+    student_content = models.JSONField(
+        null=True, blank=True, editable=False,
+        help_text='Content as served to students (answer keys removed), rendered on save',
+    )
+    option_counts = models.JSONField(
+        default=list, blank=True, editable=False,
+        help_text='Number of options per quiz question, compiled from content on save',
+    )
+    shuffle = models.BooleanField(
+        default=False, help_text='Give every student their own question and option order',
+    )
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_assignments')
     created_at = models.DateTimeField(auto_now_add=True)
-    deadline = models.DateTimeField(null=True, blank=True)
+    deadline = models.DateTimeField(null=True, blank=True, db_index=True)
+    is_closed = models.BooleanField(default=False, help_text='Set once the deadline has passed; rejects new submissions')
+    final_analytics = models.JSONField(
+        null=True, blank=True, editable=False,
+        help_text='Analytics report frozen when the assignment closed',
+    )
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_closed', 'deadline'], name='assignment_open_deadline_idx'),
+        ]
 
     def __str__(self):
         return f"{self.course.code} - {self.title} ({self.get_assignment_type_display()})"
 
+    def save(self, *args, **kwargs):
+        # Keep the denormalised columns in sync so list views and scoring never need to load content
+        if 'content' not in self.get_deferred_fields():
+            self.question_count = count_content_items(self.content)
+            self.answer_key = answer_key_for(self.content) if self.assignment_type == 'quiz' else []
+            self.option_counts = option_counts_for(self.content) if self.assignment_type == 'quiz' else []
+            self.student_content = student_content_for(self.content, self.assignment_type)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'content' in update_fields:
+                kwargs['update_fields'] = {
+                    *update_fields, 'question_count', 'answer_key', 'option_counts', 'student_content',
+                }
+        super().save(*args, **kwargs)
+
+
+class DeadlineReminder(models.Model):
+    """
+    Marker recording that a deadline reminder window has been sent for an assignment.
+
+    Markers are keyed on the deadline they were sent for, so moving the
+    deadline makes its reminders due again.
+    """
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='deadline_reminders')
+    deadline = models.DateTimeField()
+    window_hours = models.PositiveSmallIntegerField()
+    recipient_count = models.PositiveIntegerField(default=0)
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('assignment', 'deadline', 'window_hours')
+        ordering = ['-sent_at']
+
+    def __str__(self):
+        return f"{self.assignment.title} - {self.window_hours}h reminder"
+
 
 class AssignmentSubmission(models.Model):
     """
@@ -165,7 +268,9 @@ class AssignmentSubmission(models.Model):
     )
     answers = models.JSONField(default=list, help_text='Student answers')
     score = models.IntegerField(null=True, blank=True)
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered submissions keep the time their receipt was issued
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('assignment', 'student')
@@ -173,3 +278,49 @@ class AssignmentSubmission(models.Model):
 
     def __str__(self):
         return f"{self.student.username} - {self.assignment.title}"
+
+
+class SubmissionDraft(models.Model):
+    """
+    Last checkpoint of a student's in-progress answers.
+
+    The live draft is kept in Redis (see ``courses.drafts``); this row is only
+    written periodically so a draft survives a Redis eviction or restart.
+    Answers are stored as ``{question_index: answer}``.
+    """
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='drafts')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='submission_drafts')
+    answers = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('assignment', 'student')
+
+    def __str__(self):
+        return f"{self.student.username} - {self.assignment.title} (draft)"
+
+
+class CardReviewState(models.Model):
+    """
+    Spaced-repetition (SM-2) state of one flashcard for one student.
+
+    Rows are kept small (ease is stored in thousandths) and indexed by
+    (student, due_at) so the review queue is a single range scan.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='card_states')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='card_states')
+    card_index = models.PositiveSmallIntegerField()
+    ease = models.PositiveSmallIntegerField(default=2500, help_text='SM-2 ease factor x 1000')
+    interval_days = models.PositiveIntegerField(default=0)
+    repetitions = models.PositiveSmallIntegerField(default=0)
+    due_at = models.DateTimeField(default=timezone.now)
+    last_reviewed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('student', 'assignment', 'card_index')
+        indexes = [
+            models.Index(fields=['student', 'due_at', 'id'], name='card_state_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.assignment.title} card {self.card_index}"
@@ -0,0 +1,114 @@
+"""
+Spaced-repetition review of flashcard assignments (SM-2).
+
+Each student has one ``CardReviewState`` per card they have started. The
+review queue is read with a keyset range scan over the
+``(student, due_at, id)`` index, so a page costs the same whether a student
+has a hundred or a million card states. Review results are applied in
+memory and written back with one ``bulk_update``.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Assignment, CardReviewState
+
+MIN_EASE = 1300
+# About a hundred years; keeps due_at representable and interval_days inside PositiveIntegerField
+MAX_INTERVAL_DAYS = 36500
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MAX_PK = 2 ** 63 - 1
+
+
+def schedule(state, quality, now):
+    """Apply one SM-2 review with ``quality`` (0-5) to a card state in place."""
+    if quality < 3:
+        # Lapse: start the card over but keep the reduced ease
+        state.repetitions = 0
+        state.interval_days = 1
+    else:
+        if state.repetitions == 0:
+            state.interval_days = 1
+        elif state.repetitions == 1:
+            state.interval_days = 6
+        else:
+            state.interval_days = min(round(state.interval_days * state.ease / 1000), MAX_INTERVAL_DAYS)
+        state.repetitions += 1
+    miss = 5 - quality
+    state.ease = max(MIN_EASE, state.ease + round(100 - miss * (80 + miss * 20)))
+    state.due_at = now + timedelta(days=state.interval_days)
+    state.last_reviewed_at = now
+    return state
+
+
+def start(student, assignment):
+    """Create states for the cards of an assignment the student has not started yet."""
+    existing = CardReviewState.objects.filter(student=student, assignment=assignment).count()
+    if existing >= assignment.question_count:
+        return 0
+    now = timezone.now()
+    CardReviewState.objects.bulk_create(
+        [
+            CardReviewState(student=student, assignment=assignment, card_index=i, due_at=now)
+            for i in range(assignment.question_count)
+        ],
+        ignore_conflicts=True,
+    )
+    return assignment.question_count - existing
+
+
+def encode_cursor(state):
+    return f'{(state.due_at - _EPOCH) // timedelta(microseconds=1)}:{state.pk}'
+
+
+def decode_cursor(cursor):
+    """Return ``(due_at, pk)`` from a cursor, raising ValueError when it is malformed."""
+    micros, pk = cursor.split(':')
+    try:
+        due_at = _EPOCH + timedelta(microseconds=int(micros))
+    except OverflowError:
+        raise ValueError(f'Cursor timestamp out of range: {micros}') from None
+    pk = int(pk)
+    if not 0 < pk <= _MAX_PK:
+        raise ValueError(f'Cursor id out of range: {pk}')
+    return due_at, pk
+
+
+def due_cards(student, assignment_id=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Return a page of cards due now, oldest first, and the cursor of the next page."""
+    states = CardReviewState.objects.filter(student=student, due_at__lte=timezone.now())
+    if assignment_id is not None:
+        states = states.filter(assignment_id=assignment_id)
+    if after is not None:
+        due_at, pk = after
+        states = states.filter(Q(due_at__gt=due_at) | Q(due_at=due_at, pk__gt=pk))
+    page = list(states.order_by('due_at', 'pk')[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def cards_for(states):
+    """Map assignment id to its list of cards for the assignments in a page."""
+    contents = Assignment.objects.filter(
+        pk__in={state.assignment_id for state in states},
+    ).values_list('pk', 'content')
+    return {pk: (content or {}).get('cards', []) for pk, content in contents}
+
+
+def record_reviews(student, reviews):
+    """Apply ``{state_id: quality}`` review results for a student with one UPDATE.
+
+    Returns the updated states; ids that are not the student's, or whose card
+    is not due yet, are ignored.
+    """
+    now = timezone.now()
+    states = list(CardReviewState.objects.filter(student=student, pk__in=reviews, due_at__lte=now))
+    for state in states:
+        schedule(state, reviews[state.pk], now)
+    CardReviewState.objects.bulk_update(
+        states, ['ease', 'interval_days', 'repetitions', 'due_at', 'last_reviewed_at'],
+    )
+    return states
@@ -0,0 +1,84 @@
+"""
+Quiz scoring helpers.
+
+Single submissions are scored inline when they are created; whole assignments
+are rescored in bulk (e.g. after a teacher fixes an answer key) by loading all
+answers into a NumPy matrix and comparing it against the answer-key vector.
+"""
+import numpy as np
+from django.utils import timezone
+
+from .models import NO_ANSWER, Assignment, AssignmentSubmission
+
+RESCORE_CHUNK_SIZE = 5000
+MAX_OPTION = np.iinfo(np.int32).max
+
+
+def answers_matrix(answer_lists, width):
+    """Pack a sequence of answer lists into an (n, width) int32 matrix, padding with -1.
+
+    Anything that is not an option index representable in int32 is stored as
+    ``NO_ANSWER`` rather than cast, so a huge value can never wrap around
+    onto a real option.
+    """
+    matrix = np.full((len(answer_lists), width), NO_ANSWER, dtype=np.int32)
+    for row, answers in enumerate(answer_lists):
+        if not isinstance(answers, list):
+            continue
+        for col, answer in enumerate(answers[:width]):
+            if isinstance(answer, int) and not isinstance(answer, bool) and 0 <= answer <= MAX_OPTION:
+                matrix[row, col] = answer
+    return matrix
+
+
+def score_matrix(matrix, answer_key):
+    """Score every row of an answers matrix against the key in one vectorised pass."""
+    key = np.asarray(answer_key, dtype=np.int32)
+    correct = (matrix == key) & (key != NO_ANSWER)
+    return correct.sum(axis=1) * 100 // len(key)
+
+
+def score_answers(answer_key, answers):
+    """Return the percentage score for one submission, or None if it cannot be scored."""
+    if not answer_key or not isinstance(answers, list):
+        return None
+    return int(score_matrix(answers_matrix([answers], len(answer_key)), answer_key)[0])
+
+
+def rescore_assignment(assignment_id, chunk_size=RESCORE_CHUNK_SIZE):
+    """Recompute the score of every submission for a quiz assignment.
+
+    Submissions are read in primary-key ordered chunks so memory stays bounded,
+    and only rows whose score actually changed are written back with
+    ``bulk_update``. Returns the number of submissions updated.
+    """
+    assignment = Assignment.objects.only('id', 'assignment_type', 'answer_key').get(pk=assignment_id)
+    answer_key = assignment.answer_key
+    if assignment.assignment_type != 'quiz' or not answer_key:
+        return 0
+
+    submissions = AssignmentSubmission.objects.filter(
+        assignment_id=assignment_id
+    ).order_by('pk').values_list('pk', 'answers', 'score')
+
+    updated = 0
+    last_pk = 0
+    while True:
+        rows = list(submissions.filter(pk__gt=last_pk)[:chunk_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        pks, answer_lists, old_scores = zip(*rows)
+        new_scores = score_matrix(answers_matrix(answer_lists, len(answer_key)), answer_key)
+        old = np.array([NO_ANSWER if s is None else s for s in old_scores])
+        changed = np.flatnonzero(new_scores != old)
+        if changed.size:
+            # bulk_update skips auto_now, and exports fingerprint updated_at to spot rescores
+            now = timezone.now()
+            AssignmentSubmission.objects.bulk_update(
+                [AssignmentSubmission(pk=pks[i], score=int(new_scores[i]), updated_at=now) for i in changed],
+                ['score', 'updated_at'],
+                batch_size=chunk_size,
+            )
+            updated += int(changed.size)
+    return updated
@@ -1,5 +1,9 @@
+from django.db import models
 from rest_framework import serializers
-from .models import Course, CourseMaterial, Enrollment, Feedback, Assignment, AssignmentSubmission
+from .models import (
+    Course, CourseMaterial, Enrollment, Feedback, Assignment, AssignmentSubmission, CardReviewState,
+)
+from .variants import Variant
 
 
 class CourseSerializer(serializers.ModelSerializer):
@@ -56,22 +60,136 @@ class AssignmentSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.username', read_only=True)
     course_title = serializers.CharField(source='course.title', read_only=True)
     submission_count = serializers.SerializerMethodField()
+    average_score = serializers.SerializerMethodField()
+    has_submitted = serializers.SerializerMethodField()
+    my_score = serializers.SerializerMethodField()
+    answer_key = serializers.SerializerMethodField()
 
     class Meta:
         model = Assignment
-        fields = ['id', 'course', 'course_title', 'title', 'assignment_type', 'content',
-                  'source_file', 'created_by', 'created_by_name', 'created_at', 'deadline', 'submission_count']
-        read_only_fields = ['id', 'created_by', 'created_at']
-
+        fields = ['id', 'course', 'course_title', 'title', 'assignment_type', 'content', 'question_count',
+                  'source_file', 'created_by', 'created_by_name', 'created_at', 'deadline', 'is_closed',
+                  'shuffle', 'submission_count', 'average_score', 'has_submitted', 'my_score', 'answer_key']
+        read_only_fields = ['id', 'created_by', 'created_at', 'question_count', 'is_closed']
+
+    def _for_student(self):
+        request = self.context.get('request')
+        return request is not None and request.user.is_authenticated and request.user.is_student()
+
+    def _variant(self, obj):
+        return Variant.for_assignment(obj, self.context['request'].user.pk)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if 'content' in fields and self._for_student():
+            # Answer keys were stripped when the assignment was saved
+            fields['content'] = serializers.SerializerMethodField(method_name='get_student_content')
+        return fields
+
+    def get_student_content(self, obj):
+        variant = self._variant(obj)
+        return variant.render(obj.student_content) if variant else obj.student_content
+
+    # The viewset annotates these values; fall back to queries for bare instances (e.g. after create)
     def get_submission_count(self, obj):
+        if hasattr(obj, 'submission_count'):
+            return obj.submission_count
         return obj.submissions.count()
 
+    def get_average_score(self, obj):
+        if hasattr(obj, 'average_score'):
+            return obj.average_score
+        return obj.submissions.aggregate(avg=models.Avg('score'))['avg']
+
+    def get_has_submitted(self, obj):
+        return getattr(obj, 'has_submitted', None)
+
+    def get_my_score(self, obj):
+        return getattr(obj, 'my_score', None)
+
+    def get_answer_key(self, obj):
+        # Students only see the correct answers once they have submitted
+        if not self._for_student():
+            return obj.answer_key
+        if not getattr(obj, 'has_submitted', False):
+            return None
+        variant = self._variant(obj)
+        return variant.from_canonical(obj.answer_key) if variant else obj.answer_key
+
+
+class AssignmentListSerializer(AssignmentSerializer):
+    """Lightweight Assignment representation for list views, without the content JSON"""
+
+    class Meta(AssignmentSerializer.Meta):
+        fields = [f for f in AssignmentSerializer.Meta.fields if f not in ('content', 'answer_key')]
+
 
 class AssignmentSubmissionSerializer(serializers.ModelSerializer):
     """Serializer for AssignmentSubmission model"""
     student_name = serializers.CharField(source='student.username', read_only=True)
+    # Scoring only needs the compiled answer key, so skip loading the content JSON
+    assignment = serializers.PrimaryKeyRelatedField(
+        queryset=Assignment.objects.select_related('course').defer('content', 'student_content'),
+    )
 
     class Meta:
         model = AssignmentSubmission
         fields = ['id', 'assignment', 'student', 'student_name', 'answers', 'score', 'submitted_at']
         read_only_fields = ['id', 'student', 'score', 'submitted_at']
+
+    def validate(self, attrs):
+        assignment = attrs.get('assignment') or getattr(self.instance, 'assignment', None)
+        answers = attrs.get('answers')
+        if assignment is None or answers is None:
+            return attrs
+        if not isinstance(answers, list):
+            raise serializers.ValidationError({'answers': 'Answers must be a list.'})
+        if len(answers) > assignment.question_count:
+            raise serializers.ValidationError(
+                {'answers': f'This assignment has only {assignment.question_count} questions.'}
+            )
+        if assignment.assignment_type != 'quiz':
+            return attrs
+        # Answers arrive in the order the student saw the questions
+        option_counts = assignment.option_counts
+        request = self.context.get('request')
+        variant = Variant.for_assignment(assignment, request.user.pk) if request is not None else None
+        if variant:
+            option_counts = [option_counts[q] for q in variant.questions]
+        for index, answer in enumerate(answers):
+            if answer is None:
+                continue
+            if (
+                not isinstance(answer, int) or isinstance(answer, bool)
+                or index >= len(option_counts) or not 0 <= answer < option_counts[index]
+            ):
+                raise serializers.ValidationError(
+                    {'answers': f'Answer {index} must be null or an option index of question {index}.'}
+                )
+        return attrs
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        if request is not None and request.user.is_authenticated and request.user.is_student():
+            # Answers are stored in canonical order; show students the order they answered in
+            variant = Variant.for_assignment(instance.assignment, instance.student_id)
+            if variant:
+                data['answers'] = variant.from_canonical(instance.answers)
+        return data
+
+
+class CardReviewStateSerializer(serializers.ModelSerializer):
+    """Serializer for a student's review state of one flashcard, with the card itself"""
+    card = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CardReviewState
+        fields = ['id', 'assignment', 'card_index', 'card', 'ease', 'interval_days', 'repetitions',
+                  'due_at', 'last_reviewed_at']
+        read_only_fields = fields
+
+    def get_card(self, obj):
+        # The view loads the cards of every assignment on the page once and passes them in
+        cards = self.context.get('cards', {}).get(obj.assignment_id, [])
+        return cards[obj.card_index] if obj.card_index < len(cards) else None
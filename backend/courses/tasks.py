@@ -16,6 +16,7 @@ def generate_assignment_task(course_id, user_id, assignment_type, pdf_text, titl
     """
     from django.utils.dateparse import parse_datetime
     from courses.models import Course, Assignment, Enrollment
+    from courses import gradebook
     from accounts.models import User
     from notifications.utils import create_bulk_notifications
 
@@ -102,6 +103,7 @@ def generate_assignment_task(course_id, user_id, assignment_type, pdf_text, titl
         created_by=user,
         deadline=deadline_val,
     )
+    gradebook.add_assignment(assignment)
 
     # Send deadline notifications if applicable
     if assignment.deadline:
@@ -121,3 +123,178 @@ def generate_assignment_task(course_id, user_id, assignment_type, pdf_text, titl
         )
 
     return {'assignment_id': assignment.id, 'title': assignment.title}
+
+
+@shared_task
+def rescore_assignment_task(assignment_id):
+    """Rescore all submissions of a quiz after its answer key changed."""
+    from courses.models import Assignment
+    from courses.scoring import rescore_assignment
+    from courses import analytics, gradebook
+
+    try:
+        updated = rescore_assignment(assignment_id)
+    except Assignment.DoesNotExist:
+        logger.error('rescore_assignment_task: assignment %s not found', assignment_id)
+        return {'error': 'Assignment not found'}
+    analytics.invalidate(assignment_id)
+    assignment = Assignment.objects.defer('content', 'student_content').get(pk=assignment_id)
+    gradebook.invalidate(assignment.course_id)
+    if assignment.is_closed:
+        analytics.finalize(assignment)
+    return {'assignment_id': assignment_id, 'updated': updated}
+
+
+@shared_task
+def close_expired_assignments():
+    """Close assignments whose deadline has passed and freeze their analytics.
+
+    Runs periodically from celery beat and only touches open assignments, using
+    the (is_closed, deadline) index, so each sweep is cheap regardless of how
+    many assignments have already closed. In high-throughput mode the
+    submission buffer is flushed first, so submissions received before the
+    deadline are part of the frozen report.
+    """
+    from django.conf import settings
+    from django.utils import timezone
+    from courses.models import Assignment
+    from courses import analytics, buffer
+
+    expired = Assignment.objects.filter(
+        is_closed=False, deadline__lte=timezone.now(),
+    ).defer('content', 'student_content')
+    if settings.SUBMISSION_BUFFER_ENABLED and expired.exists():
+        try:
+            buffer.flush(on_persisted=_after_buffered_submissions)
+        except Exception:
+            # Close anyway; stragglers refreeze the report when they are flushed
+            logger.exception('Could not flush the submission buffer before closing assignments')
+    closed = []
+    for assignment in expired:
+        # Conditional update so concurrent sweeps close (and finalize) each assignment once
+        if Assignment.objects.filter(pk=assignment.pk, is_closed=False).update(is_closed=True):
+            assignment.is_closed = True
+            analytics.finalize(assignment)
+            closed.append(assignment.pk)
+    return {'closed': closed}
+
+
+@shared_task
+def send_deadline_reminders():
+    """Remind students who have not submitted yet that an assignment is due soon.
+
+    Runs periodically from celery beat. For each window in
+    ``settings.DEADLINE_REMINDER_WINDOWS`` (hours, smallest first), assignments
+    whose deadline falls inside the window and that have no reminder for that
+    or a smaller window of the same deadline yet are claimed with a
+    ``DeadlineReminder`` marker, so re-runs and overlapping workers never send
+    the same reminder twice while a changed deadline is reminded afresh.
+    """
+    from datetime import timedelta
+
+    from django.conf import settings
+    from django.db.models import Exists, OuterRef
+    from django.utils import timezone
+    from courses.models import Assignment, AssignmentSubmission, DeadlineReminder, Enrollment
+
+    now = timezone.now()
+    sent = 0
+    for window in sorted(settings.DEADLINE_REMINDER_WINDOWS):
+        already_reminded = DeadlineReminder.objects.filter(
+            assignment=OuterRef('pk'), deadline=OuterRef('deadline'), window_hours__lte=window,
+        )
+        assignments = Assignment.objects.filter(
+            is_closed=False, deadline__gt=now, deadline__lte=now + timedelta(hours=window),
+        ).exclude(Exists(already_reminded)).select_related('course').defer('content', 'student_content')
+
+        for assignment in assignments:
+            reminder, created = DeadlineReminder.objects.get_or_create(
+                assignment=assignment, deadline=assignment.deadline, window_hours=window,
+            )
+            if not created:
+                continue
+            submitted = AssignmentSubmission.objects.filter(
+                assignment=assignment, student_id=OuterRef('student_id'),
+            )
+            enrollments = Enrollment.objects.filter(
+                course_id=assignment.course_id, is_active=True,
+            ).exclude(Exists(submitted)).select_related('student').order_by('pk')
+
+            batch = []
+            for enrollment in enrollments.iterator(chunk_size=settings.DEADLINE_REMINDER_BATCH_SIZE):
+                batch.append(enrollment.student)
+                if len(batch) >= settings.DEADLINE_REMINDER_BATCH_SIZE:
+                    reminder.recipient_count += _send_deadline_reminder(assignment, window, batch)
+                    batch = []
+            if batch:
+                reminder.recipient_count += _send_deadline_reminder(assignment, window, batch)
+            reminder.save(update_fields=['recipient_count'])
+            sent += reminder.recipient_count
+    return {'sent': sent}
+
+
+def _send_deadline_reminder(assignment, window, recipients):
+    from notifications.utils import create_bulk_notifications
+
+    hours = 'hour' if window == 1 else 'hours'
+    create_bulk_notifications(
+        recipients=recipients,
+        notification_type='deadline',
+        title=f'Due in {window} {hours}: {assignment.title}',
+        message=(
+            f'"{assignment.title}" in {assignment.course.title} is due on '
+            f'{assignment.deadline.strftime("%b %d, %Y %I:%M %p")}. You have not submitted it yet.'
+        ),
+        link=f'/assignments/{assignment.id}',
+    )
+    return len(recipients)
+
+
+def _after_buffered_submissions(submissions):
+    """Update analytics, gradebooks and the teacher's notifications for flushed submissions."""
+    from courses.models import Assignment
+    from courses import analytics, gradebook
+    from notifications.utils import coalesce_notification
+
+    per_assignment = {}
+    for submission in submissions:
+        assignment = submission.assignment
+        if assignment.assignment_type == 'quiz':
+            analytics.record_submission(assignment, submission.answers, submission.score)
+        gradebook.record_score(assignment.course_id, assignment.pk, submission.student_id, submission.score)
+        per_assignment.setdefault(assignment.pk, [assignment, 0])[1] += 1
+    # One coalesced notification update per assignment in the batch
+    for assignment, count in per_assignment.values():
+        coalesce_notification(
+            recipient_id=assignment.course.teacher_id,
+            notification_type='general',
+            target=f'assignment:{assignment.pk}:submissions',
+            title=f'New submission for {assignment.title}',
+            message=f'A student submitted "{assignment.title}" in {assignment.course.title}.',
+            link=f'/assignments/{assignment.id}',
+            summary_title=f'{{count}} new submissions for {assignment.title}',
+            summary_message=f'{{count}} students submitted "{assignment.title}" in {assignment.course.title}.',
+            count=count,
+        )
+    # A batch another flusher was still holding when the assignment closed: refreeze its report
+    closed = Assignment.objects.filter(pk__in=per_assignment, is_closed=True).defer('content', 'student_content')
+    for assignment in closed:
+        analytics.finalize(assignment)
+
+
+@shared_task
+def flush_submission_buffer():
+    """Persist submissions buffered in the Redis stream (high-throughput mode only)."""
+    from django.conf import settings
+    from courses import buffer
+
+    if not settings.SUBMISSION_BUFFER_ENABLED:
+        return {'processed': 0}
+    return {'processed': buffer.flush(on_persisted=_after_buffered_submissions)}
+
+
+@shared_task
+def checkpoint_submission_drafts():
+    """Persist autosaved quiz drafts that changed since the last checkpoint."""
+    from courses import drafts
+    return {'written': drafts.checkpoint(), 'pruned': drafts.prune_submitted()}
@@ -1,9 +1,27 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from redis.exceptions import ConnectionError as RedisConnectionError
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
 from accounts.models import User
-from .models import Course, CourseMaterial, Enrollment, Feedback
+from notifications.models import OutboxMessage
+from .models import (
+    Course, CourseMaterial, Enrollment, Feedback, Assignment, AssignmentSubmission, DeadlineReminder,
+    SubmissionDraft, CardReviewState, answer_key_for,
+)
+from .tasks import send_deadline_reminders, close_expired_assignments, flush_submission_buffer
+from .scoring import score_answers, rescore_assignment
+from . import analytics, gradebook
+from .export import read_columnar
+from . import buffer as submission_buffer
+from . import drafts as submission_drafts
+from .variants import Variant
+from . import reviews
 
 
 # ── Model Tests ──────────────────────────────────────────────────────
@@ -148,6 +166,14 @@ class CourseAPITest(APITestCase):
             ).exists()
         )
 
+    def test_enroll_rolls_back_when_the_notification_fails(self):
+        self._auth_student()
+        self.client.raise_request_exception = False
+        with patch('courses.api.coalesce_notification', side_effect=RuntimeError('outbox down')):
+            res = self.client.post(f'/api/courses/{self.course.id}/enroll/')
+        self.assertEqual(res.status_code, 500)
+        self.assertFalse(Enrollment.objects.filter(student=self.student, course=self.course).exists())
+
     def test_enroll_as_teacher_fails(self):
         self._auth_teacher()
         res = self.client.post(f'/api/courses/{self.course.id}/enroll/')
@@ -313,3 +339,1095 @@ class FeedbackAPITest(APITestCase):
         res = self.client.get('/api/feedback/')
         self.assertEqual(res.status_code, 200)
         self.assertEqual(len(res.data), 1)
+
+
+# ── Assignment API Tests ─────────────────────────────────────────────
+
+QUIZ_CONTENT = {
+    'questions': [
+        {'question': 'Q1', 'options': ['a', 'b', 'c', 'd'], 'correct': 0},
+        {'question': 'Q2', 'options': ['a', 'b', 'c', 'd'], 'correct': 1},
+        {'question': 'Q3', 'options': ['a', 'b', 'c', 'd'], 'correct': 2},
+        {'question': 'Q4', 'options': ['a', 'b', 'c', 'd'], 'correct': 3},
+    ],
+}
+
+
+class AssignmentModelTest(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='t', password='p', user_type='teacher')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+
+    def test_question_count_computed_on_save(self):
+        a = Assignment.objects.create(
+            course=self.course, title='Quiz', assignment_type='quiz',
+            content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        self.assertEqual(a.question_count, 4)
+
+    def test_question_count_for_flashcards(self):
+        a = Assignment.objects.create(
+            course=self.course, title='Cards', assignment_type='flashcard',
+            content={'cards': [{'front': 'f', 'back': 'b'}] * 3}, created_by=self.teacher,
+        )
+        self.assertEqual(a.question_count, 3)
+
+    def test_question_count_updated_with_content(self):
+        a = Assignment.objects.create(
+            course=self.course, title='Quiz', assignment_type='quiz',
+            content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        a.content = {'questions': QUIZ_CONTENT['questions'][:2]}
+        a.save(update_fields=['content'])
+        a.refresh_from_db()
+        self.assertEqual(a.question_count, 2)
+
+    def test_student_content_rendered_on_save(self):
+        a = Assignment.objects.create(
+            course=self.course, title='Quiz', assignment_type='quiz',
+            content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        self.assertEqual(a.student_content['questions'][1], {
+            k: v for k, v in QUIZ_CONTENT['questions'][1].items() if k != 'correct'
+        })
+        self.assertIn('correct', a.content['questions'][1])
+        a.content = {'questions': QUIZ_CONTENT['questions'][:1]}
+        a.save(update_fields=['content'])
+        a.refresh_from_db()
+        self.assertEqual(len(a.student_content['questions']), 1)
+
+
+class AssignmentAPITest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher1', password='p', user_type='teacher')
+        self.student = User.objects.create_user(username='student1', password='p', user_type='student')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        Enrollment.objects.create(student=self.student, course=self.course, is_active=True)
+        self.assignment = Assignment.objects.create(
+            course=self.course, title='Quiz', assignment_type='quiz',
+            content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        self.teacher_token = Token.objects.create(user=self.teacher)
+        self.student_token = Token.objects.create(user=self.student)
+
+    def _auth_teacher(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.teacher_token.key}')
+
+    def _auth_student(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.student_token.key}')
+
+    def test_list_omits_content(self):
+        self._auth_student()
+        res = self.client.get('/api/assignments/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), 1)
+        self.assertNotIn('content', res.data[0])
+        self.assertEqual(res.data[0]['question_count'], 4)
+
+    def test_retrieve_includes_content(self):
+        self._auth_student()
+        res = self.client.get(f'/api/assignments/{self.assignment.id}/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data['content']['questions']), 4)
+
+    def test_student_content_has_no_answer_key(self):
+        self._auth_student()
+        res = self.client.get(f'/api/assignments/{self.assignment.id}/')
+        self.assertTrue(all('correct' not in q for q in res.data['content']['questions']))
+        self.assertEqual(res.data['content']['questions'][0]['options'], QUIZ_CONTENT['questions'][0]['options'])
+        self.assertIsNone(res.data['answer_key'])
+        AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=self.student, answers=[0, 1, 2, 3], score=100,
+        )
+        res = self.client.get(f'/api/assignments/{self.assignment.id}/')
+        self.assertEqual(res.data['answer_key'], [0, 1, 2, 3])
+
+    def test_teacher_content_keeps_answer_key(self):
+        self._auth_teacher()
+        res = self.client.get(f'/api/assignments/{self.assignment.id}/')
+        self.assertEqual(res.data['content'], QUIZ_CONTENT)
+
+    def test_list_annotates_submission_stats(self):
+        other = User.objects.create_user(username='student2', password='p', user_type='student')
+        AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=self.student, answers=[0, 1, 2, 3], score=100,
+        )
+        AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=other, answers=[0, 0, 0, 0], score=50,
+        )
+        self._auth_teacher()
+        res = self.client.get('/api/assignments/')
+        self.assertEqual(res.data[0]['submission_count'], 2)
+        self.assertEqual(res.data[0]['average_score'], 75)
+        self.assertIsNone(res.data[0]['has_submitted'])
+
+    def test_list_includes_own_submission_status(self):
+        second = Assignment.objects.create(
+            course=self.course, title='Quiz 2', assignment_type='quiz',
+            content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=self.student, answers=[0, 1, 2, 3], score=100,
+        )
+        self._auth_student()
+        res = self.client.get('/api/assignments/')
+        by_id = {a['id']: a for a in res.data}
+        self.assertTrue(by_id[self.assignment.id]['has_submitted'])
+        self.assertEqual(by_id[self.assignment.id]['my_score'], 100)
+        self.assertFalse(by_id[second.id]['has_submitted'])
+        self.assertIsNone(by_id[second.id]['my_score'])
+
+    def test_list_query_count_is_constant(self):
+        for i in range(5):
+            a = Assignment.objects.create(
+                course=self.course, title=f'Extra {i}', assignment_type='quiz',
+                content=QUIZ_CONTENT, created_by=self.teacher,
+            )
+            AssignmentSubmission.objects.create(
+                assignment=a, student=self.student, answers=[0, 1, 2, 3], score=100,
+            )
+        self._auth_student()
+        # One query for token authentication, one for the annotated assignment list
+        with self.assertNumQueries(2):
+            res = self.client.get('/api/assignments/')
+        self.assertEqual(len(res.data), 6)
+
+    def test_submission_is_scored_in_a_single_write(self):
+        self._auth_student()
+        # Token auth, assignment lookup, enrollment check, one INSERT and the teacher's outbox row in one
+        # transaction (a savepoint pair here, as the test case already holds a transaction)
+        with self.assertNumQueries(7), self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post('/api/assignment-submissions/', {
+                'assignment': self.assignment.id, 'answers': [0, 1, 0, 0],
+            }, format='json')
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['score'], 50)
+        self.assertEqual(AssignmentSubmission.objects.get().score, 50)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, 'notifications.tasks.coalesce_notification_task')
+        self.assertEqual(message.args[0], self.teacher.id)
+
+    def test_submission_rolls_back_when_the_notification_fails(self):
+        self._auth_student()
+        self.client.raise_request_exception = False
+        with patch('courses.api.defer_notification', side_effect=RuntimeError('outbox down')):
+            with patch('courses.gradebook.record_score') as record_score, self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post('/api/assignment-submissions/', {
+                    'assignment': self.assignment.id, 'answers': [0, 1, 0, 0],
+                }, format='json')
+        self.assertEqual(res.status_code, 500)
+        self.assertFalse(AssignmentSubmission.objects.exists())
+        record_score.assert_not_called()
+
+    def test_submission_discards_draft_without_a_query(self):
+        self._auth_student()
+        with patch('courses.drafts.get_redis') as get_redis:
+            with self.assertNumQueries(7), self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post('/api/assignment-submissions/', {
+                    'assignment': self.assignment.id, 'answers': [0, 1, 0, 0],
+                }, format='json')
+        self.assertEqual(res.status_code, 201)
+        get_redis.return_value.pipeline.return_value.execute.assert_called_once()
+
+    def test_submissions_cannot_be_edited_or_deleted(self):
+        self._auth_student()
+        submission = AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=self.student, answers=[0, 0, 0, 0], score=25,
+        )
+        url = f'/api/assignment-submissions/{submission.id}/'
+        for method in (self.client.patch, self.client.put, self.client.delete):
+            res = method(url, {'assignment': self.assignment.id, 'answers': [0, 1, 2, 3]}, format='json')
+            self.assertEqual(res.status_code, 405)
+        submission.refresh_from_db()
+        self.assertEqual((submission.answers, submission.score), ([0, 0, 0, 0], 25))
+
+    def test_submission_rejects_invalid_answers(self):
+        self._auth_student()
+        for answers in ([2 ** 32 + 1, 1, 2, 3], [2 ** 64], [0, 4], [True], ['a'], [-1], [0, 1, 2, 3, 0], 'abc'):
+            res = self.client.post('/api/assignment-submissions/', {
+                'assignment': self.assignment.id, 'answers': answers,
+            }, format='json')
+            self.assertEqual(res.status_code, 400, answers)
+        self.assertFalse(AssignmentSubmission.objects.exists())
+        res = self.client.post('/api/assignment-submissions/', {
+            'assignment': self.assignment.id, 'answers': [0, None, 3],
+        }, format='json')
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['score'], 25)
+
+    @patch('courses.api.rescore_assignment_task')
+    def test_answer_key_change_triggers_rescore(self, mock_task):
+        self._auth_teacher()
+        content = {'questions': [dict(q) for q in QUIZ_CONTENT['questions']]}
+        content['questions'][0]['correct'] = 3
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(
+                f'/api/assignments/{self.assignment.id}/', {'content': content}, format='json',
+            )
+        self.assertEqual(res.status_code, 200)
+        mock_task.delay.assert_called_once_with(self.assignment.id)
+
+    @patch('courses.api.rescore_assignment_task')
+    def test_title_change_does_not_rescore(self, mock_task):
+        self._auth_teacher()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/assignments/{self.assignment.id}/', {'title': 'Renamed'}, format='json')
+        mock_task.delay.assert_not_called()
+
+
+# ── Scoring Tests ────────────────────────────────────────────────────
+
+class ScoringTest(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='t', password='p', user_type='teacher')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        self.assignment = Assignment.objects.create(
+            course=self.course, title='Quiz', assignment_type='quiz',
+            content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+
+    def test_answer_key_for(self):
+        self.assertEqual(answer_key_for(QUIZ_CONTENT), [0, 1, 2, 3])
+        self.assertEqual(answer_key_for({'questions': [{'question': 'x'}]}), [-1])
+        self.assertEqual(answer_key_for({}), [])
+
+    def test_score_answers(self):
+        key = [0, 1, 2, 3]
+        self.assertEqual(score_answers(key, [0, 1, 2, 3]), 100)
+        self.assertEqual(score_answers(key, [0, 1]), 50)
+        self.assertEqual(score_answers(key, [0, 'x', None, 3]), 50)
+        self.assertEqual(score_answers(key, []), 0)
+        self.assertIsNone(score_answers(key, 'not a list'))
+        self.assertIsNone(score_answers([], [0]))
+        # Values that don't fit int32 count as unanswered instead of wrapping onto an option
+        self.assertEqual(score_answers(key, [2 ** 32, 2 ** 32 + 1, 2 ** 64, 3]), 25)
+
+    def test_rescore_assignment(self):
+        students = [
+            User.objects.create_user(username=f's{i}', password='p', user_type='student')
+            for i in range(5)
+        ]
+        for i, student in enumerate(students):
+            AssignmentSubmission.objects.create(
+                assignment=self.assignment, student=student, answers=[i % 4] * 4, score=25,
+            )
+        # Fix the key so every question's correct option is 0
+        self.assignment.content = {
+            'questions': [dict(q, correct=0) for q in QUIZ_CONTENT['questions']],
+        }
+        self.assignment.save()
+        updated = rescore_assignment(self.assignment.id, chunk_size=2)
+        self.assertEqual(updated, 5)
+        scores = dict(AssignmentSubmission.objects.values_list('student__username', 'score'))
+        self.assertEqual(scores, {'s0': 100, 's1': 0, 's2': 0, 's3': 0, 's4': 100})
+        # Running again changes nothing
+        self.assertEqual(rescore_assignment(self.assignment.id), 0)
+
+    def test_answer_key_compiled_on_save(self):
+        self.assertEqual(self.assignment.answer_key, [0, 1, 2, 3])
+        cards = Assignment.objects.create(
+            course=self.course, title='Cards', assignment_type='flashcard',
+            content={'cards': [{'front': 'f', 'back': 'b'}]}, created_by=self.teacher,
+        )
+        self.assertEqual(cards.answer_key, [])
+
+    def test_save_with_deferred_content_keeps_answer_key(self):
+        a = Assignment.objects.defer('content').get(pk=self.assignment.pk)
+        a.title = 'Renamed'
+        with self.assertNumQueries(1):
+            a.save(update_fields=['title'])
+        a.refresh_from_db()
+        self.assertEqual(a.answer_key, [0, 1, 2, 3])
+
+
+# ── Analytics Tests ──────────────────────────────────────────────────
+
+class AssignmentAnalyticsTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher1', password='p', user_type='teacher')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        self.assignment = Assignment.objects.create(
+            course=self.course, title='Quiz', assignment_type='quiz',
+            content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        answers = [[0, 1, 2, 3], [0, 1, 2, 0], [0, 0, 0, 0], [1, 1]]
+        self.students = []
+        for i, ans in enumerate(answers):
+            student = User.objects.create_user(username=f's{i}', password='p', user_type='student')
+            self.students.append(student)
+            AssignmentSubmission.objects.create(
+                assignment=self.assignment, student=student, answers=ans,
+                score=score_answers(self.assignment.answer_key, ans),
+            )
+        self.token = Token.objects.create(user=self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_report(self):
+        res = self.client.get(f'/api/assignments/{self.assignment.id}/analytics/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['submission_count'], 4)
+        self.assertEqual(res.data['average_score'], 56.25)
+        self.assertEqual(sum(res.data['score_histogram']['counts']), 4)
+        q0 = res.data['questions'][0]
+        self.assertEqual(q0['correct_rate'], 0.75)
+        self.assertEqual(q0['option_counts'], [3, 1, 0, 0])
+        q3 = res.data['questions'][3]
+        self.assertEqual(q3['unanswered'], 1)
+        self.assertEqual(q3['option_counts'], [2, 0, 0, 1])
+        # Top student gets Q3 right, bottom student does not
+        self.assertEqual(q3['discrimination'], 1.0)
+
+    def test_only_course_teacher(self):
+        other = User.objects.create_user(username='teacher2', password='p', user_type='teacher')
+        token = Token.objects.create(user=other)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        res = self.client.get(f'/api/assignments/{self.assignment.id}/analytics/')
+        self.assertEqual(res.status_code, 404)
+
+    def _stored(self):
+        """A mock Redis holding the statistics the next read would store."""
+        redis = MagicMock()
+        redis.hgetall.return_value = analytics._to_fields(
+            analytics.compute_stats(self.assignment), analytics._layout(self.assignment),
+        )
+        return redis
+
+    def test_incremental_update_is_one_atomic_script(self):
+        redis = MagicMock()
+        with patch('courses.analytics.get_redis', return_value=redis):
+            analytics.record_submission(self.assignment, [0, 1, 9, None], 50)
+        script, numkeys, key, layout, *args = redis.eval.call_args[0]
+        self.assertEqual((numkeys, key), (1, f'assignment_analytics:{self.assignment.id}'))
+        self.assertEqual(layout, analytics._layout(self.assignment))
+        increments = dict(zip(args[::2], args[1::2]))
+        self.assertEqual(increments, {
+            'n': 1, 'score_sum': 50, 'h:5': 1,
+            'o:0:0': 1, 'c:0': 1, 'o:1:1': 1, 'c:1': 1, 'u:2': 1, 'u:3': 1,
+        })
+
+    def test_stored_stats_round_trip(self):
+        stats = analytics.compute_stats(self.assignment)
+        redis = self._stored()
+        self.assertEqual(analytics._from_fields(redis.hgetall.return_value, self.assignment), stats)
+
+    def test_stored_stats_served_without_queries(self):
+        with patch('courses.analytics.get_redis', return_value=self._stored()), self.assertNumQueries(0):
+            report = analytics.assignment_analytics(self.assignment)
+        self.assertEqual(report['submission_count'], 4)
+
+    def test_answer_key_change_recomputes(self):
+        redis = self._stored()
+        self.assignment.content = {
+            'questions': [dict(q, correct=0) for q in QUIZ_CONTENT['questions']],
+        }
+        self.assignment.save()
+        with patch('courses.analytics.get_redis', return_value=redis):
+            report = analytics.assignment_analytics(self.assignment)
+        self.assertEqual(report['questions'][3]['correct_rate'], 0.5)
+        stored = redis.pipeline.return_value.hset.call_args.kwargs['mapping']
+        self.assertEqual(stored['layout'], analytics._layout(self.assignment))
+
+    def test_stored_answers_past_the_options_are_unanswered(self):
+        student = User.objects.create_user(username='forged', password='p', user_type='student')
+        AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=student, answers=[2 ** 31 - 1, 4, 2 ** 64, 0], score=0,
+        )
+        stats = analytics.compute_stats(self.assignment)
+        self.assertEqual(stats['option_counts'][0], [3, 1, 0, 0])
+        self.assertEqual(stats['unanswered'], [1, 1, 2, 1])
+
+
+# ── Deadline Reminder Tests ──────────────────────────────────────────
+
+@override_settings(DEADLINE_REMINDER_WINDOWS=[24, 1])
+class DeadlineReminderTest(TestCase):
+    def setUp(self):
+        from notifications.models import Notification
+        self.Notification = Notification
+        self.teacher = User.objects.create_user(username='t', password='p', user_type='teacher')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        self.done = User.objects.create_user(username='done', password='p', user_type='student')
+        self.pending = User.objects.create_user(username='pending', password='p', user_type='student')
+        self.left = User.objects.create_user(username='left', password='p', user_type='student')
+        Enrollment.objects.create(student=self.done, course=self.course, is_active=True)
+        Enrollment.objects.create(student=self.pending, course=self.course, is_active=True)
+        Enrollment.objects.create(student=self.left, course=self.course, is_active=False)
+        self.assignment = Assignment.objects.create(
+            course=self.course, title='Quiz', assignment_type='quiz', content=QUIZ_CONTENT,
+            created_by=self.teacher, deadline=timezone.now() + timedelta(hours=12),
+        )
+        AssignmentSubmission.objects.create(assignment=self.assignment, student=self.done, answers=[0])
+
+    def test_reminds_only_students_without_submission(self):
+        result = send_deadline_reminders()
+        self.assertEqual(result['sent'], 1)
+        self.assertEqual(
+            list(self.Notification.objects.values_list('recipient__username', flat=True)), ['pending'],
+        )
+        reminder = DeadlineReminder.objects.get()
+        self.assertEqual(reminder.window_hours, 24)
+        self.assertEqual(reminder.recipient_count, 1)
+
+    def test_rerun_is_idempotent(self):
+        send_deadline_reminders()
+        self.assertEqual(send_deadline_reminders()['sent'], 0)
+        self.assertEqual(self.Notification.objects.count(), 1)
+
+    def test_smaller_window_sends_again(self):
+        send_deadline_reminders()
+        Assignment.objects.filter(pk=self.assignment.pk).update(
+            deadline=timezone.now() + timedelta(minutes=30),
+        )
+        self.assertEqual(send_deadline_reminders()['sent'], 1)
+        self.assertEqual(self.Notification.objects.count(), 2)
+        self.assertEqual(send_deadline_reminders()['sent'], 0)
+
+    def test_changed_deadline_is_reminded_again(self):
+        send_deadline_reminders()
+        # Extended: the reminder sent for the old deadline doesn't cover the new one
+        Assignment.objects.filter(pk=self.assignment.pk).update(
+            deadline=self.assignment.deadline + timedelta(hours=1),
+        )
+        self.assertEqual(send_deadline_reminders()['sent'], 1)
+        self.assertEqual(self.Notification.objects.count(), 2)
+        self.assertEqual(send_deadline_reminders()['sent'], 0)
+
+    def test_ignores_past_and_distant_deadlines(self):
+        Assignment.objects.filter(pk=self.assignment.pk).update(deadline=timezone.now() - timedelta(hours=1))
+        self.assertEqual(send_deadline_reminders()['sent'], 0)
+        Assignment.objects.filter(pk=self.assignment.pk).update(deadline=timezone.now() + timedelta(days=3))
+        self.assertEqual(send_deadline_reminders()['sent'], 0)
+
+
+# ── Assignment Closing Tests ─────────────────────────────────────────
+
+class AssignmentClosingTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username='teacher1', password='p', user_type='teacher')
+        self.student = User.objects.create_user(username='student1', password='p', user_type='student')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        Enrollment.objects.create(student=self.student, course=self.course, is_active=True)
+        self.assignment = Assignment.objects.create(
+            course=self.course, title='Quiz', assignment_type='quiz', content=QUIZ_CONTENT,
+            created_by=self.teacher, deadline=timezone.now() - timedelta(minutes=5),
+        )
+        self.open_assignment = Assignment.objects.create(
+            course=self.course, title='Open', assignment_type='quiz', content=QUIZ_CONTENT,
+            created_by=self.teacher, deadline=timezone.now() + timedelta(days=1),
+        )
+        self.student_token = Token.objects.create(user=self.student)
+        self.teacher_token = Token.objects.create(user=self.teacher)
+
+    def test_sweep_closes_expired_and_finalizes(self):
+        other = User.objects.create_user(username='s2', password='p', user_type='student')
+        AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=other, answers=[0, 1, 2, 3], score=100,
+        )
+        result = close_expired_assignments()
+        self.assertEqual(result['closed'], [self.assignment.id])
+        self.assignment.refresh_from_db()
+        self.open_assignment.refresh_from_db()
+        self.assertTrue(self.assignment.is_closed)
+        self.assertFalse(self.open_assignment.is_closed)
+        self.assertEqual(self.assignment.final_analytics['submission_count'], 1)
+        with self.assertNumQueries(0):
+            report = analytics.assignment_analytics(self.assignment)
+        self.assertEqual(report['average_score'], 100)
+        self.assertEqual(close_expired_assignments()['closed'], [])
+
+    def test_submission_rejected_after_deadline(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.student_token.key}')
+        res = self.client.post('/api/assignment-submissions/', {
+            'assignment': self.assignment.id, 'answers': [0, 1, 2, 3],
+        }, format='json')
+        self.assertEqual(res.status_code, 403)
+        self.assertEqual(AssignmentSubmission.objects.count(), 0)
+
+    def test_submission_rejected_when_closed(self):
+        Assignment.objects.filter(pk=self.open_assignment.pk).update(is_closed=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.student_token.key}')
+        res = self.client.post('/api/assignment-submissions/', {
+            'assignment': self.open_assignment.id, 'answers': [0, 1, 2, 3],
+        }, format='json')
+        self.assertEqual(res.status_code, 403)
+
+    @patch('courses.api.create_bulk_notifications')
+    def test_extending_deadline_reopens(self, mock_notify):
+        close_expired_assignments()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.teacher_token.key}')
+        res = self.client.patch(f'/api/assignments/{self.assignment.id}/', {
+            'deadline': (timezone.now() + timedelta(days=2)).isoformat(),
+        }, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(res.data['is_closed'])
+        self.assignment.refresh_from_db()
+        self.assertIsNone(self.assignment.final_analytics)
+
+
+# ── Gradebook Tests ──────────────────────────────────────────────────
+
+class GradebookTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher1', password='p', user_type='teacher')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        self.alice = User.objects.create_user(username='alice', password='p', user_type='student')
+        self.bob = User.objects.create_user(username='bob', password='p', user_type='student')
+        Enrollment.objects.create(student=self.alice, course=self.course, is_active=True)
+        Enrollment.objects.create(student=self.bob, course=self.course, is_active=True)
+        self.q1 = Assignment.objects.create(
+            course=self.course, title='Q1', assignment_type='quiz', content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        self.q2 = Assignment.objects.create(
+            course=self.course, title='Q2', assignment_type='quiz', content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        AssignmentSubmission.objects.create(assignment=self.q1, student=self.alice, answers=[0], score=25)
+        self.token = Token.objects.create(user=self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_endpoint_returns_columnar_matrix(self):
+        res = self.client.get(f'/api/courses/{self.course.id}/gradebook/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['students']['username'], ['alice', 'bob'])
+        self.assertEqual(res.data['assignments']['id'], [self.q1.id, self.q2.id])
+        self.assertEqual(res.data['assignments']['scores'], [[25, None], [None, None]])
+
+    def test_only_course_teacher(self):
+        token = Token.objects.create(user=self.alice)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        res = self.client.get(f'/api/courses/{self.course.id}/gradebook/')
+        self.assertEqual(res.status_code, 403)
+
+    def _stored(self):
+        """A mock Redis holding the gradebook the next read would store, whose layout
+        transactions apply to that hash."""
+        redis = MagicMock()
+        with patch('courses.gradebook.get_redis', return_value=redis):
+            redis.hgetall.return_value = {}
+            gradebook.get(self.course.id)
+        stored = dict(redis.pipeline.return_value.hset.call_args.kwargs['mapping'])
+        redis.hgetall.side_effect = lambda key: dict(stored)
+
+        def transaction(update, key):
+            pipe = MagicMock()
+            pipe.hget.side_effect = lambda key, field: stored.get(field)
+            pipe.hset.side_effect = lambda key, mapping: stored.update(mapping)
+            pipe.hdel.side_effect = lambda key, *cells: [stored.pop(cell, None) for cell in cells]
+            update(pipe)
+        redis.transaction.side_effect = transaction
+
+        def set_cell(script, numkeys, key, layout_field, cell, score):
+            if layout_field in stored:
+                stored[cell] = score
+        redis.eval.side_effect = set_cell
+        return redis
+
+    def test_incremental_updates_match_rebuild(self):
+        redis = self._stored()
+        carol = User.objects.create_user(username='carol', password='p', user_type='student')
+        Enrollment.objects.create(student=carol, course=self.course, is_active=True)
+        q3 = Assignment.objects.create(
+            course=self.course, title='Q3', assignment_type='quiz', content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        with patch('courses.gradebook.get_redis', return_value=redis):
+            gradebook.add_student(self.course.id, carol)
+            sub = AssignmentSubmission.objects.create(assignment=self.q2, student=carol, answers=[0], score=75)
+            gradebook.record_score(self.course.id, self.q2.id, carol.id, sub.score)
+            gradebook.add_assignment(q3)
+            Enrollment.objects.filter(student=self.bob).update(is_active=False)
+            gradebook.remove_student(self.course.id, self.bob.id)
+            with self.assertNumQueries(0):
+                stored = gradebook.get(self.course.id)
+        self.assertEqual(stored, gradebook.build(self.course.id))
+        self.assertEqual(stored['assignments']['scores'], [[25, None], [None, 75], [None, None]])
+
+    def test_score_is_a_single_cell_write(self):
+        redis = MagicMock()
+        with patch('courses.gradebook.get_redis', return_value=redis):
+            gradebook.record_score(self.course.id, self.q2.id, self.bob.id, 100)
+        redis.eval.assert_called_once_with(
+            gradebook._SET_CELL_SCRIPT, 1, f'course_gradebook:{self.course.id}',
+            '_layout', f'{self.q2.id}:{self.bob.id}', 100,
+        )
+
+    def test_falls_back_to_database_without_redis(self):
+        with patch('courses.gradebook.get_redis', side_effect=RedisConnectionError('down')):
+            self.assertEqual(gradebook.get(self.course.id), gradebook.build(self.course.id))
+
+    def test_submission_updates_stored_gradebook(self):
+        redis = self._stored()
+        token = Token.objects.create(user=self.bob)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        with patch('courses.gradebook.get_redis', return_value=redis):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/api/assignment-submissions/', {
+                    'assignment': self.q2.id, 'answers': [0, 1, 2, 3],
+                }, format='json')
+            self.assertEqual(gradebook.get(self.course.id)['assignments']['scores'][1], [None, 100])
+
+
+# ── Export Tests ─────────────────────────────────────────────────────
+
+class SubmissionExportTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher1', password='p', user_type='teacher')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        self.assignment = Assignment.objects.create(
+            course=self.course, title='Q1', assignment_type='quiz', content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        self.students = [
+            User.objects.create_user(username=f's{i}', password='p', user_type='student') for i in range(3)
+        ]
+        AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=self.students[0], answers=[0, 1, 2, 3], score=100,
+        )
+        AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=self.students[1], answers=[1], score=None,
+        )
+        self.token = Token.objects.create(user=self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _get(self, **params):
+        return self.client.get('/api/assignment-submissions/export/', params)
+
+    def test_csv_export(self):
+        res = self._get(assignment=self.assignment.id)
+        self.assertEqual(res.status_code, 200)
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'student_id,assignment_id,score,submitted_at,q1,q2,q3,q4')
+        self.assertEqual(len(lines), 3)
+        first, second = lines[1].split(','), lines[2].split(',')
+        self.assertEqual(first[2], '100')
+        self.assertEqual(first[4:], ['0', '1', '2', '3'])
+        self.assertEqual(second[2], '')
+        self.assertEqual(second[4:], ['1', '', '', ''])
+
+    def test_non_numeric_filters_are_rejected(self):
+        self.assertEqual(self._get(assignment='abc').status_code, 400)
+        self.assertEqual(self._get(course='1x').status_code, 400)
+
+    def test_columnar_export_roundtrip(self):
+        res = self._get(course=self.course.id, output='columnar')
+        self.assertEqual(res.status_code, 200)
+        data = read_columnar(b''.join(res.streaming_content))
+        self.assertEqual(data['question_count'], 4)
+        self.assertEqual(data['student_id'].tolist(), [self.students[0].id, self.students[1].id])
+        self.assertEqual(data['score'].tolist(), [100, -1])
+        self.assertEqual(data['answers'].tolist(), [[0, 1, 2, 3], [1, -1, -1, -1]])
+
+    def test_etag_until_next_submission(self):
+        res = self._get(assignment=self.assignment.id)
+        etag = res['ETag']
+        res = self.client.get(
+            '/api/assignment-submissions/export/', {'assignment': self.assignment.id}, HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(res.status_code, 304)
+        AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=self.students[2], answers=[0], score=25,
+        )
+        res = self.client.get(
+            '/api/assignment-submissions/export/', {'assignment': self.assignment.id}, HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_etag_changes_when_rescore_cancels_out(self):
+        AssignmentSubmission.objects.filter(student=self.students[1]).update(score=25)
+        AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=self.students[2], answers=[1, 0, 2, 3], score=50,
+        )
+        etag = self._get(assignment=self.assignment.id)['ETag']
+        # Swapping the first two keys swaps the 100 and the 50; the total stays the same
+        self.assignment.content = {'questions': [
+            dict(q, correct=correct) for q, correct in zip(QUIZ_CONTENT['questions'], [1, 0, 2, 3])
+        ]}
+        self.assignment.save()
+        self.assertEqual(rescore_assignment(self.assignment.id), 2)
+        res = self.client.get(
+            '/api/assignment-submissions/export/', {'assignment': self.assignment.id}, HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(res.status_code, 200)
+
+    def test_columnar_keeps_values_past_int16(self):
+        AssignmentSubmission.objects.filter(student=self.students[1]).update(answers=[70000])
+        data = read_columnar(b''.join(self._get(course=self.course.id, output='columnar').streaming_content))
+        self.assertEqual(data['answers'][1].tolist(), [70000, -1, -1, -1])
+
+    def test_requires_scope_and_ownership(self):
+        self.assertEqual(self._get().status_code, 400)
+        other = User.objects.create_user(username='teacher2', password='p', user_type='teacher')
+        token = Token.objects.create(user=other)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self._get(assignment=self.assignment.id).status_code, 404)
+
+
+# ── Submission Buffer Tests ──────────────────────────────────────────
+
+class SubmissionBufferTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher1', password='p', user_type='teacher')
+        self.student = User.objects.create_user(username='student1', password='p', user_type='student')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.assignment = Assignment.objects.create(
+            course=self.course, title='Q1', assignment_type='quiz', content=QUIZ_CONTENT,
+            created_by=self.teacher, deadline=timezone.now() + timedelta(hours=1),
+        )
+        self.token = Token.objects.create(user=self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _entry(self, receipt, student, received_at, answers=(0, 1, 2, 3)):
+        return {
+            'receipt': receipt, 'assignment_id': self.assignment.id, 'student_id': student.id,
+            'answers': list(answers), 'received_at': received_at,
+        }
+
+    def test_persist_entries_scores_and_keeps_receipt_time(self):
+        received_at = timezone.now() - timedelta(minutes=5)
+        results, submissions = submission_buffer.persist_entries([self._entry('r1', self.student, received_at)])
+        self.assertEqual(results, {'r1': ('persisted', '')})
+        self.assertEqual(len(submissions), 1)
+        submission = AssignmentSubmission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual(submission.score, 100)
+        self.assertEqual(submission.submitted_at, received_at)
+
+    def test_persist_entries_rejects_late_and_duplicate(self):
+        other = User.objects.create_user(username='student2', password='p', user_type='student')
+        AssignmentSubmission.objects.create(assignment=self.assignment, student=self.student, answers=[0], score=25)
+        results, submissions = submission_buffer.persist_entries([
+            self._entry('dup', self.student, timezone.now()),
+            self._entry('late', other, self.assignment.deadline + timedelta(seconds=1)),
+        ])
+        self.assertEqual(results['dup'][0], 'rejected')
+        self.assertEqual(results['late'], ('rejected', 'Received after the deadline.'))
+        self.assertEqual(submissions, [])
+        self.assertEqual(AssignmentSubmission.objects.count(), 1)
+
+    def test_persist_entries_reports_only_inserted_rows(self):
+        # Two entries for the same student in one batch: the second conflicts with the first
+        now = timezone.now()
+        results, submissions = submission_buffer.persist_entries([
+            self._entry('first', self.student, now), self._entry('second', self.student, now),
+        ])
+        self.assertEqual(results, {'first': ('persisted', ''), 'second': ('rejected', 'Already submitted.')})
+        self.assertEqual([s.pk for s in submissions], list(AssignmentSubmission.objects.values_list('pk', flat=True)))
+
+    def test_persist_entries_rejects_an_entry_that_cannot_be_scored(self):
+        other = User.objects.create_user(username='student2', password='p', user_type='student')
+        with patch('courses.buffer.score_answers', side_effect=[OverflowError('too big'), 100]):
+            results, submissions = submission_buffer.persist_entries([
+                self._entry('bad', self.student, timezone.now()), self._entry('good', other, timezone.now()),
+            ])
+        self.assertEqual(results['bad'], ('rejected', 'Could not be scored.'))
+        self.assertEqual(results['good'], ('persisted', ''))
+        self.assertEqual(len(submissions), 1)
+
+    @override_settings(SUBMISSION_BUFFER_BATCH_SIZE=10)
+    def test_flush_acks_malformed_entries(self):
+        good = {
+            'receipt': 'r1', 'assignment_id': str(self.assignment.id), 'student_id': str(self.student.id),
+            'answers': '[0, 1, 2, 3]', 'received_at': timezone.now().isoformat(),
+        }
+        bad = dict(good, receipt='r2', answers='not json')
+        redis = MagicMock()
+        redis.xautoclaim.side_effect = lambda *args, **kwargs: ['0-0', [], []]
+        redis.xreadgroup.side_effect = [[('submissions:buffer', [('1-0', good), ('2-0', bad)])], []]
+        pipe = redis.pipeline.return_value
+        with patch('courses.buffer.get_redis', return_value=redis):
+            self.assertEqual(submission_buffer.flush(), 2)
+        pipe.xack.assert_called_once_with('submissions:buffer', 'submission-flushers', '1-0', '2-0')
+        pipe.hset.assert_any_call(
+            'submissions:receipt:r2', mapping={'status': 'rejected', 'detail': 'Malformed submission.'},
+        )
+        self.assertTrue(AssignmentSubmission.objects.filter(student=self.student).exists())
+
+    @override_settings(SUBMISSION_BUFFER_ENABLED=True)
+    def test_buffered_submit_validates_answers_first(self):
+        with patch('courses.buffer.enqueue') as enqueue:
+            res = self.client.post('/api/assignment-submissions/', {
+                'assignment': self.assignment.id, 'answers': [2 ** 64],
+            }, format='json')
+        self.assertEqual(res.status_code, 400)
+        enqueue.assert_not_called()
+
+    @override_settings(SUBMISSION_BUFFER_ENABLED=True)
+    @patch('courses.buffer.flush')
+    def test_sweep_flushes_buffer_before_closing(self, mock_flush):
+        Assignment.objects.filter(pk=self.assignment.pk).update(deadline=timezone.now() - timedelta(minutes=1))
+        with patch('courses.analytics.finalize', side_effect=lambda a: mock_flush.assert_called_once()):
+            self.assertEqual(close_expired_assignments()['closed'], [self.assignment.id])
+
+    @override_settings(SUBMISSION_BUFFER_ENABLED=True)
+    def test_buffered_submit_returns_receipt(self):
+        receipt = {'receipt': 'a' * 32, 'status': 'pending', 'received_at': timezone.now()}
+        with patch('courses.buffer.enqueue', return_value=receipt) as enqueue:
+            res = self.client.post('/api/assignment-submissions/', {
+                'assignment': self.assignment.id, 'answers': [0, 1, 2, 3],
+            }, format='json')
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.data['receipt'], 'a' * 32)
+        enqueue.assert_called_once()
+        self.assertFalse(AssignmentSubmission.objects.exists())
+
+    @override_settings(SUBMISSION_BUFFER_ENABLED=True)
+    def test_buffered_submit_already_pending(self):
+        with patch('courses.buffer.enqueue', return_value=None):
+            res = self.client.post('/api/assignment-submissions/', {
+                'assignment': self.assignment.id, 'answers': [0],
+            }, format='json')
+        self.assertEqual(res.status_code, 409)
+
+    def test_flush_task_disabled_by_default(self):
+        self.assertEqual(flush_submission_buffer(), {'processed': 0})
+
+
+# ── Draft Autosave Tests ─────────────────────────────────────────────
+
+class SubmissionDraftTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher1', password='p', user_type='teacher')
+        self.student = User.objects.create_user(username='student1', password='p', user_type='student')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.assignment = Assignment.objects.create(
+            course=self.course, title='Q1', assignment_type='quiz', content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        self.token = Token.objects.create(user=self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = f'/api/assignments/{self.assignment.id}/draft/'
+
+    def test_save_checkpoints_upserts(self):
+        first = timezone.now()
+        key = (self.assignment.id, self.student.id)
+        self.assertEqual(submission_drafts.save_checkpoints({key: ({0: 1}, first)}), 1)
+        later = first + timedelta(seconds=30)
+        submission_drafts.save_checkpoints({key: ({0: 2, 3: 0}, later)})
+        draft = SubmissionDraft.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual(draft.answers, {'0': 2, '3': 0})
+        self.assertEqual(draft.updated_at, later)
+
+    def test_save_checkpoints_skips_submitted(self):
+        AssignmentSubmission.objects.create(assignment=self.assignment, student=self.student, answers=[0], score=25)
+        written = submission_drafts.save_checkpoints({(self.assignment.id, self.student.id): ({0: 1}, timezone.now())})
+        self.assertEqual(written, 0)
+        self.assertFalse(SubmissionDraft.objects.exists())
+
+    def test_prune_submitted_deletes_only_submitted_checkpoints(self):
+        other = Assignment.objects.create(
+            course=self.course, title='Q2', assignment_type='quiz', content=QUIZ_CONTENT, created_by=self.teacher,
+        )
+        for assignment in (self.assignment, other):
+            SubmissionDraft.objects.create(
+                assignment=assignment, student=self.student, answers={'0': 1}, updated_at=timezone.now(),
+            )
+        AssignmentSubmission.objects.create(assignment=self.assignment, student=self.student, answers=[0], score=25)
+        self.assertEqual(submission_drafts.prune_submitted(), 1)
+        self.assertEqual(list(SubmissionDraft.objects.values_list('assignment_id', flat=True)), [other.id])
+
+    def test_as_list_pads_gaps(self):
+        self.assertEqual(submission_drafts.as_list({0: 1, 2: 3}, 4), [1, None, 3, None])
+
+    def test_patch_rejects_out_of_range_question(self):
+        res = self.client.patch(self.url, {'answers': {'4': 1}}, format='json')
+        self.assertEqual(res.status_code, 400)
+        res = self.client.patch(self.url, {'answers': {'0': 'b'}}, format='json')
+        self.assertEqual(res.status_code, 400)
+
+    def test_patch_updates_draft(self):
+        with patch('courses.drafts.update', return_value=({0: 2, 1: 1}, timezone.now())) as update:
+            res = self.client.patch(self.url, {'answers': {'1': 1}}, format='json')
+        self.assertEqual(res.status_code, 200)
+        update.assert_called_once_with(self.assignment.id, self.student.id, {1: 1})
+        self.assertEqual(res.data['answers'], [2, 1, None, None])
+
+    def test_draft_non_numeric_pk_is_not_found(self):
+        self.assertEqual(self.client.get('/api/assignments/abc/draft/').status_code, 404)
+
+    def test_draft_requires_enrollment(self):
+        Enrollment.objects.filter(student=self.student).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_submit_promotes_draft(self):
+        with patch('courses.drafts.load', return_value=({0: 0, 1: 1, 2: 2, 3: 3}, timezone.now())):
+            res = self.client.post('/api/assignment-submissions/', {'assignment': self.assignment.id}, format='json')
+        self.assertEqual(res.status_code, 201)
+        submission = AssignmentSubmission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual(submission.answers, [0, 1, 2, 3])
+        self.assertEqual(submission.score, 100)
+
+
+# ── Quiz Variant Tests ───────────────────────────────────────────────
+
+class QuizVariantTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher1', password='p', user_type='teacher')
+        self.student = User.objects.create_user(username='student1', password='p', user_type='student')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.assignment = Assignment.objects.create(
+            course=self.course, title='Q1', assignment_type='quiz', content=QUIZ_CONTENT,
+            created_by=self.teacher, shuffle=True,
+        )
+        self.token = Token.objects.create(user=self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_variant_is_deterministic_per_student(self):
+        counts = self.assignment.option_counts
+        self.assertEqual(counts, [4, 4, 4, 4])
+        first = Variant(self.assignment.id, self.student.id, counts)
+        again = Variant(self.assignment.id, self.student.id, counts)
+        self.assertEqual((first.questions, first.options), (again.questions, again.options))
+        self.assertEqual(sorted(first.questions), [0, 1, 2, 3])
+
+    def test_canonical_roundtrip(self):
+        variant = Variant(self.assignment.id, self.student.id, [4, 4, 4, 4])
+        canonical = [3, -1, 0, 2]
+        self.assertEqual(variant.to_canonical(variant.from_canonical(canonical)), canonical)
+
+    def test_rendered_options_map_back_to_canonical(self):
+        variant = Variant(self.assignment.id, self.student.id, [4, 4, 4, 4])
+        rendered = variant.render(self.assignment.student_content)
+        # Pick the correct option text in every rendered question
+        answers = []
+        for question in rendered['questions']:
+            original = next(q for q in QUIZ_CONTENT['questions'] if q['question'] == question['question'])
+            answers.append(question['options'].index(original['options'][original['correct']]))
+        self.assertEqual(variant.to_canonical(answers), [0, 1, 2, 3])
+
+    def test_submit_in_variant_order_scores_canonically(self):
+        res = self.client.get(f'/api/assignments/{self.assignment.id}/')
+        variant = Variant(self.assignment.id, self.student.id, self.assignment.option_counts)
+        self.assertEqual(res.data['content'], variant.render(self.assignment.student_content))
+        shown_key = variant.from_canonical(self.assignment.answer_key)
+        res = self.client.post('/api/assignment-submissions/', {
+            'assignment': self.assignment.id, 'answers': shown_key,
+        }, format='json')
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['score'], 100)
+        self.assertEqual(res.data['answers'], shown_key)
+        submission = AssignmentSubmission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual(submission.answers, [0, 1, 2, 3])
+        res = self.client.get(f'/api/assignments/{self.assignment.id}/')
+        self.assertEqual(res.data['answer_key'], shown_key)
+
+
+# ── Flashcard Review Tests ───────────────────────────────────────────
+
+class CardReviewTest(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher1', password='p', user_type='teacher')
+        self.student = User.objects.create_user(username='student1', password='p', user_type='student')
+        self.course = Course.objects.create(
+            title='C', description='D', teacher=self.teacher, code='C1',
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.assignment = Assignment.objects.create(
+            course=self.course, title='Cards', assignment_type='flashcard', created_by=self.teacher,
+            content={'cards': [{'front': f'f{i}', 'back': f'b{i}'} for i in range(5)]},
+        )
+        self.token = Token.objects.create(user=self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_sm2_intervals(self):
+        state = CardReviewState(ease=2500, interval_days=0, repetitions=0)
+        now = timezone.now()
+        intervals = [reviews.schedule(state, 5, now).interval_days for _ in range(3)]
+        self.assertEqual(intervals, [1, 6, 16])
+        self.assertEqual(state.ease, 2800)
+        reviews.schedule(state, 1, now)
+        self.assertEqual((state.repetitions, state.interval_days), (0, 1))
+        self.assertEqual(state.ease, 2260)
+        self.assertEqual(state.due_at, now + timedelta(days=1))
+
+    def test_ease_has_a_floor(self):
+        state = CardReviewState(ease=1400, interval_days=0, repetitions=0)
+        reviews.schedule(state, 0, timezone.now())
+        self.assertEqual(state.ease, reviews.MIN_EASE)
+
+    def test_due_starts_cards_and_pages(self):
+        res = self.client.get('/api/card-reviews/due/', {'assignment': self.assignment.id, 'limit': 3})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(CardReviewState.objects.filter(student=self.student).count(), 5)
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertEqual(res.data['results'][0]['card'], {'front': 'f0', 'back': 'b0'})
+        res2 = self.client.get('/api/card-reviews/due/', {'after': res.data['next'], 'limit': 3})
+        self.assertEqual(len(res2.data['results']), 2)
+        self.assertIsNone(res2.data['next'])
+        seen = {r['id'] for r in res.data['results']} | {r['id'] for r in res2.data['results']}
+        self.assertEqual(len(seen), 5)
+
+    def test_due_rejects_out_of_range_cursor(self):
+        for cursor in ('garbage', f'{10 ** 30}:1', f'1:{2 ** 64}', '1:0'):
+            res = self.client.get('/api/card-reviews/due/', {'after': cursor})
+            self.assertEqual(res.status_code, 400, cursor)
+
+    def test_review_batch_reschedules(self):
+        self.client.get('/api/card-reviews/due/', {'assignment': self.assignment.id})
+        ids = list(CardReviewState.objects.filter(student=self.student).values_list('pk', flat=True))
+        # Token lookup, one SELECT of the states and a single bulk UPDATE
+        with self.assertNumQueries(3):
+            res = self.client.post('/api/card-reviews/review/', {
+                'reviews': [{'id': pk, 'quality': 4} for pk in ids[:3]],
+            }, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(all(r['repetitions'] == 1 for r in res.data))
+        res = self.client.get('/api/card-reviews/due/')
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_early_reviews_are_ignored_and_intervals_are_capped(self):
+        self.client.get('/api/card-reviews/due/', {'assignment': self.assignment.id})
+        state = CardReviewState.objects.filter(student=self.student).first()
+        for _ in range(15):
+            res = self.client.post('/api/card-reviews/review/', {
+                'reviews': [{'id': state.pk, 'quality': 5}],
+            }, format='json')
+            self.assertEqual(res.status_code, 200)
+            # Make the card due again so the next review counts
+            CardReviewState.objects.filter(pk=state.pk).update(due_at=timezone.now())
+        state.refresh_from_db()
+        self.assertEqual(state.interval_days, reviews.MAX_INTERVAL_DAYS)
+        self.assertEqual(state.repetitions, 15)
+
+        # Reviewed now, so a second review straight away is too early and ignored
+        for expected in (1, 0):
+            res = self.client.post('/api/card-reviews/review/', {
+                'reviews': [{'id': state.pk, 'quality': 5}],
+            }, format='json')
+            self.assertEqual(len(res.data), expected)
+        state.refresh_from_db()
+        self.assertEqual(state.repetitions, 16)
+
+    def test_due_with_non_numeric_assignment_is_not_found(self):
+        res = self.client.get('/api/card-reviews/due/', {'assignment': 'abc'})
+        self.assertEqual(res.status_code, 404)
+
+    def test_review_rejects_bad_quality(self):
+        res = self.client.post('/api/card-reviews/review/', {'reviews': [{'id': 1, 'quality': 7}]}, format='json')
+        self.assertEqual(res.status_code, 400)
+
+    def test_due_requires_enrollment(self):
+        Enrollment.objects.filter(student=self.student).update(is_active=False)
+        res = self.client.get('/api/card-reviews/due/', {'assignment': self.assignment.id})
+        self.assertEqual(res.status_code, 404)
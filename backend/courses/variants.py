@@ -0,0 +1,84 @@
+"""
+Per-student quiz variants.
+
+When an assignment has ``shuffle`` set, every student sees the questions and
+the options of each question in their own order. Nothing is stored per
+student: the permutations come from a PRNG seeded with
+``(assignment id, student id)``, so the same student always gets the same
+variant and it can be rebuilt on any process in O(questions + options) from
+columns already on the assignment row (``option_counts``).
+
+Submissions are stored in canonical order, so scoring, analytics, exports
+and rescoring never need to know about variants. ``to_canonical`` maps a
+student's answers back through the inverse permutation when they submit and
+``from_canonical`` maps stored answers (or the answer key) into their order.
+"""
+import random
+
+from .models import NO_ANSWER
+
+
+def _is_option(value, count):
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value < count
+
+
+class Variant:
+    """Question and option permutations for one student on one assignment.
+
+    ``questions[p]`` is the canonical index of the question shown at position
+    ``p``; ``options[q][k]`` is the canonical index of the option shown at
+    position ``k`` of canonical question ``q``.
+    """
+
+    def __init__(self, assignment_id, student_id, option_counts):
+        rng = random.Random(f'{assignment_id}:{student_id}')
+        self.questions = list(range(len(option_counts)))
+        rng.shuffle(self.questions)
+        self.options = []
+        for count in option_counts:
+            order = list(range(count))
+            rng.shuffle(order)
+            self.options.append(order)
+
+    @classmethod
+    def for_assignment(cls, assignment, student_id):
+        """Return the student's variant, or None if the assignment is not shuffled."""
+        if not assignment.shuffle or assignment.assignment_type != 'quiz':
+            return None
+        return cls(assignment.pk, student_id, assignment.option_counts)
+
+    def render(self, content):
+        """Reorder (student-facing) quiz content into this variant."""
+        questions = content.get('questions') if isinstance(content, dict) else None
+        if not isinstance(questions, list) or len(questions) != len(self.questions):
+            return content
+        rendered = []
+        for q in self.questions:
+            question = questions[q]
+            options = question.get('options') if isinstance(question, dict) else None
+            if isinstance(options, list) and len(options) == len(self.options[q]):
+                question = {**question, 'options': [options[k] for k in self.options[q]]}
+            rendered.append(question)
+        return {**content, 'questions': rendered}
+
+    def to_canonical(self, answers):
+        """Map answers given in this variant's order back to canonical order."""
+        if not isinstance(answers, list):
+            return answers
+        canonical = [NO_ANSWER] * len(self.questions)
+        for position, answer in enumerate(answers[:len(self.questions)]):
+            q = self.questions[position]
+            canonical[q] = self.options[q][answer] if _is_option(answer, len(self.options[q])) else answer
+        return canonical
+
+    def from_canonical(self, answers):
+        """Map canonical answers (or an answer key) into this variant's order."""
+        if not isinstance(answers, list):
+            return answers
+        shown = []
+        for q in self.questions:
+            answer = answers[q] if q < len(answers) else NO_ANSWER
+            if _is_option(answer, len(self.options[q])):
+                answer = self.options[q].index(answer)
+            shown.append(answer)
+        return shown
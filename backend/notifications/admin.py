@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Notification
+from . import outbox
+from .models import Notification, NotificationContent, OutboxMessage
 
 
 @admin.register(Notification)
@@ -7,6 +8,30 @@ class NotificationAdmin(admin.ModelAdmin):
     """Admin configuration for Notification model"""
     list_display = ['recipient', 'notification_type', 'title', 'is_read', 'created_at']
     list_filter = ['notification_type', 'is_read', 'created_at']
-    search_fields = ['recipient__username', 'title', 'message']
+    search_fields = ['recipient__username', 'content__title', 'content__message']
+    list_select_related = ['recipient', 'content']
+    raw_id_fields = ['content']
     ordering = ['-created_at']
     date_hierarchy = 'created_at'
+
+
+@admin.register(NotificationContent)
+class NotificationContentAdmin(admin.ModelAdmin):
+    """Admin configuration for NotificationContent model"""
+    list_display = ['title', 'link', 'created_at']
+    search_fields = ['title', 'message']
+    ordering = ['-created_at']
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """Admin configuration for OutboxMessage model"""
+    list_display = ['task', 'created_at', 'published_at', 'processed_at', 'failed_at', 'attempts']
+    list_filter = [('failed_at', admin.EmptyFieldListFilter), 'task', 'created_at']
+    ordering = ['-created_at']
+    actions = ['retry_failed']
+
+    @admin.action(description='Retry selected failed messages')
+    def retry_failed(self, request, queryset):
+        retried = outbox.retry(queryset)
+        self.message_user(request, f'{retried} message(s) handed back to the relay.')
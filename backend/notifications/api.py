@@ -1,7 +1,10 @@
-from rest_framework import viewsets, permissions
+from django.db import transaction
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from . import counters, inbox
 from .models import Notification
+from .realtime import push_unread_count
 from .serializers import NotificationSerializer
 
 
@@ -10,16 +13,43 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        return Notification.objects.filter(recipient=self.request.user).select_related('content')
+
+    def list(self, request, *args, **kwargs):
+        """The user's notifications, newest first.
+
+        Query params: ``unread_only`` (``true`` to skip read notifications),
+        ``limit`` and ``after`` (the ``next`` cursor of the previous page).
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', inbox.DEFAULT_PAGE_SIZE)), inbox.MAX_PAGE_SIZE)
+            after = request.query_params.get('after')
+            after = inbox.decode_cursor(after) if after else None
+        except (ValueError, OverflowError):
+            return Response({'error': 'Invalid limit or cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'Invalid limit or cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        unread_only = request.query_params.get('unread_only', '').lower() in ('1', 'true')
+        notifications, next_cursor = inbox.page(request.user, unread_only, after, limit)
+        return Response({'results': self.get_serializer(notifications, many=True).data, 'next': next_cursor})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread_count': counters.get(request.user.pk)})
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+        counters.reset_on_commit(request.user.pk)
+        transaction.on_commit(lambda: push_unread_count(request.user.pk), robust=True)
         return Response({'detail': 'All notifications marked as read.'})
 
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         notification = self.get_object()
+        # Conditional update so two concurrent requests can't both decrement the counter
+        if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+            counters.decr_on_commit(request.user.pk)
+            transaction.on_commit(lambda: push_unread_count(request.user.pk), robust=True)
         notification.is_read = True
-        notification.save(update_fields=['is_read'])
         return Response(NotificationSerializer(notification).data)
@@ -0,0 +1,39 @@
+import json
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
+
+from .realtime import user_group, unread_count
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """Per-user WebSocket that pushes new notifications and the unread count"""
+
+    async def connect(self):
+        self.user = self.scope['user']
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+
+        self.group_name = user_group(self.user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        count = await database_sync_to_async(unread_count)(self.user.id)
+        await self.send(text_data=json.dumps({'type': 'unread_count', 'unread_count': count}))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data):
+        # Push only; clients use the REST API to mark notifications read
+        pass
+
+    # --- Group event handlers ---
+    async def notification_push(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'notification', 'notification': event['notification'], 'unread_count': event['unread_count'],
+        }))
+
+    async def unread_count_update(self, event):
+        await self.send(text_data=json.dumps({'type': 'unread_count', 'unread_count': event['unread_count']}))
@@ -0,0 +1,156 @@
+"""
+Per-user unread notification counters kept in Redis.
+
+The unread badge is read on every page load, so it is served from a counter
+(``notifications:unread:<user_id>``) instead of counting rows. Counters are
+adjusted after the transaction that changed the rows commits: incremented
+when notifications are created, decremented when one is marked read and
+zeroed by "mark all read". A missing counter is warmed from the database on
+first read, and ``reconcile`` periodically rewrites existing counters from an
+indexed count so drift (rows deleted by cascades, races between a create and
+"mark all read") never lasts longer than one reconciliation interval.
+
+If Redis is unavailable reads fall back to the database count.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from redis.exceptions import RedisError
+
+from core.redis import get_redis
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'notifications:unread:'
+
+
+def _key(user_id):
+    return f'{KEY_PREFIX}{user_id}'
+
+
+def count_unread(user_ids):
+    """Return ``{user_id: unread count}`` for the given users with one grouped query."""
+    counts = dict.fromkeys(user_ids, 0)
+    rows = (
+        Notification.objects.filter(recipient_id__in=user_ids, is_read=False)
+        .order_by()
+        .values('recipient_id')
+        .annotate(unread=Count('pk'))
+        .values_list('recipient_id', 'unread')
+    )
+    counts.update(rows)
+    return counts
+
+
+def get(user_id):
+    """Return the user's unread count, warming the counter from the database on a miss."""
+    try:
+        value = get_redis().get(_key(user_id))
+    except RedisError:
+        logger.warning('Unread counter unavailable for user %s; counting in the database', user_id)
+        return count_unread([user_id])[user_id]
+    if value is not None:
+        return max(int(value), 0)
+    count = count_unread([user_id])[user_id]
+    try:
+        # nx: don't overwrite a counter another reader warmed in the meantime
+        get_redis().set(_key(user_id), count, nx=True)
+    except RedisError:
+        pass
+    return count
+
+
+def get_many(user_ids):
+    """Return ``{user_id: unread count}`` with one MGET, warming missing counters with one grouped query."""
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+    try:
+        values = get_redis().mget([_key(user_id) for user_id in user_ids])
+    except RedisError:
+        logger.warning('Unread counters unavailable for %d users; counting in the database', len(user_ids))
+        return count_unread(user_ids)
+    counts = {user_id: max(int(value), 0) for user_id, value in zip(user_ids, values) if value is not None}
+    missing = [user_id for user_id in user_ids if user_id not in counts]
+    if missing:
+        warmed = count_unread(missing)
+        counts.update(warmed)
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for user_id, count in warmed.items():
+                pipe.set(_key(user_id), count, nx=True)
+            pipe.execute()
+        except RedisError:
+            pass
+    return counts
+
+
+def _apply(operation, user_ids):
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for user_id in user_ids:
+            operation(pipe, _key(user_id))
+        pipe.execute()
+    except RedisError:
+        logger.exception('Failed to update unread counters; they will be fixed by the next reconciliation')
+
+
+def _incr_existing(pipe, key):
+    # Only bump warm counters; a cold one is computed from the database on first read
+    pipe.eval("if redis.call('exists', KEYS[1]) == 1 then return redis.call('incr', KEYS[1]) end", 1, key)
+
+
+def _decr_existing(pipe, key):
+    pipe.eval(
+        "local v = redis.call('get', KEYS[1]) "
+        "if v and tonumber(v) > 0 then return redis.call('decr', KEYS[1]) end",
+        1, key,
+    )
+
+
+def incr_on_commit(user_ids):
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: _apply(_incr_existing, user_ids), robust=True)
+
+
+def decr_on_commit(user_id):
+    transaction.on_commit(lambda: _apply(_decr_existing, [user_id]), robust=True)
+
+
+def reset_on_commit(user_id):
+    transaction.on_commit(lambda: _apply(lambda pipe, key: pipe.set(key, 0), [user_id]), robust=True)
+
+
+def reconcile(batch_size=None):
+    """Rewrite every warm counter from the database; return the number that had drifted."""
+    batch_size = batch_size or settings.NOTIFICATION_UNREAD_RECONCILE_BATCH_SIZE
+    client = get_redis()
+    keys = client.scan_iter(match=f'{KEY_PREFIX}*', count=batch_size)
+    corrected = 0
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) >= batch_size:
+            corrected += _reconcile_batch(client, batch)
+            batch = []
+    if batch:
+        corrected += _reconcile_batch(client, batch)
+    return corrected
+
+
+def _reconcile_batch(client, keys):
+    user_ids = [int(key[len(KEY_PREFIX):]) for key in keys]
+    cached = client.mget(keys)
+    counts = count_unread(user_ids)
+    pipe = client.pipeline(transaction=False)
+    corrected = 0
+    for user_id, value in zip(user_ids, cached):
+        if value is None or int(value) != counts[user_id]:
+            pipe.set(_key(user_id), counts[user_id])
+            corrected += 1
+    pipe.execute()
+    return corrected
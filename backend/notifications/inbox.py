@@ -0,0 +1,53 @@
+"""
+Keyset-paginated notification inbox.
+
+Pages are read newest first with a range scan over the ``(recipient,
+created_at)`` index, or ``(recipient, is_read, created_at)`` for the unread
+filter, starting just after the last row of the previous page. Unlike
+OFFSET, the cost of a page does not grow with how far down the inbox it is,
+so the hundredth page of a 100k-notification inbox is as cheap as the first.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from .models import Notification
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MAX_PK = 2 ** 63 - 1
+
+
+def encode_cursor(notification):
+    return f'{(notification.created_at - _EPOCH) // timedelta(microseconds=1)}:{notification.pk}'
+
+
+def decode_cursor(cursor):
+    """Return ``(created_at, pk)`` from a cursor, raising ValueError when it is malformed."""
+    micros, pk = cursor.split(':')
+    try:
+        created_at = _EPOCH + timedelta(microseconds=int(micros))
+    except OverflowError:
+        raise ValueError(f'Cursor timestamp out of range: {micros}') from None
+    pk = int(pk)
+    if not 0 < pk <= _MAX_PK:
+        raise ValueError(f'Cursor id out of range: {pk}')
+    return created_at, pk
+
+
+def inbox(user, unread_only=False):
+    notifications = Notification.objects.filter(recipient=user)
+    if unread_only:
+        notifications = notifications.filter(is_read=False)
+    return notifications.select_related('content').order_by('-created_at', '-pk')
+
+
+def page(user, unread_only=False, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Return a page of the user's notifications, newest first, and the cursor of the next page."""
+    notifications = inbox(user, unread_only)
+    if after is not None:
+        created_at, pk = after
+        # (created_at, pk) < (after): the leading range condition lets the scan seek into the index
+        notifications = notifications.filter(created_at__lte=created_at).exclude(created_at=created_at, pk__gte=pk)
+    rows = list(notifications[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,227 @@
+"""
+Queued, rate-limited email dispatch.
+
+``QueuedEmailBackend`` is a Django email backend that does not talk to SMTP at
+all: ``send_messages`` serialises each message and appends it to a Redis
+stream, so ``send_mail``, ``send_mass_mail`` and ``EmailMessage.send`` return
+after one round trip to Redis wherever they are called. ``drain`` runs in a
+Celery worker. It reads the stream in batches through a consumer group and
+delivers them through ``settings.EMAIL_DISPATCH_BACKEND`` over one SMTP
+connection that the worker keeps open between batches, no faster than
+``settings.EMAIL_RATE_LIMIT`` messages per second across all workers.
+
+A message is acknowledged once the server has accepted or permanently
+rejected it; a batch left unacknowledged by a crashed worker is claimed again
+by the next drain, so delivery is at-least-once.
+
+For local development point ``EMAIL_HOST``/``EMAIL_PORT`` at a debugging
+server, e.g. ``python -m aiosmtpd -n -l localhost:1025`` with
+``EMAIL_USE_TLS=False``.
+"""
+import base64
+import json
+import logging
+import os
+import smtplib
+import socket
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+STREAM = 'mail:outbox'
+GROUP = 'mail-senders'
+# Entries a dead sender read but never acknowledged are claimed again after this long
+CLAIM_IDLE_MS = 5 * 60 * 1000
+
+
+def is_connection_error(error):
+    """True if the connection is gone, as opposed to the server refusing one message."""
+    # SMTPException subclasses OSError, so refusals have to be told apart explicitly
+    return isinstance(error, smtplib.SMTPServerDisconnected) or (
+        isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+    )
+
+
+def serialize(message):
+    data = {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': message.extra_headers,
+        'content_subtype': message.content_subtype,
+        'alternatives': [list(a) for a in getattr(message, 'alternatives', [])],
+        'attachments': [],
+    }
+    for attachment in message.attachments:
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        data['attachments'].append([filename, base64.b64encode(content).decode('ascii'), mimetype])
+    return json.dumps(data)
+
+
+def deserialize(raw):
+    data = json.loads(raw)
+    message = EmailMultiAlternatives(
+        subject=data['subject'], body=data['body'], from_email=data['from_email'],
+        to=data['to'], cc=data['cc'], bcc=data['bcc'], reply_to=data['reply_to'], headers=data['headers'],
+        alternatives=[tuple(a) for a in data['alternatives']],
+    )
+    message.content_subtype = data['content_subtype']
+    for filename, content, mimetype in data['attachments']:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Email backend that queues messages for ``drain`` instead of sending them."""
+
+    def send_messages(self, email_messages):
+        messages = [m for m in email_messages if m.recipients()]
+        if not messages:
+            return 0
+        try:
+            # Render every message first so one that can never be sent (a newline in
+            # a header, say) is rejected here instead of wedging the stream
+            for message in messages:
+                message.message()
+            pipe = get_redis().pipeline(transaction=False)
+            for message in messages:
+                pipe.xadd(STREAM, {'message': serialize(message)})
+            pipe.execute()
+        except Exception:
+            if not self.fail_silently:
+                raise
+            logger.exception('Failed to queue %d email(s)', len(messages))
+            return 0
+        return len(messages)
+
+
+_connection = None
+
+
+def worker_connection():
+    """Return this process's open connection to the real email backend, opening it if needed."""
+    global _connection
+    if _connection is None:
+        _connection = get_connection(settings.EMAIL_DISPATCH_BACKEND)
+    _connection.open()
+    return _connection
+
+
+def reset_connection():
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception:
+            pass
+    _connection = None
+
+
+def throttle(client=None):
+    """Block until sending one more message keeps every worker under ``EMAIL_RATE_LIMIT`` per second."""
+    limit = settings.EMAIL_RATE_LIMIT
+    if not limit:
+        return
+    client = client or get_redis()
+    while True:
+        now = time.time()
+        window = f'mail:rate:{int(now)}'
+        pipe = client.pipeline()
+        pipe.incr(window)
+        pipe.expire(window, 2)
+        sent_this_second, _ = pipe.execute()
+        if sent_this_second <= limit:
+            return
+        time.sleep(1 - (now % 1))
+
+
+def send_batch(messages, connection=None, on_send=None, failures=None):
+    """Send messages one by one over a single connection.
+
+    Returns ``(sent, failures)`` where ``failures`` maps the index of each
+    message the server refused, or that could not be rendered, to the error.
+    A dropped connection is reopened once; if it drops again the exception
+    propagates and the unsent messages are left to the caller. Pass a
+    ``failures`` dict to keep the refusals recorded before that happened.
+    """
+    connection = connection or worker_connection()
+    sent = 0
+    failures = {} if failures is None else failures
+    for index, message in enumerate(messages):
+        if on_send:
+            on_send()
+        for attempt in (1, 2):
+            try:
+                connection.send_messages([message])
+                sent += 1
+            except OSError as e:
+                if not is_connection_error(e):
+                    # Refused recipients, bad sender, message too large: retrying won't help
+                    failures[index] = str(e)
+                elif attempt == 1:
+                    connection.close()
+                    connection.open()
+                    continue
+                else:
+                    raise
+            except Exception as e:
+                # The message itself is unsendable (e.g. BadHeaderError); retrying won't help
+                failures[index] = str(e)
+            break
+    return sent, failures
+
+
+def _ensure_group(client):
+    try:
+        client.xgroup_create(STREAM, GROUP, id='0', mkstream=True)
+    except Exception as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def drain(batch_size=None):
+    """Deliver queued messages until the stream is empty; return ``{'sent': n, 'failed': n}``."""
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    client = get_redis()
+    _ensure_group(client)
+    consumer = f'{socket.gethostname()}-{os.getpid()}'
+    sent = failed = 0
+    while True:
+        _, claimed, *_ = client.xautoclaim(STREAM, GROUP, consumer, CLAIM_IDLE_MS, '0-0', count=batch_size)
+        entries = claimed
+        if len(entries) < batch_size:
+            response = client.xreadgroup(GROUP, consumer, {STREAM: '>'}, count=batch_size - len(entries))
+            for _, stream_entries in response or []:
+                entries.extend(stream_entries)
+        if not entries:
+            return {'sent': sent, 'failed': failed}
+
+        messages = [deserialize(fields['message']) for _, fields in entries]
+        connection = worker_connection()
+        try:
+            batch_sent, failures = send_batch(messages, connection, on_send=lambda: throttle(client))
+        except OSError:
+            reset_connection()
+            logger.exception('Lost the SMTP connection; %d queued emails will be retried', len(entries))
+            return {'sent': sent, 'failed': failed}
+        for index, error in failures.items():
+            logger.warning('Email to %s refused: %s', ', '.join(messages[index].recipients()), error)
+        entry_ids = [entry_id for entry_id, _ in entries]
+        pipe = client.pipeline()
+        pipe.xack(STREAM, GROUP, *entry_ids)
+        pipe.xdel(STREAM, *entry_ids)
+        pipe.execute()
+        sent += batch_sent
+        failed += len(failures)
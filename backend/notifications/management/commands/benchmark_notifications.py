@@ -0,0 +1,148 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from notifications import inbox
+from notifications.models import Notification, NotificationContent
+from notifications.utils import insert_bulk_notifications
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark bulk notification creation (per-row INSERTs vs batched bulk_create), '
+        'or with --inbox N, inbox page latency (OFFSET vs keyset) for one user with N notifications'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=10000)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--inbox', type=int, default=0, metavar='N')
+        parser.add_argument('--page-size', type=int, default=inbox.DEFAULT_PAGE_SIZE)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['inbox']:
+            return self._benchmark_inbox(options['inbox'], options['page_size'], options['repeat'])
+        count = options['recipients']
+        results = {}
+        # Everything runs in a transaction that is rolled back, so the database is left untouched
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    [
+                        User(username=f'bench-recipient-{i}', email=f'bench-recipient-{i}@example.com',
+                             user_type='student', password='!')
+                        for i in range(count)
+                    ],
+                    batch_size=1000,
+                )
+                recipients = list(User.objects.filter(username__startswith='bench-recipient-').only('id', 'email'))
+                results['per-row create()'] = self._time(self._per_row, recipients)
+                results['bulk_create'] = self._time(
+                    lambda r: insert_bulk_notifications(
+                        recipients=r, notification_type='general', title='Benchmark', message='Benchmark',
+                        batch_size=options['batch_size'],
+                    ),
+                    recipients,
+                )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self.stdout.write(f'{count} recipients')
+        for label, seconds in results.items():
+            self.stdout.write(f'  {label:<18} {seconds:8.3f}s')
+        self.stdout.write(self.style.SUCCESS(
+            f"Speedup: {results['per-row create()'] / results['bulk_create']:.1f}x"
+        ))
+
+    def _time(self, fn, recipients):
+        with transaction.atomic():
+            start = time.perf_counter()
+            fn(recipients)
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
+
+    def _per_row(self, recipients):
+        # The previous implementation: a separate INSERT and copy of the body for every recipient
+        for recipient in recipients:
+            Notification.objects.create(
+                recipient=recipient, notification_type='general', title='Benchmark', message='Benchmark',
+            )
+
+    def _benchmark_inbox(self, size, page_size, repeat):
+        results = []
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='bench-inbox', user_type='student', password='!')
+                other = User.objects.create(username='bench-inbox-other', user_type='student', password='!')
+                content = NotificationContent.objects.create(title='Benchmark', message='Benchmark')
+                start = timezone.now()
+                # Interleave another user's rows so the index has to separate recipients; a tenth are unread
+                Notification.objects.bulk_create(
+                    [
+                        Notification(
+                            recipient=user if i % 2 == 0 else other, content=content, notification_type='general',
+                            is_read=i % 20 != 0, created_at=start - timedelta(seconds=i),
+                        )
+                        for i in range(size * 2)
+                    ],
+                    batch_size=5000,
+                )
+                with connection.cursor() as cursor:
+                    # Give the planner statistics, as a production database would have
+                    cursor.execute('ANALYZE')
+                newest_first = inbox.inbox(user)
+                for depth in sorted({0, size // 2, max(size - page_size, 0)}):
+                    offset_ms = self._time_query(lambda: list(newest_first[depth:depth + page_size]), repeat)
+                    after = None
+                    if depth:
+                        anchor = newest_first[depth - 1]
+                        after = (anchor.created_at, anchor.pk)
+                    keyset_ms = self._time_query(lambda: inbox.page(user, after=after, limit=page_size), repeat)
+                    results.append((depth, offset_ms, keyset_ms))
+                unread_ms = self._time_query(lambda: inbox.page(user, unread_only=True, limit=page_size), repeat)
+                # Skip the deep unread page when there are too few unread rows to reach one
+                anchor_index = size // 20 - page_size - 1
+                deep_unread_ms = None
+                if anchor_index >= 0:
+                    anchor = inbox.inbox(user, unread_only=True)[anchor_index]
+                    deep_unread_ms = self._time_query(
+                        lambda: inbox.page(
+                            user, unread_only=True, after=(anchor.created_at, anchor.pk), limit=page_size,
+                        ),
+                        repeat,
+                    )
+                plan = inbox.inbox(user, unread_only=True)[:page_size].explain()
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self.stdout.write(f'{size} notifications, {page_size} per page, median of {repeat} runs')
+        self.stdout.write(f"  {'rows skipped':>12} {'OFFSET':>10} {'keyset':>10}")
+        for depth, offset_ms, keyset_ms in results:
+            self.stdout.write(f'  {depth:>12} {offset_ms:>8.2f}ms {keyset_ms:>8.2f}ms')
+        deep_unread = 'n/a' if deep_unread_ms is None else f'{deep_unread_ms:.2f}ms'
+        self.stdout.write(f'  unread_only first page {unread_ms:.2f}ms, last page {deep_unread}')
+        self.stdout.write(f'  plan: {plan}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Deepest page: keyset {results[-1][2] / results[0][2]:.1f}x the first page, '
+            f'OFFSET {results[-1][1] / results[0][1]:.1f}x'
+        ))
+
+    def _time_query(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)[len(timings) // 2]
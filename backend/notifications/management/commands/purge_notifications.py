@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from notifications.retention import purge
+
+
+class Command(BaseCommand):
+    help = 'Delete notifications past their retention period (settings.NOTIFICATION_RETENTION)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--archive-dir', default=None,
+                            help='Append purged rows to a gzipped JSONL file here (default: NOTIFICATION_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be deleted')
+
+    def handle(self, *args, **options):
+        report = purge(chunk_size=options['chunk_size'], archive_dir=options['archive_dir'],
+                       dry_run=options['dry_run'])
+        verb = 'Would delete' if report['dry_run'] else 'Deleted'
+        self.stdout.write(f"{verb} {report['notifications_deleted']} notifications in {report['seconds']}s")
+        for notification_type, count in sorted(report['by_type'].items()):
+            self.stdout.write(f'  {notification_type:<12} {count}')
+        if not report['dry_run']:
+            self.stdout.write(f"Deleted {report['contents_deleted']} unreferenced notification bodies")
+        if report['archive']:
+            self.stdout.write(f"Archived to {report['archive']} ({report['archive_bytes']} bytes)")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import relay
+
+
+class Command(BaseCommand):
+    help = 'Publish pending outbox messages to Celery; with --interval, keep running as a relay process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Seconds to wait between polls when the outbox is empty (0: run once)')
+
+    def handle(self, *args, **options):
+        while True:
+            published = relay(batch_size=options['batch_size'])
+            if published:
+                self.stdout.write(f'Published {published} outbox messages')
+            if not options['interval']:
+                return
+            if not published:
+                time.sleep(options['interval'])
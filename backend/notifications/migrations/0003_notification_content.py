@@ -0,0 +1,60 @@
+# Generated by Django 4.2.27 on 2026-10-19 00:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_bodies_to_content(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationContent = apps.get_model('notifications', 'NotificationContent')
+    # Rows of one fan-out carry identical text; give each distinct body a single shared content row
+    bodies = Notification.objects.values('title', 'message', 'link').annotate(first=models.Min('created_at'))
+    for body in bodies.order_by().iterator():
+        content = NotificationContent.objects.create(title=body['title'], message=body['message'], link=body['link'])
+        NotificationContent.objects.filter(pk=content.pk).update(created_at=body['first'])
+        Notification.objects.filter(
+            title=body['title'], message=body['message'], link=body['link'],
+        ).update(content_id=content.pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_alter_notification_notification_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('link', models.CharField(blank=True, max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='content',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='notifications.notificationcontent'),
+        ),
+        migrations.RunPython(move_bodies_to_content, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='notification',
+            name='content',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='notifications.notificationcontent'),
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='link',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='message',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='title',
+        ),
+    ]
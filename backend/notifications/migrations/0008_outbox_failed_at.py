@@ -0,0 +1,32 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:08
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_exhausted_failed(apps, schema_editor):
+    # Messages that already ran out of attempts would otherwise be redelivered by the relay
+    OutboxMessage = apps.get_model('notifications', 'OutboxMessage')
+    OutboxMessage.objects.filter(
+        attempts__gte=5, processed_at__isnull=True, published_at__isnull=False,
+    ).update(failed_at=F('published_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_exhausted_failed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(condition=models.Q(('failed_at__isnull', True), ('processed_at__isnull', True), ('published_at__isnull', False)), fields=['published_at'], name='outbox_in_flight_idx'),
+        ),
+    ]
@@ -1,7 +1,32 @@
 from django.db import models
+from django.db.models import Q
 from accounts.models import User
 
 
+class NotificationContent(models.Model):
+    """
+    Shared body of a notification event.
+
+    A fan-out to many recipients stores its title, message and link once here;
+    each recipient only gets a thin ``Notification`` row pointing at it.
+    """
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    link = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.title
+
+
+class NotificationManager(models.Manager):
+    def create(self, *, title=None, message=None, link='', **kwargs):
+        """Create a notification; ``title``/``message``/``link`` create its content row on the fly."""
+        if 'content' not in kwargs and 'content_id' not in kwargs:
+            kwargs['content'] = NotificationContent.objects.create(title=title, message=message, link=link)
+        return super().create(**kwargs)
+
+
 class Notification(models.Model):
     """
     Model for user notifications.
@@ -16,15 +41,77 @@ class Notification(models.Model):
     )
 
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    content = models.ForeignKey(NotificationContent, on_delete=models.CASCADE, related_name='notifications')
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPE_CHOICES)
-    title = models.CharField(max_length=255)
-    message = models.TextField()
-    link = models.CharField(max_length=500, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Coalescing: repeated events for the same target merge into one unread row (see utils.coalesce_notification)
+    group_key = models.CharField(max_length=100, blank=True)
+    event_count = models.PositiveIntegerField(default=1)
+    # Set when the notification should go out in the next email digest
+    email_pending = models.BooleanField(default=False)
+
+    objects = NotificationManager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['recipient', 'notification_type', 'group_key'], name='notification_coalesce_idx',
+                condition=~Q(group_key=''),
+            ),
+            models.Index(fields=['recipient'], name='notification_email_pending_idx', condition=Q(email_pending=True)),
+            # Inbox listing (see inbox.py); the unread one also serves mark_all_read and unread counts
+            models.Index(fields=['recipient', 'created_at'], name='notification_inbox_idx'),
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='notification_inbox_unread_idx'),
+        ]
 
     def __str__(self):
         return f"{self.recipient.username} - {self.title}"
+
+    @property
+    def title(self):
+        return self.content.title
+
+    @property
+    def message(self):
+        return self.content.message
+
+    @property
+    def link(self):
+        return self.content.link
+
+
+class OutboxMessage(models.Model):
+    """
+    A Celery task to run once the transaction that wrote this row commits.
+
+    Rows are written in the same transaction as the change that causes them,
+    so a rolled-back request leaves nothing behind and the request never waits
+    on the broker. ``outbox.relay`` publishes pending rows to Celery in
+    batches; ``outbox.process`` marks each row processed in the same
+    transaction as running its task, so a message published twice runs once.
+    A row whose task keeps failing is marked ``failed_at`` and left for an
+    admin to retry.
+    """
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], name='outbox_unpublished_idx', condition=Q(published_at__isnull=True)),
+            # Published messages still waiting to be processed, for redelivery by the relay
+            models.Index(
+                fields=['published_at'], name='outbox_in_flight_idx',
+                condition=Q(published_at__isnull=False, processed_at__isnull=True, failed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
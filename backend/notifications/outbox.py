@@ -0,0 +1,112 @@
+"""
+Transactional outbox for Celery side effects.
+
+``enqueue`` writes an ``OutboxMessage`` naming a Celery task and its
+arguments in the caller's transaction instead of calling ``.delay``: the
+request pays one INSERT rather than a broker round trip, and nothing is
+published for a transaction that rolls back.
+
+``relay`` (a beat task, or the ``relay_outbox`` command as a standalone
+process) claims pending rows with ``SELECT ... FOR UPDATE SKIP LOCKED`` and
+publishes them to Celery as one ``process_outbox_batch`` task per batch. Rows
+published more than ``settings.OUTBOX_REDELIVER_AFTER`` seconds ago and still
+unprocessed (the task was lost by the broker or its worker died) are claimed
+and published again. ``process`` runs each message's task in-process, inside
+a transaction that also stamps ``processed_at``; a message that was published
+twice finds the stamp and is skipped, so its effects happen once. A message
+whose task raises is handed back to the relay until it has failed
+``MAX_ATTEMPTS`` times, after which it is marked ``failed_at`` and shows up
+as failed in the admin, where it can be retried.
+"""
+import logging
+from datetime import timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+
+
+def enqueue(task, *args, **kwargs):
+    """Record ``task(*args, **kwargs)`` to run once the current transaction commits."""
+    name = task if isinstance(task, str) else task.name
+    return OutboxMessage.objects.create(task=name, args=list(args), kwargs=kwargs)
+
+
+def relay(batch_size=None):
+    """Publish pending messages to Celery in batches; return the number published."""
+    from .tasks import process_outbox_batch
+
+    batch_size = batch_size or settings.OUTBOX_RELAY_BATCH_SIZE
+    published = 0
+    while True:
+        stale = timezone.now() - timedelta(seconds=settings.OUTBOX_REDELIVER_AFTER)
+        with transaction.atomic():
+            message_ids = list(
+                OutboxMessage.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(published_at__isnull=True)
+                    | Q(published_at__lt=stale, processed_at__isnull=True, failed_at__isnull=True)
+                )
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not message_ids:
+                return published
+            # If publishing fails the transaction rolls back and the rows stay pending
+            process_outbox_batch.delay(message_ids)
+            OutboxMessage.objects.filter(pk__in=message_ids).update(published_at=timezone.now())
+        published += len(message_ids)
+        if len(message_ids) < batch_size:
+            return published
+
+
+def process(message_ids):
+    """Run the task of each message that has not been processed yet."""
+    result = {'processed': 0, 'skipped': 0, 'failed': 0}
+    for message_id in message_ids:
+        try:
+            with transaction.atomic():
+                message = OutboxMessage.objects.select_for_update().filter(
+                    pk=message_id, processed_at__isnull=True, failed_at__isnull=True,
+                ).first()
+                if message is None:
+                    result['skipped'] += 1
+                    continue
+                current_app.tasks[message.task](*message.args, **message.kwargs)
+                message.processed_at = timezone.now()
+                message.save(update_fields=['processed_at'])
+            result['processed'] += 1
+        except Exception:
+            logger.exception('Outbox message %s failed', message_id)
+            OutboxMessage.objects.filter(pk=message_id).update(attempts=F('attempts') + 1)
+            if not OutboxMessage.objects.filter(pk=message_id, attempts__lt=MAX_ATTEMPTS).update(published_at=None):
+                OutboxMessage.objects.filter(pk=message_id).update(failed_at=timezone.now())
+                logger.error('Outbox message %s failed %d times; giving up', message_id, MAX_ATTEMPTS)
+            result['failed'] += 1
+    return result
+
+
+def retry(messages):
+    """Hand failed messages back to the relay with a fresh set of attempts; return how many."""
+    return messages.filter(failed_at__isnull=False).update(failed_at=None, published_at=None, attempts=0)
+
+
+def prune(days=None, chunk_size=None):
+    """Delete processed messages older than ``days``; return the number deleted."""
+    days = settings.OUTBOX_KEEP_DAYS if days is None else days
+    chunk_size = chunk_size or settings.NOTIFICATION_PURGE_CHUNK_SIZE
+    old = OutboxMessage.objects.filter(processed_at__lt=timezone.now() - timedelta(days=days))
+    deleted = 0
+    while True:
+        message_ids = list(old.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not message_ids:
+            return deleted
+        deleted += OutboxMessage.objects.filter(pk__in=message_ids).delete()[0]
@@ -0,0 +1,86 @@
+"""
+Push notifications to connected clients over Channels.
+
+Every user's open sockets join the group ``notifications_user_<id>``.
+Publishing happens after the surrounding transaction commits, so clients are
+never told about rows that were rolled back, and a failure to reach the
+channel layer never breaks the write that triggered it.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+PUSH_BATCH_SIZE = 500
+
+
+def user_group(user_id):
+    return f'notifications_user_{user_id}'
+
+
+def unread_count(user_id):
+    from . import counters
+
+    return counters.get(user_id)
+
+
+def _group_send(user_id, event):
+    try:
+        async_to_sync(get_channel_layer().group_send)(user_group(user_id), event)
+    except Exception:
+        logger.exception('Failed to push notification event to user %s', user_id)
+
+
+def push_notification(notification, count=None):
+    """Send one notification and the recipient's unread count to their sockets."""
+    from .serializers import NotificationSerializer
+
+    _group_send(notification.recipient_id, {
+        'type': 'notification.push',
+        'notification': NotificationSerializer(notification).data,
+        'unread_count': unread_count(notification.recipient_id) if count is None else count,
+    })
+
+
+def push_unread_count(user_id):
+    _group_send(user_id, {'type': 'unread_count.update', 'unread_count': unread_count(user_id)})
+
+
+def publish_on_commit(notification):
+    transaction.on_commit(lambda: push_notification(notification), robust=True)
+
+
+def publish_bulk_on_commit(content_id):
+    """Fan a bulk notification out to its recipients from a worker once committed."""
+    from . import outbox
+    from .tasks import push_bulk_notification_task
+
+    outbox.enqueue(push_bulk_notification_task, content_id)
+
+
+def push_bulk(content_id):
+    """Push a bulk notification, reading the unread counts of each batch of recipients at once."""
+    from . import counters
+
+    def push(batch):
+        counts = counters.get_many([notification.recipient_id for notification in batch])
+        for notification in batch:
+            push_notification(notification, counts[notification.recipient_id])
+        return len(batch)
+
+    notifications = Notification.objects.filter(content_id=content_id).select_related('content').iterator()
+    pushed = 0
+    batch = []
+    for notification in notifications:
+        batch.append(notification)
+        if len(batch) >= PUSH_BATCH_SIZE:
+            pushed += push(batch)
+            batch = []
+    if batch:
+        pushed += push(batch)
+    return pushed
@@ -0,0 +1,147 @@
+"""
+Retention policy for notifications.
+
+``settings.NOTIFICATION_RETENTION`` maps a notification type to how many days
+its notifications are kept once read and while still unread (``None`` keeps
+them forever); the ``'default'`` entry covers every type not listed.
+
+``purge`` walks the table in primary-key windows of ``chunk_size`` rows and
+deletes the expired notifications of each window in its own short
+statement, so no run holds locks on more than one window at a time. Before a
+window is deleted its rows can be appended to a gzip-compressed JSONL
+archive. Shared ``NotificationContent`` rows left without recipients are
+removed the same way afterwards.
+
+Deleting unread notifications leaves the Redis unread counters high until
+the next reconciliation (see ``counters.py``).
+"""
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import Notification, NotificationContent
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = (
+    'pk', 'recipient_id', 'notification_type', 'content__title', 'content__message', 'content__link',
+    'is_read', 'event_count', 'group_key', 'created_at',
+)
+
+
+def _policies():
+    policies = dict(settings.NOTIFICATION_RETENTION)
+    default = policies.pop('default', (None, None))
+    return default, policies
+
+
+def _older_than(now, read_days, unread_days):
+    condition = Q(pk__in=[])
+    if read_days is not None:
+        condition |= Q(is_read=True, created_at__lt=now - timedelta(days=read_days))
+    if unread_days is not None:
+        condition |= Q(is_read=False, created_at__lt=now - timedelta(days=unread_days))
+    return condition
+
+
+def expired(now):
+    """Return a Q matching notifications past their retention period at ``now``."""
+    default, policies = _policies()
+    condition = ~Q(notification_type__in=list(policies)) & _older_than(now, *default)
+    for notification_type, (read_days, unread_days) in policies.items():
+        condition |= Q(notification_type=notification_type) & _older_than(now, read_days, unread_days)
+    return condition
+
+
+def _windows(model, chunk_size):
+    """Yield ``(low, high)`` primary-key bounds covering the rows that exist now."""
+    bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    for low in range(bounds['low'], bounds['high'] + 1, chunk_size):
+        yield low, low + chunk_size
+
+
+def _archive_row(row):
+    record = dict(zip(ARCHIVE_FIELDS, row))
+    record['id'] = record.pop('pk')
+    for field in ('title', 'message', 'link'):
+        record[field] = record.pop(f'content__{field}')
+    record['created_at'] = record['created_at'].isoformat()
+    return json.dumps(record)
+
+
+def purge(now=None, chunk_size=None, archive_dir=None, dry_run=False):
+    """Delete (and optionally archive) expired notifications; return a report of what was reclaimed."""
+    now = now or timezone.now()
+    chunk_size = chunk_size or settings.NOTIFICATION_PURGE_CHUNK_SIZE
+    archive_dir = settings.NOTIFICATION_ARCHIVE_DIR if archive_dir is None else archive_dir
+    started = time.monotonic()
+    condition = expired(now)
+    by_type = {}
+    archive_path = None
+    archive = None
+
+    try:
+        for low, high in _windows(Notification, chunk_size):
+            window = Notification.objects.filter(pk__gte=low, pk__lt=high).filter(condition).order_by('pk')
+            if archive_dir and not dry_run:
+                rows = list(window.values_list(*ARCHIVE_FIELDS))
+                if rows and archive is None:
+                    os.makedirs(archive_dir, exist_ok=True)
+                    archive_path = os.path.join(archive_dir, f'notifications-{now:%Y%m%dT%H%M%S}.jsonl.gz')
+                    archive = gzip.open(archive_path, 'at', encoding='utf-8')
+                if rows:
+                    archive.write(''.join(_archive_row(row) + '\n' for row in rows))
+                    # Make sure the rows are on disk before they leave the database
+                    archive.flush()
+            else:
+                rows = list(window.values_list(*ARCHIVE_FIELDS[:3]))
+            if not rows:
+                continue
+            pks = [row[0] for row in rows]
+            if not dry_run:
+                Notification.objects.filter(pk__in=pks).delete()
+            for row in rows:
+                by_type[row[2]] = by_type.get(row[2], 0) + 1
+    finally:
+        if archive is not None:
+            archive.close()
+
+    contents_deleted = 0 if dry_run else _purge_orphaned_contents(now, chunk_size)
+    report = {
+        'notifications_deleted': sum(by_type.values()),
+        'by_type': by_type,
+        'contents_deleted': contents_deleted,
+        'archive': archive_path,
+        'archive_bytes': os.path.getsize(archive_path) if archive_path else 0,
+        'seconds': round(time.monotonic() - started, 3),
+        'dry_run': dry_run,
+    }
+    logger.info('Notification purge: %s', report)
+    return report
+
+
+def _purge_orphaned_contents(now, chunk_size):
+    # Content is inserted just before its notifications; only touch rows older than any retention
+    # period so a fan-out still being written is never mistaken for an orphan
+    default, policies = _policies()
+    days = [d for policy in (default, *policies.values()) for d in policy if d is not None]
+    if not days:
+        return 0
+    cutoff = now - timedelta(days=min(days))
+    deleted = 0
+    for low, high in _windows(NotificationContent, chunk_size):
+        pks = list(NotificationContent.objects.filter(
+            pk__gte=low, pk__lt=high, created_at__lt=cutoff, notifications__isnull=True,
+        ).values_list('pk', flat=True))
+        if pks:
+            deleted += NotificationContent.objects.filter(pk__in=pks).delete()[0]
+    return deleted
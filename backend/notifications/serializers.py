@@ -3,7 +3,12 @@ from .models import Notification
 
 
 class NotificationSerializer(serializers.ModelSerializer):
+    # The body lives on the shared content row; the viewset select_related()s it
+    title = serializers.CharField(source='content.title', read_only=True)
+    message = serializers.CharField(source='content.message', read_only=True)
+    link = serializers.CharField(source='content.link', read_only=True)
+
     class Meta:
         model = Notification
-        fields = ['id', 'notification_type', 'title', 'message', 'link', 'is_read', 'created_at']
-        read_only_fields = ['id', 'notification_type', 'title', 'message', 'link', 'created_at']
+        fields = ['id', 'notification_type', 'title', 'message', 'link', 'event_count', 'is_read', 'created_at']
+        read_only_fields = ['id', 'notification_type', 'title', 'message', 'link', 'event_count', 'created_at']
@@ -2,7 +2,7 @@ import logging
 
 from celery import shared_task
 from django.conf import settings
-from django.core.mail import send_mail, send_mass_mail
+from django.core.mail import EmailMessage, get_connection, send_mail, send_mass_mail
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +22,97 @@ def send_notification_email(title, message, recipient_email):
         logger.exception('Failed to send notification email to %s', recipient_email)
 
 
+@shared_task
+def create_notification_task(recipient_id, notification_type, title, message, link=''):
+    """Create a deferred notification (see ``notifications.utils.defer_notification``)."""
+    from accounts.models import User
+    from .utils import create_notification
+
+    try:
+        recipient = User.objects.get(pk=recipient_id)
+    except User.DoesNotExist:
+        logger.error('Notification recipient %s not found', recipient_id)
+        return
+    create_notification(
+        recipient=recipient,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        link=link,
+    )
+
+
+@shared_task
+def coalesce_notification_task(recipient_id, notification_type, target, title, message, link='',
+                               summary_title='', summary_message='', count=1):
+    """Record a coalesced notification event (see ``notifications.utils.coalesce_notification``)."""
+    from .utils import coalesce_notification
+
+    coalesce_notification(
+        recipient_id=recipient_id, notification_type=notification_type, target=target, title=title,
+        message=message, link=link, summary_title=summary_title, summary_message=summary_message, count=count,
+    )
+
+
+@shared_task
+def push_bulk_notification_task(content_id):
+    """Push a bulk notification to each recipient's sockets (see ``notifications.realtime``)."""
+    from .realtime import push_bulk
+
+    return {'pushed': push_bulk(content_id)}
+
+
+@shared_task
+def reconcile_unread_counters():
+    """Correct drifted unread counters from the database (see ``notifications.counters``)."""
+    from .counters import reconcile
+
+    return {'corrected': reconcile()}
+
+
+@shared_task
+def purge_expired_notifications():
+    """Delete notifications past their retention period (see ``notifications.retention``)."""
+    from .outbox import prune
+    from .retention import purge
+
+    report = purge()
+    report['outbox_messages_deleted'] = prune()
+    return report
+
+
+@shared_task
+def drain_email_queue():
+    """Deliver queued email over this worker's persistent connection (see ``notifications.mailer``)."""
+    from .mailer import drain
+
+    return drain()
+
+
+@shared_task
+def relay_outbox():
+    """Publish pending outbox messages to Celery in batches (see ``notifications.outbox``)."""
+    from .outbox import relay
+
+    return {'published': relay()}
+
+
+@shared_task
+def process_outbox_batch(message_ids):
+    """Run the tasks of a batch of outbox messages, each exactly once."""
+    from .outbox import process
+
+    return process(message_ids)
+
+
+@shared_task
+def send_notification_digests():
+    """Send the periodic email digest of coalesced notifications."""
+    from .utils import send_digests
+
+    return {'sent': send_digests()}
+
+
 @shared_task
 def send_bulk_notification_emails(email_messages_data):
     """Send multiple notification emails asynchronously.
@@ -37,6 +128,48 @@ def send_bulk_notification_emails(email_messages_data):
         logger.exception('Failed to send bulk notification emails')
 
 
+INVITATION_SUBJECT = 'You have been invited to the eLearning Platform'
+
+
+def _frontend_base():
+    return (
+        settings.CORS_ALLOWED_ORIGINS[0]
+        if settings.CORS_ALLOWED_ORIGINS
+        else 'http://localhost:5173'
+    )
+
+
+def _invitation_template(inviter, frontend_base):
+    """Render the parts of the invitation email shared by everyone one user invites."""
+    inviter_name = (inviter.full_name or inviter.username).replace('{', '{{').replace('}', '}}')
+    return (
+        "Hello {full_name},\n\n"
+        "You have been invited to join the eLearning Platform "
+        "as a {user_type} "
+        f"by {inviter_name}.\n\n"
+        "Click the following link to complete your registration:\n"
+        f"{frontend_base}/invite/{{token}}\n\n"
+        "This link will expire on {expires}.\n\n"
+        "If you did not expect this invitation, you can ignore this email.\n\n"
+        "Best regards,\n"
+        "eLearning Platform"
+    )
+
+
+def _invitation_message(invitation, template):
+    return EmailMessage(
+        INVITATION_SUBJECT,
+        template.format(
+            full_name=invitation.full_name or 'there',
+            user_type=invitation.get_user_type_display(),
+            token=invitation.token,
+            expires=invitation.expires_at.strftime('%B %d, %Y'),
+        ),
+        settings.DEFAULT_FROM_EMAIL,
+        [invitation.email],
+    )
+
+
 @shared_task
 def send_invitation_email(invitation_id):
     """Send invitation email asynchronously."""
@@ -48,33 +181,53 @@ def send_invitation_email(invitation_id):
         logger.error('Invitation %s not found', invitation_id)
         return
 
-    frontend_base = (
-        settings.CORS_ALLOWED_ORIGINS[0]
-        if settings.CORS_ALLOWED_ORIGINS
-        else 'http://localhost:5173'
-    )
-    invite_url = f"{frontend_base}/invite/{invitation.token}"
-
-    subject = 'You have been invited to the eLearning Platform'
-    message = (
-        f"Hello {invitation.full_name or 'there'},\n\n"
-        f"You have been invited to join the eLearning Platform "
-        f"as a {invitation.get_user_type_display()} "
-        f"by {invitation.invited_by.full_name or invitation.invited_by.username}.\n\n"
-        f"Click the following link to complete your registration:\n"
-        f"{invite_url}\n\n"
-        f"This link will expire on {invitation.expires_at.strftime('%B %d, %Y')}.\n\n"
-        f"If you did not expect this invitation, you can ignore this email.\n\n"
-        f"Best regards,\n"
-        f"eLearning Platform"
-    )
+    template = _invitation_template(invitation.invited_by, _frontend_base())
     try:
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [invitation.email],
-            fail_silently=True,
-        )
+        _invitation_message(invitation, template).send(fail_silently=True)
     except Exception:
         logger.exception('Failed to send invitation email to %s', invitation.email)
+
+
+@shared_task
+def send_invitation_emails(invitation_ids):
+    """Send the invitation emails of a bulk upload over one connection.
+
+    Returns ``{'sent': n, 'failed': {email: error}}``; invitations that no
+    longer exist are skipped.
+    """
+    from accounts.models import Invitation
+    from .mailer import send_batch
+
+    invitations = list(
+        Invitation.objects.filter(pk__in=invitation_ids).select_related('invited_by').order_by('pk')
+    )
+    if len(invitations) < len(invitation_ids):
+        logger.warning('%d of %d invitations not found', len(invitation_ids) - len(invitations), len(invitation_ids))
+
+    frontend_base = _frontend_base()
+    templates = {}
+    messages = []
+    for invitation in invitations:
+        if invitation.invited_by_id not in templates:
+            templates[invitation.invited_by_id] = _invitation_template(invitation.invited_by, frontend_base)
+        messages.append(_invitation_message(invitation, templates[invitation.invited_by_id]))
+
+    if not messages:
+        return {'sent': 0, 'failed': {}}
+    attempted = []
+    failures = {}
+    try:
+        with get_connection() as connection:
+            sent, _ = send_batch(messages, connection, on_send=lambda: attempted.append(None), failures=failures)
+    except Exception as e:
+        # Don't let the batch be retried: the messages sent before the connection dropped would go out twice.
+        # Refusals recorded before the drop are kept; the message in flight and the rest are reported unsent.
+        logger.exception('Failed to send invitation emails')
+        first_unsent = max(len(attempted) - 1, 0)
+        sent = first_unsent - sum(1 for index in failures if index < first_unsent)
+        failures.update((index, str(e)) for index in range(first_unsent, len(messages)))
+    failed = {}
+    for index, error in failures.items():
+        logger.warning('Invitation email to %s failed: %s', invitations[index].email, error)
+        failed[invitations[index].email] = error
+    return {'sent': sent, 'failed': failed}
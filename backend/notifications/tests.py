@@ -1,12 +1,45 @@
-from unittest.mock import patch
+import gzip
+import json
+import smtplib
+import socket
+import tempfile
+import threading
+import unittest
+import warnings
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
 
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.mail import BadHeaderError, EmailMessage, EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from redis.exceptions import ConnectionError as RedisConnectionError
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
-from accounts.models import User
-from .models import Notification
-from .utils import create_notification, create_bulk_notifications
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    try:
+        import asyncore
+        import smtpd
+    except ImportError:  # removed in Python 3.12
+        smtpd = None
+
+from accounts.models import Invitation, User
+from . import counters, mailer, outbox, retention
+from .consumers import NotificationConsumer
+from .models import Notification, NotificationContent, OutboxMessage
+from .realtime import push_bulk
+from .tasks import create_notification_task, send_invitation_emails
+from .utils import (
+    create_notification, create_bulk_notifications, defer_notification, coalesce_notification, send_digests,
+)
 
 
 # ── Model Tests ──────────────────────────────────────────────────────
@@ -67,12 +100,57 @@ class NotificationAPITest(APITestCase):
         )
         res = self.client.get('/api/notifications/')
         self.assertEqual(res.status_code, 200)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNone(res.data['next'])
+
+    def test_list_joins_shared_content(self):
+        content = NotificationContent.objects.create(title='Shared', message='Body', link='/x')
+        Notification.objects.create(recipient=self.user, notification_type='general', content=content)
+        Notification.objects.create(recipient=self.user, notification_type='material', content=content)
+        with self.assertNumQueries(2):
+            res = self.client.get('/api/notifications/')
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(res.data['results'][0]['title'], 'Shared')
+        self.assertEqual(res.data['results'][1]['link'], '/x')
 
     def test_list_empty(self):
         res = self.client.get('/api/notifications/')
         self.assertEqual(res.status_code, 200)
-        self.assertEqual(len(res.data), 0)
+        self.assertEqual(res.data, {'results': [], 'next': None})
+
+    def _inbox(self, count):
+        now = timezone.now()
+        content = NotificationContent.objects.create(title='T', message='M')
+        Notification.objects.bulk_create([
+            # Pairs share a timestamp so paging has to break ties on the id
+            Notification(recipient=self.user, content=content, notification_type='general',
+                         is_read=i % 3 != 0, created_at=now - timedelta(minutes=i // 2))
+            for i in range(count)
+        ])
+        return list(Notification.objects.filter(recipient=self.user).order_by('-created_at', '-pk'))
+
+    def test_keyset_pages_cover_inbox_once(self):
+        expected = self._inbox(7)
+        seen, url = [], '/api/notifications/?limit=3'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            seen.extend(n['id'] for n in res.data['results'])
+            url = f"/api/notifications/?limit=3&after={res.data['next']}" if res.data['next'] else None
+        self.assertEqual(seen, [n.pk for n in expected])
+
+    def test_unread_only_filter(self):
+        expected = [n.pk for n in self._inbox(7) if not n.is_read]
+        res = self.client.get('/api/notifications/?unread_only=true&limit=2')
+        self.assertEqual([n['id'] for n in res.data['results']], expected[:2])
+        res = self.client.get(f"/api/notifications/?unread_only=true&limit=2&after={res.data['next']}")
+        self.assertEqual([n['id'] for n in res.data['results']], expected[2:])
+        self.assertIsNone(res.data['next'])
+
+    def test_invalid_cursor_or_limit(self):
+        for query in ('after=garbage', 'limit=0', 'limit=x', f'after={10 ** 30}:1', f'after=1:{2 ** 64}'):
+            res = self.client.get(f'/api/notifications/?{query}')
+            self.assertEqual(res.status_code, 400)
 
     def test_mark_read(self):
         n = Notification.objects.create(
@@ -124,8 +202,7 @@ class CreateNotificationTest(TestCase):
             username='student2', password='p', email='',
         )
 
-    @patch('notifications.utils.send_mail')
-    def test_creates_notification_and_sends_email(self, mock_send):
+    def test_creates_notification_and_sends_email(self):
         n = create_notification(
             recipient=self.user,
             notification_type='general',
@@ -134,10 +211,11 @@ class CreateNotificationTest(TestCase):
         )
         self.assertEqual(Notification.objects.count(), 1)
         self.assertEqual(n.recipient, self.user)
-        mock_send.assert_called_once()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, 'notifications.tasks.send_notification_email')
+        self.assertEqual(message.args, ['Test', 'Hello', 'student1@example.com'])
 
-    @patch('notifications.utils.send_mail')
-    def test_skips_email_when_no_email(self, mock_send):
+    def test_skips_email_when_no_email(self):
         create_notification(
             recipient=self.user_no_email,
             notification_type='general',
@@ -145,10 +223,9 @@ class CreateNotificationTest(TestCase):
             message='Hello',
         )
         self.assertEqual(Notification.objects.count(), 1)
-        mock_send.assert_not_called()
+        self.assertFalse(OutboxMessage.objects.exists())
 
-    @patch('notifications.utils.send_mass_mail')
-    def test_bulk_creates_notifications_and_sends_mass_email(self, mock_mass):
+    def test_bulk_creates_notifications_and_sends_mass_email(self):
         results = create_bulk_notifications(
             recipients=[self.user, self.user_no_email],
             notification_type='material',
@@ -157,12 +234,35 @@ class CreateNotificationTest(TestCase):
         )
         self.assertEqual(Notification.objects.count(), 2)
         self.assertEqual(len(results), 2)
-        mock_mass.assert_called_once()
-        # Only 1 user has email, so 1 tuple in the mass mail call
-        email_tuples = mock_mass.call_args[0][0]
-        self.assertEqual(len(email_tuples), 1)
+        message = OutboxMessage.objects.get(task='notifications.tasks.send_bulk_notification_emails')
+        # Only 1 user has email, so 1 message in the mass mail task
+        self.assertEqual(len(message.args[0]), 1)
 
-    @patch('notifications.utils.send_mail', side_effect=Exception('SMTP down'))
+    def test_bulk_uses_batched_inserts(self):
+        recipients = [self.user, self.user_no_email] + [
+            User.objects.create_user(username=f'extra{i}', password='p') for i in range(3)
+        ]
+        with self.assertNumQueries(8):
+            # SAVEPOINT, the shared content row, three INSERTs of at most two rows, the push and email
+            # outbox rows, RELEASE SAVEPOINT
+            results = create_bulk_notifications(
+                recipients=recipients, notification_type='general', title='T', message='M', batch_size=2,
+            )
+        self.assertEqual(Notification.objects.count(), 5)
+        self.assertTrue(all(n.pk for n in results))
+        self.assertEqual({n.recipient_id for n in results}, {r.pk for r in recipients})
+
+    def test_bulk_shares_one_content_row(self):
+        create_bulk_notifications(
+            recipients=[self.user, self.user_no_email], notification_type='material',
+            title='New Material', message='A new file was uploaded.', link='/courses/1',
+        )
+        self.assertEqual(NotificationContent.objects.count(), 1)
+        self.assertEqual(Notification.objects.filter(content=NotificationContent.objects.get()).count(), 2)
+        n = Notification.objects.get(recipient=self.user_no_email)
+        self.assertEqual((n.title, n.message, n.link), ('New Material', 'A new file was uploaded.', '/courses/1'))
+
+    @patch('notifications.tasks.send_mail', side_effect=Exception('SMTP down'))
     def test_email_failure_does_not_crash(self, mock_send):
         n = create_notification(
             recipient=self.user,
@@ -171,4 +271,679 @@ class CreateNotificationTest(TestCase):
             message='Hello',
         )
         self.assertIsNotNone(n)
+        self.assertEqual(outbox.process([OutboxMessage.objects.get().pk])['processed'], 1)
+        mock_send.assert_called_once()
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_rolled_back_notification_leaves_no_outbox_row(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            create_notification(recipient=self.user, notification_type='general', title='T', message='M')
+            raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+class DeferredNotificationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='teacher1', password='p', email='')
+
+    def test_written_to_outbox(self):
+        with self.assertNumQueries(1):
+            defer_notification(
+                recipient_id=self.user.id, notification_type='general', title='T', message='M',
+            )
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, 'notifications.tasks.create_notification_task')
+        self.assertEqual(message.args, [self.user.id, 'general', 'T', 'M', ''])
+        self.assertFalse(Notification.objects.exists())
+
+    def test_task_creates_notification(self):
+        create_notification_task(self.user.id, 'general', 'T', 'M', '/x')
+        n = Notification.objects.get()
+        self.assertEqual(n.recipient, self.user)
+        self.assertEqual(n.link, '/x')
+
+
+# ── Coalescing and Digest Tests ──────────────────────────────────────
+
+@override_settings(NOTIFICATION_COALESCE_WINDOW=3600)
+class CoalescedNotificationTest(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher1', password='p', email='t@example.com')
+
+    def _event(self, count=1):
+        return coalesce_notification(
+            recipient_id=self.teacher.id, notification_type='general', target='assignment:1:submissions',
+            title='New submission for Quiz', message='s1 submitted "Quiz".', link='/assignments/1',
+            summary_title='{count} new submissions for Quiz', summary_message='{count} students submitted "Quiz".',
+            count=count,
+        )
+
+    def test_events_merge_into_one_row(self):
+        first = self._event()
+        self.assertEqual(first.title, 'New submission for Quiz')
+        for _ in range(36):
+            self._event()
         self.assertEqual(Notification.objects.count(), 1)
+        n = Notification.objects.select_related('content').get()
+        self.assertEqual(n.event_count, 37)
+        self.assertEqual(n.title, '37 new submissions for Quiz')
+        self.assertEqual(n.message, '37 students submitted "Quiz".')
+        self.assertEqual(NotificationContent.objects.count(), 1)
+
+    def test_batch_count(self):
+        self._event(count=5)
+        self.assertEqual(Notification.objects.get().title, '5 new submissions for Quiz')
+
+    def test_read_or_expired_notification_starts_a_new_one(self):
+        n = self._event()
+        Notification.objects.filter(pk=n.pk).update(is_read=True)
+        second = self._event()
+        self.assertNotEqual(second.pk, n.pk)
+        NotificationContent.objects.filter(pk=second.content_id).update(
+            created_at=second.content.created_at - timedelta(hours=2),
+        )
+        self.assertNotEqual(self._event().pk, second.pk)
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_digest_sends_one_email_per_recipient(self):
+        other = User.objects.create_user(username='teacher2', password='p', email='t2@example.com')
+        self._event(count=3)
+        coalesce_notification(
+            recipient_id=self.teacher.id, notification_type='enrollment', target='course:1:enrolled',
+            title='New enrollment in C1', message='s1 has enrolled.',
+        )
+        coalesce_notification(
+            recipient_id=other.id, notification_type='enrollment', target='course:2:enrolled',
+            title='New enrollment in C2', message='s2 has enrolled.',
+        )
+        self.assertEqual(send_digests(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        by_recipient = {m.to[0]: m for m in mail.outbox}
+        self.assertEqual(by_recipient['t@example.com'].subject, 'You have 2 new notifications')
+        self.assertIn('3 new submissions for Quiz', by_recipient['t@example.com'].body)
+        self.assertEqual(by_recipient['t2@example.com'].subject, 'New enrollment in C2')
+        self.assertFalse(Notification.objects.filter(email_pending=True).exists())
+        self.assertEqual(send_digests(), 0)
+
+    def test_digest_keeps_unsent_recipients_pending(self):
+        other = User.objects.create_user(username='teacher2', password='p', email='t2@example.com')
+        coalesce_notification(
+            recipient_id=self.teacher.id, notification_type='enrollment', target='course:1:enrolled',
+            title='New enrollment in C1', message='s1 has enrolled.',
+        )
+        # A newline in the subject makes the backend reject the message
+        coalesce_notification(
+            recipient_id=other.id, notification_type='enrollment', target='course:2:enrolled',
+            title='Broken\nsubject', message='s2 has enrolled.',
+        )
+        self.assertEqual(send_digests(), 1)
+        self.assertEqual([m.to[0] for m in mail.outbox], ['t@example.com'])
+        pending = Notification.objects.filter(email_pending=True)
+        self.assertEqual(list(pending.values_list('recipient_id', flat=True)), [other.id])
+
+    def test_digest_keeps_everything_pending_when_backend_is_down(self):
+        self._event(count=2)
+        with patch('notifications.utils.get_connection') as get_connection:
+            get_connection.return_value.__enter__.side_effect = ConnectionRefusedError
+            self.assertEqual(send_digests(), 0)
+        self.assertTrue(Notification.objects.filter(email_pending=True).exists())
+
+    def test_defer_with_target_coalesces(self):
+        defer_notification(
+            recipient_id=self.teacher.id, notification_type='general', title='T', message='M',
+            target='assignment:1:submissions', summary_title='{count} T',
+        )
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, 'notifications.tasks.coalesce_notification_task')
+        self.assertEqual(
+            message.args, [self.teacher.id, 'general', 'assignment:1:submissions', 'T', 'M', '', '{count} T', ''],
+        )
+
+
+# ── Real-time Push Tests ─────────────────────────────────────────────
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class PublishOnCommitTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student1', password='p', email='')
+
+    @patch('notifications.realtime.push_notification')
+    def test_pushed_only_after_commit(self, mock_push):
+        with self.captureOnCommitCallbacks() as callbacks:
+            n = create_notification(recipient=self.user, notification_type='general', title='T', message='M')
+            mock_push.assert_not_called()
+        for callback in callbacks:
+            callback()
+        mock_push.assert_called_once_with(n)
+
+    def test_bulk_pushes_from_one_task(self):
+        other = User.objects.create_user(username='student2', password='p')
+        create_bulk_notifications(
+            recipients=[self.user, other], notification_type='material', title='T', message='M',
+        )
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, 'notifications.tasks.push_bulk_notification_task')
+        self.assertEqual(message.args, [NotificationContent.objects.get().pk])
+
+    @patch('notifications.realtime._group_send')
+    def test_push_bulk_reads_counters_with_one_mget(self, group_send):
+        other = User.objects.create_user(username='student2', password='p')
+        third = User.objects.create_user(username='student3', password='p')
+        create_bulk_notifications(
+            recipients=[self.user, other, third], notification_type='material', title='T', message='M',
+        )
+        content_id = NotificationContent.objects.get().pk
+        redis = MagicMock()
+        stored = {f'notifications:unread:{self.user.pk}': '4', f'notifications:unread:{third.pk}': '2'}
+        redis.mget.side_effect = lambda keys: [stored.get(key) for key in keys]
+        with patch('notifications.counters.get_redis', return_value=redis):
+            # The notifications and one grouped COUNT for the missing counter
+            with self.assertNumQueries(2):
+                pushed = push_bulk(content_id)
+        self.assertEqual(pushed, 3)
+        redis.mget.assert_called_once()
+        counts = {call.args[0]: call.args[1]['unread_count'] for call in group_send.call_args_list}
+        self.assertEqual(counts, {self.user.pk: 4, other.pk: 1, third.pk: 2})
+        redis.pipeline.return_value.set.assert_called_once_with(f'notifications:unread:{other.pk}', 1, nx=True)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class NotificationConsumerTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student1', password='p', email='')
+        Notification.objects.create(recipient=self.user, notification_type='general', title='Old', message='M')
+
+    def _communicator(self, user):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = user
+        return communicator
+
+    def test_connect_sends_unread_count_then_pushes(self):
+        async def run():
+            communicator = self._communicator(self.user)
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'unread_count', 'unread_count': 1})
+
+            await database_sync_to_async(create_notification)(
+                recipient=self.user, notification_type='feedback', title='Graded', message='Quiz graded',
+            )
+            event = await communicator.receive_json_from()
+            self.assertEqual(event['type'], 'notification')
+            self.assertEqual(event['notification']['title'], 'Graded')
+            self.assertEqual(event['unread_count'], 2)
+            await communicator.disconnect()
+        async_to_sync(run)()
+
+    def test_only_recipient_receives_push(self):
+        other = User.objects.create_user(username='student2', password='p', email='')
+
+        async def run():
+            communicator = self._communicator(other)
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await database_sync_to_async(create_notification)(
+                recipient=self.user, notification_type='general', title='T', message='M',
+            )
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+        async_to_sync(run)()
+
+    def test_anonymous_connection_is_rejected(self):
+        async def run():
+            connected, _ = await self._communicator(AnonymousUser()).connect()
+            self.assertFalse(connected)
+        async_to_sync(run)()
+
+
+# ── Unread Counter Tests ─────────────────────────────────────────────
+
+class UnreadCounterTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='p', email='')
+        self.other = User.objects.create_user(username='u2', password='p')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _notify(self, user, is_read=False):
+        return Notification.objects.create(
+            recipient=user, notification_type='general', title='T', message='M', is_read=is_read,
+        )
+
+    def test_count_unread_is_one_grouped_query(self):
+        self._notify(self.user)
+        self._notify(self.user)
+        self._notify(self.user, is_read=True)
+        self._notify(self.other)
+        third = User.objects.create_user(username='u3', password='p')
+        with self.assertNumQueries(1):
+            counts = counters.count_unread([self.user.pk, self.other.pk, third.pk])
+        self.assertEqual(counts, {self.user.pk: 2, self.other.pk: 1, third.pk: 0})
+
+    def test_endpoint_reads_counter(self):
+        redis = MagicMock()
+        redis.get.return_value = '7'
+        with patch('notifications.counters.get_redis', return_value=redis), self.assertNumQueries(1):
+            # Only the token lookup; the notifications table is not touched
+            res = self.client.get('/api/notifications/unread_count/')
+        self.assertEqual(res.data, {'unread_count': 7})
+        redis.get.assert_called_once_with(f'notifications:unread:{self.user.pk}')
+
+    def test_endpoint_warms_missing_counter(self):
+        self._notify(self.user)
+        redis = MagicMock()
+        redis.get.return_value = None
+        with patch('notifications.counters.get_redis', return_value=redis):
+            res = self.client.get('/api/notifications/unread_count/')
+        self.assertEqual(res.data, {'unread_count': 1})
+        redis.set.assert_called_once_with(f'notifications:unread:{self.user.pk}', 1, nx=True)
+
+    def test_endpoint_falls_back_to_database_without_redis(self):
+        self._notify(self.user)
+        self._notify(self.user, is_read=True)
+        with patch('notifications.counters.get_redis', side_effect=RedisConnectionError('down')):
+            res = self.client.get('/api/notifications/unread_count/')
+        self.assertEqual(res.data, {'unread_count': 1})
+
+    @patch('notifications.counters._apply')
+    def test_create_increments_after_commit(self, mock_apply):
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_notification(recipient=self.user, notification_type='general', title='T', message='M')
+            mock_apply.assert_not_called()
+        callbacks[0]()
+        mock_apply.assert_called_once_with(counters._incr_existing, [self.user.pk])
+
+    @patch('notifications.counters._apply')
+    def test_bulk_increments_every_recipient(self, mock_apply):
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_bulk_notifications(
+                recipients=[self.user, self.other], notification_type='general', title='T', message='M',
+            )
+        callbacks[0]()
+        mock_apply.assert_called_once_with(counters._incr_existing, [self.user.pk, self.other.pk])
+
+    @patch('notifications.api.push_unread_count')
+    @patch('notifications.counters._apply')
+    def test_mark_read_decrements_once(self, mock_apply, mock_push):
+        n = self._notify(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/notifications/{n.id}/mark_read/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/notifications/{n.id}/mark_read/')
+        mock_apply.assert_called_once_with(counters._decr_existing, [self.user.pk])
+        mock_push.assert_called_once_with(self.user.pk)
+
+    @patch('notifications.api.push_unread_count')
+    @patch('notifications.counters._apply')
+    def test_mark_all_read_zeroes_counter(self, mock_apply, mock_push):
+        self._notify(self.user)
+        pipe = MagicMock()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/notifications/mark_all_read/')
+        operation, user_ids = mock_apply.call_args[0]
+        self.assertEqual(user_ids, [self.user.pk])
+        operation(pipe, 'key')
+        pipe.set.assert_called_once_with('key', 0)
+
+    def test_reconcile_rewrites_drifted_counters(self):
+        self._notify(self.user)
+        self._notify(self.user)
+        redis = MagicMock()
+        redis.scan_iter.return_value = iter([f'notifications:unread:{self.user.pk}', f'notifications:unread:{self.other.pk}'])
+        redis.mget.return_value = ['5', '0']
+        pipe = redis.pipeline.return_value
+        with patch('notifications.counters.get_redis', return_value=redis):
+            corrected = counters.reconcile(batch_size=10)
+        self.assertEqual(corrected, 1)
+        pipe.set.assert_called_once_with(f'notifications:unread:{self.user.pk}', 2)
+
+
+# ── Retention Tests ──────────────────────────────────────────────────
+
+@override_settings(NOTIFICATION_RETENTION={'default': (30, 90), 'deadline': (1, None)})
+class RetentionPurgeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='p')
+        self.now = timezone.now()
+
+    def _notify(self, days_old, is_read, notification_type='general', content=None):
+        n = Notification.objects.create(
+            recipient=self.user, notification_type=notification_type, is_read=is_read,
+            **({'content': content} if content else {'title': f'{notification_type} {days_old}d', 'message': 'M'}),
+        )
+        Notification.objects.filter(pk=n.pk).update(created_at=self.now - timedelta(days=days_old))
+        NotificationContent.objects.filter(pk=n.content_id).update(created_at=self.now - timedelta(days=days_old))
+        return n
+
+    def _build(self):
+        return {
+            'old_read': self._notify(31, True),
+            'old_unread': self._notify(91, False),
+            'keep_read': self._notify(29, True),
+            'keep_unread': self._notify(89, False),
+            'deadline_read': self._notify(2, True, 'deadline'),
+            'deadline_unread': self._notify(400, False, 'deadline'),
+        }
+
+    def test_purges_by_type_policy_in_chunks(self):
+        rows = self._build()
+        report = retention.purge(now=self.now, chunk_size=2, archive_dir='')
+        remaining = set(Notification.objects.values_list('pk', flat=True))
+        self.assertEqual(remaining, {rows[k].pk for k in ('keep_read', 'keep_unread', 'deadline_unread')})
+        self.assertEqual(report['notifications_deleted'], 3)
+        self.assertEqual(report['by_type'], {'general': 2, 'deadline': 1})
+        # The bodies of the deleted notifications go too
+        self.assertEqual(report['contents_deleted'], 3)
+        self.assertEqual(NotificationContent.objects.count(), 3)
+
+    def test_shared_content_kept_while_referenced(self):
+        content = NotificationContent.objects.create(title='Shared', message='M')
+        NotificationContent.objects.filter(pk=content.pk).update(created_at=self.now - timedelta(days=60))
+        self._notify(31, True, content=content)
+        kept = self._notify(10, True, content=content)
+        report = retention.purge(now=self.now, archive_dir='')
+        self.assertEqual(report['notifications_deleted'], 1)
+        self.assertEqual(report['contents_deleted'], 0)
+        self.assertEqual(Notification.objects.get().pk, kept.pk)
+
+    def test_archives_before_deleting(self):
+        rows = self._build()
+        with tempfile.TemporaryDirectory() as archive_dir:
+            report = retention.purge(now=self.now, chunk_size=2, archive_dir=archive_dir)
+            with gzip.open(report['archive'], 'rt', encoding='utf-8') as f:
+                archived = [json.loads(line) for line in f]
+            self.assertGreater(report['archive_bytes'], 0)
+        self.assertEqual([r['id'] for r in archived], [rows[k].pk for k in ('old_read', 'old_unread', 'deadline_read')])
+        self.assertEqual(archived[0]['title'], 'general 31d')
+        self.assertEqual(archived[0]['recipient_id'], self.user.pk)
+
+    def test_dry_run_deletes_nothing(self):
+        self._build()
+        report = retention.purge(now=self.now, dry_run=True, archive_dir='')
+        self.assertEqual(report['notifications_deleted'], 3)
+        self.assertEqual(Notification.objects.count(), 6)
+        self.assertIsNone(report['archive'])
+
+    def test_empty_table(self):
+        report = retention.purge(now=self.now, archive_dir='')
+        self.assertEqual(report['notifications_deleted'], 0)
+
+
+# ── Email Dispatcher Tests ───────────────────────────────────────────
+
+class EmailQueueTest(TestCase):
+    def test_serialization_round_trip(self):
+        message = EmailMultiAlternatives(
+            'Subject', 'Body', 'from@example.com', ['a@example.com'], bcc=['b@example.com'],
+            headers={'X-Tag': 'invite'}, alternatives=[('<p>Body</p>', 'text/html')],
+        )
+        message.attach('notes.txt', 'hello', 'text/plain')
+        restored = mailer.deserialize(mailer.serialize(message))
+        self.assertEqual(restored.recipients(), ['a@example.com', 'b@example.com'])
+        self.assertEqual(restored.extra_headers, {'X-Tag': 'invite'})
+        self.assertEqual(restored.alternatives, [('<p>Body</p>', 'text/html')])
+        self.assertEqual(restored.attachments, [('notes.txt', 'hello', 'text/plain')])
+
+    def test_backend_queues_instead_of_sending(self):
+        redis = MagicMock()
+        pipe = redis.pipeline.return_value
+        connection = get_connection('notifications.mailer.QueuedEmailBackend')
+        with patch('notifications.mailer.get_redis', return_value=redis):
+            sent = connection.send_messages([
+                EmailMessage('One', 'Body', 'from@example.com', ['a@example.com']),
+                EmailMessage('Two', 'Body', 'from@example.com', ['b@example.com']),
+                EmailMessage('Nobody', 'Body', 'from@example.com', []),
+            ])
+        self.assertEqual(sent, 2)
+        self.assertEqual(pipe.xadd.call_count, 2)
+        pipe.execute.assert_called_once()
+        self.assertEqual(mailer.deserialize(pipe.xadd.call_args[0][1]['message']).subject, 'Two')
+
+    def test_backend_fail_silently_when_redis_is_down(self):
+        connection = get_connection('notifications.mailer.QueuedEmailBackend', fail_silently=True)
+        with patch('notifications.mailer.get_redis', side_effect=RedisConnectionError('down')):
+            self.assertEqual(connection.send_messages([EmailMessage('S', 'B', 'f@example.com', ['a@example.com'])]), 0)
+
+    def test_backend_rejects_unsendable_messages_before_queueing(self):
+        redis = MagicMock()
+        connection = get_connection('notifications.mailer.QueuedEmailBackend')
+        with patch('notifications.mailer.get_redis', return_value=redis):
+            with self.assertRaises(BadHeaderError):
+                connection.send_messages([EmailMessage('Bad\nsubject', 'B', 'f@example.com', ['a@example.com'])])
+        redis.pipeline.return_value.xadd.assert_not_called()
+
+    def test_unsendable_message_is_a_failure_not_a_stuck_batch(self):
+        connection = MagicMock()
+        connection.send_messages.side_effect = [BadHeaderError('newline'), 1]
+        sent, failures = mailer.send_batch([
+            EmailMessage('Bad\nsubject', 'B', 'f@example.com', ['a@example.com']),
+            EmailMessage('Fine', 'B', 'f@example.com', ['b@example.com']),
+        ], connection)
+        self.assertEqual((sent, list(failures)), (1, [0]))
+        connection.open.assert_not_called()
+
+    @override_settings(EMAIL_RATE_LIMIT=2)
+    @patch('notifications.mailer.time.sleep')
+    def test_throttle_waits_for_next_second(self, mock_sleep):
+        redis = MagicMock()
+        redis.pipeline.return_value.execute.side_effect = [[3, True], [1, True]]
+        mailer.throttle(redis)
+        mock_sleep.assert_called_once()
+
+
+if smtpd is not None:
+    class _CapturingSMTPServer(smtpd.SMTPServer):
+        """Local debugging SMTP server that records connections and refuses one address."""
+
+        def __init__(self):
+            super().__init__(('127.0.0.1', 0), None, decode_data=True)
+            self.connections = 0
+            self.received = []
+
+        def handle_accepted(self, conn, addr):
+            self.connections += 1
+            super().handle_accepted(conn, addr)
+
+        def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+            if 'refused@example.com' in rcpttos:
+                return '550 No such user'
+            self.received.append((rcpttos, data))
+
+
+@unittest.skipIf(smtpd is None, 'smtpd is not available')
+class SMTPDispatchTest(TestCase):
+    def setUp(self):
+        self.server = _CapturingSMTPServer()
+        self.thread = threading.Thread(target=asyncore.loop, kwargs={'timeout': 0.05}, daemon=True)
+        self.thread.start()
+        port = self.server.socket.getsockname()[1]
+        self.settings = override_settings(
+            EMAIL_DISPATCH_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=port, EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+        )
+        self.settings.enable()
+        mailer.reset_connection()
+
+    def tearDown(self):
+        mailer.reset_connection()
+        self.settings.disable()
+        self.server.close()
+        self.thread.join(timeout=2)
+
+    def _message(self, to):
+        return EmailMessage('Hello', 'Body', 'from@example.com', [to])
+
+    def test_batches_share_one_connection_and_report_refusals(self):
+        sent, failures = mailer.send_batch([self._message(f'user{i}@example.com') for i in range(3)])
+        self.assertEqual((sent, failures), (3, {}))
+        sent, failures = mailer.send_batch([
+            self._message('user3@example.com'), self._message('refused@example.com'), self._message('user4@example.com'),
+        ])
+        self.assertEqual(sent, 2)
+        self.assertEqual(list(failures), [1])
+        self.assertEqual(len(self.server.received), 5)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_reconnects_after_server_drops_connection(self):
+        mailer.send_batch([self._message('user0@example.com')])
+        # Simulate an idle timeout on the server side
+        mailer.worker_connection().connection.sock.shutdown(socket.SHUT_RDWR)
+        sent, failures = mailer.send_batch([self._message('user1@example.com')])
+        self.assertEqual((sent, failures), (1, {}))
+        self.assertEqual(self.server.connections, 2)
+
+    def test_invitation_batch_reports_refused_recipients(self):
+        teacher = User.objects.create_user(username='teacher1', password='p', user_type='teacher')
+        invitations = [
+            Invitation.objects.create(invited_by=teacher, email=email)
+            for email in ('a@example.com', 'refused@example.com', 'b@example.com')
+        ]
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend'):
+            result = send_invitation_emails([i.pk for i in invitations])
+        self.assertEqual(result['sent'], 2)
+        self.assertEqual(list(result['failed']), ['refused@example.com'])
+        self.assertEqual(self.server.connections, 1)
+
+
+# ── Outbox Tests ─────────────────────────────────────────────────────
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='teacher1', password='p', email='')
+
+    def _defer(self, title='T'):
+        defer_notification(recipient_id=self.user.id, notification_type='general', title=title, message='M')
+
+    @override_settings(OUTBOX_RELAY_BATCH_SIZE=2)
+    @patch('notifications.tasks.process_outbox_batch')
+    def test_relay_publishes_in_batches(self, mock_task):
+        for i in range(5):
+            self._defer(f'T{i}')
+        self.assertEqual(outbox.relay(), 5)
+        batches = [c[0][0] for c in mock_task.delay.call_args_list]
+        self.assertEqual([len(b) for b in batches], [2, 2, 1])
+        self.assertEqual(sorted(sum(batches, [])), list(OutboxMessage.objects.order_by('pk').values_list('pk', flat=True)))
+        self.assertFalse(OutboxMessage.objects.filter(published_at__isnull=True).exists())
+        self.assertEqual(outbox.relay(), 0)
+
+    @patch('notifications.tasks.process_outbox_batch')
+    def test_failed_publish_leaves_messages_pending(self, mock_task):
+        self._defer()
+        mock_task.delay.side_effect = ConnectionError('broker down')
+        with self.assertRaises(ConnectionError):
+            outbox.relay()
+        self.assertTrue(OutboxMessage.objects.filter(published_at__isnull=True).exists())
+
+    def test_processing_twice_runs_task_once(self):
+        self._defer()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(outbox.process([message.pk]), {'processed': 1, 'skipped': 0, 'failed': 0})
+        # The relay published it again (e.g. it crashed before recording the publish)
+        self.assertEqual(outbox.process([message.pk]), {'processed': 0, 'skipped': 1, 'failed': 0})
+        self.assertEqual(Notification.objects.count(), 1)
+        message.refresh_from_db()
+        self.assertIsNotNone(message.processed_at)
+
+    @patch('notifications.utils.create_notification', side_effect=RuntimeError('boom'))
+    def test_failed_task_is_handed_back_to_relay(self, mock_create):
+        self._defer()
+        message = OutboxMessage.objects.get()
+        OutboxMessage.objects.update(published_at=timezone.now())
+        self.assertEqual(outbox.process([message.pk])['failed'], 1)
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1)
+        self.assertIsNone(message.published_at)
+        self.assertIsNone(message.processed_at)
+
+        OutboxMessage.objects.update(attempts=outbox.MAX_ATTEMPTS - 1, published_at=timezone.now())
+        outbox.process([message.pk])
+        message.refresh_from_db()
+        # Out of attempts: marked failed and no longer relayed, until an admin retries it
+        self.assertIsNotNone(message.published_at)
+        self.assertIsNotNone(message.failed_at)
+        OutboxMessage.objects.update(published_at=timezone.now() - timedelta(days=1))
+        with patch('notifications.tasks.process_outbox_batch'):
+            self.assertEqual(outbox.relay(), 0)
+        self.assertEqual(outbox.retry(OutboxMessage.objects.all()), 1)
+        message.refresh_from_db()
+        self.assertEqual((message.attempts, message.published_at, message.failed_at), (0, None, None))
+
+    @patch('notifications.tasks.process_outbox_batch')
+    def test_relay_redelivers_stale_unprocessed_messages(self, mock_task):
+        self._defer('lost')
+        self._defer('in flight')
+        self._defer('done')
+        lost, in_flight, done = OutboxMessage.objects.order_by('pk')
+        stale = timezone.now() - timedelta(seconds=settings.OUTBOX_REDELIVER_AFTER + 1)
+        OutboxMessage.objects.filter(pk__in=[lost.pk, done.pk]).update(published_at=stale)
+        OutboxMessage.objects.filter(pk=in_flight.pk).update(published_at=timezone.now())
+        OutboxMessage.objects.filter(pk=done.pk).update(processed_at=timezone.now())
+        self.assertEqual(outbox.relay(), 1)
+        mock_task.delay.assert_called_once_with([lost.pk])
+        lost.refresh_from_db()
+        self.assertGreater(lost.published_at, stale)
+
+    def test_prune_keeps_recent_and_unprocessed(self):
+        self._defer('old')
+        self._defer('recent')
+        self._defer('pending')
+        old, recent, _ = OutboxMessage.objects.order_by('pk')
+        OutboxMessage.objects.filter(pk=old.pk).update(processed_at=timezone.now() - timedelta(days=8))
+        OutboxMessage.objects.filter(pk=recent.pk).update(processed_at=timezone.now())
+        self.assertEqual(outbox.prune(days=7), 1)
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+
+# ── Invitation Email Tests ───────────────────────────────────────────
+
+class InvitationEmailTest(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher1', password='p', full_name='Ada Teacher', user_type='teacher',
+        )
+        self.other = User.objects.create_user(username='teacher2', password='p', user_type='teacher')
+
+    def test_batch_fetches_once_and_renders_per_inviter(self):
+        invitations = [
+            Invitation.objects.create(invited_by=self.teacher, email='a@example.com', full_name='Alice'),
+            Invitation.objects.create(invited_by=self.teacher, email='b@example.com'),
+            Invitation.objects.create(invited_by=self.other, email='c@example.com', user_type='teacher'),
+        ]
+        with self.assertNumQueries(1):
+            result = send_invitation_emails([i.pk for i in invitations] + [999999])
+        self.assertEqual(result, {'sent': 3, 'failed': {}})
+        self.assertEqual([m.to for m in mail.outbox], [['a@example.com'], ['b@example.com'], ['c@example.com']])
+        self.assertIn('Hello Alice,', mail.outbox[0].body)
+        self.assertIn('by Ada Teacher.', mail.outbox[0].body)
+        self.assertIn(f'/invite/{invitations[0].token}', mail.outbox[0].body)
+        self.assertIn('Hello there,', mail.outbox[1].body)
+        self.assertIn('as a Teacher by teacher2.', mail.outbox[2].body)
+
+    def test_batch_reports_unsent_messages_when_connection_is_lost(self):
+        invitations = [
+            Invitation.objects.create(invited_by=self.teacher, email=f'user{i}@example.com') for i in range(3)
+        ]
+        with patch('notifications.mailer.send_batch', side_effect=OSError('connection lost')):
+            result = send_invitation_emails([i.pk for i in invitations])
+        self.assertEqual(result['sent'], 0)
+        self.assertEqual(len(result['failed']), 3)
+
+    def test_batch_keeps_refusals_recorded_before_connection_is_lost(self):
+        invitations = [
+            Invitation.objects.create(invited_by=self.teacher, email=f'user{i}@example.com') for i in range(4)
+        ]
+        connection = MagicMock()
+        connection.send_messages.side_effect = [
+            1, smtplib.SMTPRecipientsRefused({'user1@example.com': (550, b'No such user')}),
+            OSError('connection lost'), OSError('connection lost'),
+        ]
+        with patch('notifications.tasks.get_connection') as get_connection:
+            get_connection.return_value.__enter__.return_value = connection
+            result = send_invitation_emails([i.pk for i in invitations])
+        self.assertEqual(result['sent'], 1)
+        self.assertEqual(sorted(result['failed']), ['user1@example.com', 'user2@example.com', 'user3@example.com'])
+        self.assertIn('No such user', result['failed']['user1@example.com'])
+        self.assertEqual(result['failed']['user2@example.com'], 'connection lost')
@@ -1,35 +1,25 @@
 import logging
 
+from datetime import timedelta
+
 from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
 
-from .models import Notification
-from .tasks import send_notification_email, send_bulk_notification_emails
+from . import counters, outbox
+from .models import Notification, NotificationContent
+from .realtime import publish_on_commit, publish_bulk_on_commit
+from .tasks import (
+    send_notification_email, send_bulk_notification_emails, create_notification_task, coalesce_notification_task,
+)
 
 logger = logging.getLogger(__name__)
 
 
 def create_notification(*, recipient, notification_type, title, message, link=''):
-    """Create an in-app notification and send a corresponding email via Celery."""
-    notification = Notification.objects.create(
-        recipient=recipient,
-        notification_type=notification_type,
-        title=title,
-        message=message,
-        link=link,
-    )
-
-    if recipient.email:
-        send_notification_email.delay(title, message, recipient.email)
-
-    return notification
-
-
-def create_bulk_notifications(*, recipients, notification_type, title, message, link=''):
-    """Create in-app notifications for multiple recipients and send emails via Celery."""
-    notifications = []
-    email_messages = []
-
-    for recipient in recipients:
+    """Create an in-app notification; its email is sent via the outbox once the transaction commits."""
+    with transaction.atomic():
         notification = Notification.objects.create(
             recipient=recipient,
             notification_type=notification_type,
@@ -37,14 +27,177 @@ def create_bulk_notifications(*, recipients, notification_type, title, message,
             message=message,
             link=link,
         )
-        notifications.append(notification)
+        if recipient.email:
+            outbox.enqueue(send_notification_email, title, message, recipient.email)
+    counters.incr_on_commit([recipient.pk])
+    publish_on_commit(notification)
+    return notification
+
+
+def coalesce_notification(*, recipient_id, notification_type, target, title, message, link='',
+                          summary_title='', summary_message='', count=1):
+    """Record ``count`` events, merging them into an open notification for the same target.
+
+    Events for the same ``(recipient, notification_type, target)`` that arrive
+    within ``NOTIFICATION_COALESCE_WINDOW`` seconds of the first one update a
+    single unread notification instead of adding rows. Once it covers more
+    than one event its text becomes ``summary_title``/``summary_message``, in
+    which ``{count}`` is replaced by the number of events. No email is sent
+    right away; the notification is picked up by the next email digest.
+    """
+    since = timezone.now() - timedelta(seconds=settings.NOTIFICATION_COALESCE_WINDOW)
+    with transaction.atomic():
+        notification = Notification.objects.select_for_update().select_related('content').filter(
+            recipient_id=recipient_id, notification_type=notification_type, group_key=target,
+            is_read=False, content__created_at__gte=since,
+        ).order_by('-created_at').first()
+        if notification is None:
+            event_count = count
+        else:
+            event_count = notification.event_count + count
+        if event_count > 1 and summary_title:
+            title = summary_title.replace('{count}', str(event_count))
+            message = (summary_message or message).replace('{count}', str(event_count))
+
+        if notification is None:
+            notification = Notification.objects.create(
+                recipient_id=recipient_id, notification_type=notification_type, title=title, message=message,
+                link=link, group_key=target, event_count=event_count, email_pending=True,
+            )
+            counters.incr_on_commit([recipient_id])
+            publish_on_commit(notification)
+            return notification
+        content = notification.content
+        content.title, content.message, content.link = title, message, link
+        content.save(update_fields=['title', 'message', 'link'])
+        # Move the merged notification back to the top of the recipient's list
+        notification.event_count = event_count
+        notification.created_at = timezone.now()
+        notification.email_pending = True
+        notification.save(update_fields=['event_count', 'created_at', 'email_pending'])
+        publish_on_commit(notification)
+        return notification
+
+
+def defer_notification(*, recipient_id, notification_type, title, message, link='', target='',
+                       summary_title='', summary_message=''):
+    """Create a notification from a Celery worker after the current transaction commits.
+
+    Keeps the notification insert and email off the request's write path: only
+    an outbox row is written, and nothing happens if the transaction rolls
+    back. With a ``target`` the event is coalesced (see ``coalesce_notification``).
+    """
+    if target:
+        outbox.enqueue(
+            coalesce_notification_task,
+            recipient_id, notification_type, target, title, message, link, summary_title, summary_message,
+        )
+        return
+    outbox.enqueue(create_notification_task, recipient_id, notification_type, title, message, link)
 
+
+def insert_bulk_notifications(*, recipients, notification_type, title, message, link='', batch_size=None):
+    """Insert one notification per recipient with batched INSERTs in a single transaction.
+
+    The title, message and link are stored once in a shared ``NotificationContent``
+    row; each recipient gets a thin row pointing at it. Email payloads are built
+    in the same pass over the recipients. Returns ``(notifications, email_messages)``;
+    the notifications have their primary keys set by ``bulk_create`` so callers
+    never need to re-fetch them.
+    """
+    notifications = []
+    email_messages = []
+    content = NotificationContent(title=title, message=message, link=link)
+    for recipient in recipients:
+        notifications.append(Notification(
+            recipient=recipient,
+            content=content,
+            notification_type=notification_type,
+        ))
         if recipient.email:
             email_messages.append(
                 [title, message, settings.DEFAULT_FROM_EMAIL, [recipient.email]]
             )
 
-    if email_messages:
-        send_bulk_notification_emails.delay(email_messages)
+    # No savepoint of its own: create_bulk_notifications wraps this with its outbox write
+    with transaction.atomic(savepoint=False):
+        content.save()
+        Notification.objects.bulk_create(
+            notifications, batch_size=batch_size or settings.NOTIFICATION_BULK_BATCH_SIZE,
+        )
+    if notifications:
+        counters.incr_on_commit(n.recipient_id for n in notifications)
+        publish_bulk_on_commit(content.pk)
+    return notifications, email_messages
 
+
+def create_bulk_notifications(*, recipients, notification_type, title, message, link='', batch_size=None):
+    """Create in-app notifications for multiple recipients; their emails go out via the outbox."""
+    with transaction.atomic():
+        notifications, email_messages = insert_bulk_notifications(
+            recipients=recipients,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            link=link,
+            batch_size=batch_size,
+        )
+        if email_messages:
+            outbox.enqueue(send_bulk_notification_emails, email_messages)
     return notifications
+
+
+def send_digests(batch_size=None):
+    """Email every recipient one digest of their notifications marked ``email_pending``.
+
+    Recipients are handled in batches over one backend connection. Only the
+    notifications of recipients whose digest was sent (or who have no email
+    address) are cleared; the rest stay pending for the next run. Returns the
+    number of digests sent.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_DIGEST_BATCH_SIZE
+    pending = Notification.objects.filter(email_pending=True)
+    failed = set()
+    sent = 0
+    while True:
+        recipient_ids = list(
+            pending.exclude(recipient_id__in=failed)
+            .order_by('recipient_id').values_list('recipient_id', flat=True).distinct()[:batch_size]
+        )
+        if not recipient_ids:
+            return sent
+        notifications = list(
+            pending.filter(recipient_id__in=recipient_ids).select_related('recipient', 'content').order_by('created_at')
+        )
+        by_recipient = {}
+        for notification in notifications:
+            by_recipient.setdefault(notification.recipient, []).append(notification)
+
+        done = []
+        try:
+            with get_connection() as connection:
+                for recipient, items in by_recipient.items():
+                    if recipient.email:
+                        if len(items) == 1:
+                            subject, body = items[0].title, items[0].message
+                        else:
+                            subject = f'You have {len(items)} new notifications'
+                            body = '\n\n'.join(f'{n.title}\n{n.message}' for n in items)
+                        message = EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient.email])
+                        try:
+                            delivered = connection.send_messages([message])
+                        except Exception:
+                            logger.exception('Failed to send the notification digest of user %s', recipient.pk)
+                            delivered = 0
+                        if not delivered:
+                            failed.add(recipient.pk)
+                            continue
+                        sent += 1
+                    done.extend(n.pk for n in items)
+        except OSError:
+            # The backend is unreachable: keep everything not yet sent for the next run
+            logger.exception('Failed to connect to the email backend for notification digests')
+            return sent
+        finally:
+            if done:
+                Notification.objects.filter(pk__in=done).update(email_pending=False)
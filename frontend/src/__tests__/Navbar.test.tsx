@@ -1,15 +1,25 @@
 import React from 'react';
-import { render, screen, waitFor } from '@testing-library/react';
+import { act, render, screen } from '@testing-library/react';
 import userEvent from '@testing-library/user-event';
 import { BrowserRouter } from 'react-router-dom';
 import Navbar from '../components/Navbar';
-import client from '../api/client';
 
 const mockLogout = jest.fn();
 const mockNavigate = jest.fn();
-
-jest.mock('../api/client');
-const mockedClient = client as jest.Mocked<typeof client>;
+const mockSetUnreadCount = jest.fn();
+
+class MockWebSocket {
+  static instances: MockWebSocket[] = [];
+  url: string;
+  onmessage: ((event: { data: string }) => void) | null = null;
+  onclose: (() => void) | null = null;
+  close = jest.fn();
+
+  constructor(url: string) {
+    this.url = url;
+    MockWebSocket.instances.push(this);
+  }
+}
 
 jest.mock('react-router-dom', () => ({
   ...jest.requireActual('react-router-dom'),
@@ -20,7 +30,9 @@ let mockAuthState = {
   user: null as any,
   isAuthenticated: false,
   logout: mockLogout,
-};
+  unreadCount: 0,
+  setUnreadCount: mockSetUnreadCount,
+} as any;
 
 jest.mock('../context/AuthContext', () => ({
   useAuth: () => mockAuthState,
@@ -37,7 +49,8 @@ function renderNavbar() {
 describe('Navbar', () => {
   beforeEach(() => {
     jest.clearAllMocks();
-    mockedClient.get.mockResolvedValue({ data: [] });
+    MockWebSocket.instances = [];
+    (global as any).WebSocket = MockWebSocket;
   });
 
   it('shows login and register when not authenticated', () => {
@@ -84,24 +97,49 @@ describe('Navbar', () => {
     expect(screen.queryByText('Create Course')).not.toBeInTheDocument();
   });
 
-  it('shows notification badge with unread count', async () => {
+  it('shows notification badge with unread count', () => {
     mockAuthState = {
       user: { id: 1, username: 'student1', user_type: 'student' },
       isAuthenticated: true,
       logout: mockLogout,
+      unreadCount: 2,
+      setUnreadCount: mockSetUnreadCount,
     };
-    mockedClient.get.mockResolvedValue({
-      data: [
-        { id: 1, is_read: false },
-        { id: 2, is_read: false },
-        { id: 3, is_read: true },
-      ],
-    });
+    renderNavbar();
+    expect(screen.getByText('2')).toBeInTheDocument();
+  });
+
+  it('updates the unread count from the notification socket', () => {
+    mockAuthState = {
+      user: { id: 1, username: 'student1', user_type: 'student' },
+      isAuthenticated: true,
+      logout: mockLogout,
+      unreadCount: 0,
+      setUnreadCount: mockSetUnreadCount,
+    };
+    const listener = jest.fn();
+    window.addEventListener('notification', listener);
     renderNavbar();
 
-    await waitFor(() => {
-      expect(screen.getByText('2')).toBeInTheDocument();
+    const ws = MockWebSocket.instances[0];
+    expect(ws.url).toContain('/ws/notifications/');
+    act(() => {
+      ws.onmessage?.({ data: JSON.stringify({ type: 'unread_count', unread_count: 3 }) });
+      ws.onmessage?.({
+        data: JSON.stringify({ type: 'notification', notification: { id: 7, is_read: false }, unread_count: 4 }),
+      });
     });
+
+    expect(mockSetUnreadCount).toHaveBeenCalledWith(3);
+    expect(mockSetUnreadCount).toHaveBeenCalledWith(4);
+    expect(listener).toHaveBeenCalledTimes(1);
+    window.removeEventListener('notification', listener);
+  });
+
+  it('does not open a socket when not authenticated', () => {
+    mockAuthState = { user: null, isAuthenticated: false, logout: mockLogout };
+    renderNavbar();
+    expect(MockWebSocket.instances).toHaveLength(0);
   });
 
   it('shows username and user type', () => {
@@ -36,18 +36,21 @@ describe('Notifications', () => {
 
   it('displays notifications', async () => {
     mockedClient.get.mockResolvedValue({
-      data: [
-        {
-          id: 1, notification_type: 'enrollment', title: 'New Enrollment',
-          message: 'Alice enrolled', link: '', is_read: false,
-          created_at: '2026-01-01T00:00:00Z',
-        },
-        {
-          id: 2, notification_type: 'material', title: 'New Material',
-          message: 'Lecture uploaded', link: '', is_read: true,
-          created_at: '2026-01-02T00:00:00Z',
-        },
-      ],
+      data: {
+        results: [
+          {
+            id: 1, notification_type: 'enrollment', title: 'New Enrollment',
+            message: 'Alice enrolled', link: '', is_read: false,
+            created_at: '2026-01-01T00:00:00Z',
+          },
+          {
+            id: 2, notification_type: 'material', title: 'New Material',
+            message: 'Lecture uploaded', link: '', is_read: true,
+            created_at: '2026-01-02T00:00:00Z',
+          },
+        ],
+        next: null,
+      },
     });
     renderNotifications();
 
@@ -59,7 +62,7 @@ describe('Notifications', () => {
   });
 
   it('shows empty state', async () => {
-    mockedClient.get.mockResolvedValue({ data: [] });
+    mockedClient.get.mockResolvedValue({ data: { results: [], next: null } });
     renderNotifications();
 
     await waitFor(() => {
@@ -69,13 +72,16 @@ describe('Notifications', () => {
 
   it('shows mark all read button when unread notifications exist', async () => {
     mockedClient.get.mockResolvedValue({
-      data: [
-        {
-          id: 1, notification_type: 'general', title: 'Unread',
-          message: 'msg', link: '', is_read: false,
-          created_at: '2026-01-01T00:00:00Z',
-        },
-      ],
+      data: {
+        results: [
+          {
+            id: 1, notification_type: 'general', title: 'Unread',
+            message: 'msg', link: '', is_read: false,
+            created_at: '2026-01-01T00:00:00Z',
+          },
+        ],
+        next: null,
+      },
     });
     renderNotifications();
 
@@ -86,13 +92,16 @@ describe('Notifications', () => {
 
   it('hides mark all read when all notifications are read', async () => {
     mockedClient.get.mockResolvedValue({
-      data: [
-        {
-          id: 1, notification_type: 'general', title: 'Read',
-          message: 'msg', link: '', is_read: true,
-          created_at: '2026-01-01T00:00:00Z',
-        },
-      ],
+      data: {
+        results: [
+          {
+            id: 1, notification_type: 'general', title: 'Read',
+            message: 'msg', link: '', is_read: true,
+            created_at: '2026-01-01T00:00:00Z',
+          },
+        ],
+        next: null,
+      },
     });
     renderNotifications();
 
@@ -104,13 +113,16 @@ describe('Notifications', () => {
 
   it('calls mark all read API', async () => {
     mockedClient.get.mockResolvedValue({
-      data: [
-        {
-          id: 1, notification_type: 'general', title: 'Unread',
-          message: 'msg', link: '', is_read: false,
-          created_at: '2026-01-01T00:00:00Z',
-        },
-      ],
+      data: {
+        results: [
+          {
+            id: 1, notification_type: 'general', title: 'Unread',
+            message: 'msg', link: '', is_read: false,
+            created_at: '2026-01-01T00:00:00Z',
+          },
+        ],
+        next: null,
+      },
     });
     mockedClient.post.mockResolvedValue({ data: {} });
     renderNotifications();
@@ -129,13 +141,16 @@ describe('Notifications', () => {
 
   it('shows notification type badge', async () => {
     mockedClient.get.mockResolvedValue({
-      data: [
-        {
-          id: 1, notification_type: 'enrollment', title: 'Test',
-          message: 'msg', link: '', is_read: false,
-          created_at: '2026-01-01T00:00:00Z',
-        },
-      ],
+      data: {
+        results: [
+          {
+            id: 1, notification_type: 'enrollment', title: 'Test',
+            message: 'msg', link: '', is_read: false,
+            created_at: '2026-01-01T00:00:00Z',
+          },
+        ],
+        next: null,
+      },
     });
     renderNotifications();
 
@@ -143,4 +158,25 @@ describe('Notifications', () => {
       expect(screen.getByText('Enrollment')).toBeInTheDocument();
     });
   });
+
+  it('loads the next page with the cursor', async () => {
+    const item = (id: number, title: string) => ({
+      id, notification_type: 'general', title, message: 'msg', link: '', is_read: true,
+      event_count: 1, created_at: '2026-01-01T00:00:00Z',
+    });
+    mockedClient.get
+      .mockResolvedValueOnce({ data: { results: [item(2, 'Newer')], next: 'cursor-1' } })
+      .mockResolvedValueOnce({ data: { results: [item(1, 'Older')], next: null } });
+    renderNotifications();
+
+    const user = userEvent.setup();
+    await user.click(await screen.findByText('Load more'));
+
+    await waitFor(() => {
+      expect(screen.getByText('Older')).toBeInTheDocument();
+    });
+    expect(screen.getByText('Newer')).toBeInTheDocument();
+    expect(mockedClient.get).toHaveBeenLastCalledWith('/notifications/', { params: { after: 'cursor-1' } });
+    expect(screen.queryByText('Load more')).not.toBeInTheDocument();
+  });
 });
@@ -1,19 +1,44 @@
 import React, { useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import client from '../api/client';
+import type { AppNotification } from '../types';
 
 export default function Navbar() {
   const { user, isAuthenticated, logout, unreadCount, setUnreadCount } = useAuth();
   const navigate = useNavigate();
 
+  // Live notifications: the server sends the unread count on connect and pushes
+  // every new (or coalesced) notification, so there is nothing to poll.
   useEffect(() => {
-    if (isAuthenticated) {
-      client.get('/notifications/').then(res => {
-        const unread = res.data.filter((n: { is_read: boolean }) => !n.is_read).length;
-        setUnreadCount(unread);
-      }).catch(() => {});
-    }
+    if (!isAuthenticated || typeof WebSocket === 'undefined') return;
+    const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const wsHost = import.meta.env.VITE_API_URL?.replace(/^https?:\/\//, '').replace('/api', '') || 'localhost:8080';
+    const wsUrl = `${wsProtocol}//${wsHost}/ws/notifications/?token=${localStorage.getItem('auth_token')}`;
+
+    let ws: WebSocket;
+    let reconnectTimer: ReturnType<typeof setTimeout>;
+    let closed = false;
+
+    const connect = () => {
+      ws = new WebSocket(wsUrl);
+      ws.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (typeof data.unread_count === 'number') setUnreadCount(data.unread_count);
+        if (data.type === 'notification') {
+          window.dispatchEvent(new CustomEvent<AppNotification>('notification', { detail: data.notification }));
+        }
+      };
+      ws.onclose = () => {
+        if (!closed) reconnectTimer = setTimeout(connect, 2000);
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      ws?.close();
+    };
   }, [isAuthenticated, setUnreadCount]);
 
   const handleLogout = () => {
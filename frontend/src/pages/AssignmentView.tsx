@@ -61,6 +61,9 @@ export default function AssignmentView() {
       });
       setSubmission(res.data);
       setSubmitted(true);
+      // Reload to pick up the answer key, which is only revealed after submitting
+      const assignmentRes = await client.get(`/assignments/${id}/`);
+      setAssignment(assignmentRes.data);
     } catch { /* ignore */ }
   };
 
@@ -295,9 +298,10 @@ export default function AssignmentView() {
                 <h6>Q{qi + 1}: {q.question}</h6>
                 {q.options.map((opt, oi) => {
                   let btnClass = 'btn btn-outline-secondary w-100 text-start mb-1';
+                  const correct = assignment.answer_key?.[qi] ?? q.correct;
                   if (revealAnswers) {
-                    if (oi === q.correct) btnClass = 'btn btn-success w-100 text-start mb-1';
-                    else if (submitted && oi === answers[qi] && oi !== q.correct) btnClass = 'btn btn-danger w-100 text-start mb-1';
+                    if (oi === correct) btnClass = 'btn btn-success w-100 text-start mb-1';
+                    else if (submitted && oi === answers[qi] && oi !== correct) btnClass = 'btn btn-danger w-100 text-start mb-1';
                   } else if (answers[qi] === oi) {
                     btnClass = 'btn btn-primary w-100 text-start mb-1';
                   }
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import client from '../api/client';
 import { useAuth } from '../context/AuthContext';
-import type { AppNotification } from '../types';
+import type { AppNotification, NotificationPage } from '../types';
 
 const typeBadge: Record<string, { label: string; cls: string }> = {
   enrollment: { label: 'Enrollment', cls: 'bg-success' },
@@ -15,13 +15,42 @@ const typeBadge: Record<string, { label: string; cls: string }> = {
 export default function Notifications() {
   const { setUnreadCount } = useAuth();
   const [notifications, setNotifications] = useState<AppNotification[]>([]);
+  const [next, setNext] = useState<string | null>(null);
+  const [unreadOnly, setUnreadOnly] = useState(false);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
-    client.get('/notifications/').then(res => {
-      setNotifications(res.data);
+    setLoading(true);
+    client.get<NotificationPage>('/notifications/', { params: unreadOnly ? { unread_only: true } : {} }).then(res => {
+      setNotifications(res.data.results);
+      setNext(res.data.next);
       setLoading(false);
     }).catch(() => setLoading(false));
+  }, [unreadOnly]);
+
+  const loadMore = async () => {
+    if (!next) return;
+    setLoadingMore(true);
+    try {
+      const res = await client.get<NotificationPage>('/notifications/', {
+        params: { after: next, ...(unreadOnly ? { unread_only: true } : {}) },
+      });
+      setNotifications(prev => [...prev, ...res.data.results]);
+      setNext(res.data.next);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Pushed by the Navbar's notification socket; a coalesced notification replaces its older copy
+  useEffect(() => {
+    const onNotification = (event: Event) => {
+      const pushed = (event as CustomEvent<AppNotification>).detail;
+      setNotifications(prev => [pushed, ...prev.filter(n => n.id !== pushed.id)]);
+    };
+    window.addEventListener('notification', onNotification);
+    return () => window.removeEventListener('notification', onNotification);
   }, []);
 
   const handleMarkAllRead = async () => {
@@ -36,9 +65,16 @@ export default function Notifications() {
     <div className="mt-3">
       <div className="d-flex justify-content-between align-items-center mb-3">
         <h4>Notifications</h4>
-        {notifications.some(n => !n.is_read) && (
-          <button className="btn btn-sm btn-outline-primary" onClick={handleMarkAllRead}>Mark All Read</button>
-        )}
+        <div className="d-flex align-items-center gap-3">
+          <div className="form-check form-switch mb-0">
+            <input className="form-check-input" type="checkbox" id="unread-only" checked={unreadOnly}
+              onChange={e => setUnreadOnly(e.target.checked)} />
+            <label className="form-check-label small" htmlFor="unread-only">Unread only</label>
+          </div>
+          {notifications.some(n => !n.is_read) && (
+            <button className="btn btn-sm btn-outline-primary" onClick={handleMarkAllRead}>Mark All Read</button>
+          )}
+        </div>
       </div>
       {notifications.length === 0 ? (
         <p className="text-muted">No notifications.</p>
@@ -65,6 +101,13 @@ export default function Notifications() {
           })}
         </div>
       )}
+      {next && (
+        <div className="text-center mt-3">
+          <button className="btn btn-sm btn-outline-secondary" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
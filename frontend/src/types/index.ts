@@ -162,10 +162,18 @@ export interface AppNotification {
   title: string;
   message: string;
   link: string;
+  // Number of events merged into this notification (e.g. "37 new submissions")
+  event_count: number;
   is_read: boolean;
   created_at: string;
 }
 
+// One keyset page of the inbox; pass `next` back as `after` for the following page
+export interface NotificationPage {
+  results: AppNotification[];
+  next: string | null;
+}
+
 export interface AuthResponse {
   token: string;
   user: User;
@@ -180,7 +188,8 @@ export interface BulkUploadResult {
 export interface QuizQuestion {
   question: string;
   options: string[];
-  correct: number;
+  // Omitted from the content served to students; see Assignment.answer_key
+  correct?: number;
 }
 
 export interface Flashcard {
@@ -188,19 +197,43 @@ export interface Flashcard {
   back: string;
 }
 
+export interface CardReviewState {
+  id: number;
+  assignment: number;
+  card_index: number;
+  card: Flashcard | null;
+  // SM-2 ease factor x 1000
+  ease: number;
+  interval_days: number;
+  repetitions: number;
+  due_at: string;
+  last_reviewed_at: string | null;
+}
+
 export interface Assignment {
   id: number;
   course: number;
   course_title: string;
   title: string;
   assignment_type: 'quiz' | 'flashcard';
+  // Only present on the detail endpoint; list responses omit it
   content: { questions?: QuizQuestion[]; cards?: Flashcard[] };
+  question_count: number;
   source_file: string | null;
   created_by: number;
   created_by_name: string;
   created_at: string;
   deadline: string | null;
+  is_closed: boolean;
+  // Each student sees their own question and option order
+  shuffle: boolean;
   submission_count: number;
+  average_score: number | null;
+  // Only set for students: whether they have submitted and their own score
+  has_submitted: boolean | null;
+  my_score: number | null;
+  // Correct option per question; null for students until they have submitted
+  answer_key?: number[] | null;
 }
 
 export interface AssignmentSubmission {